@@ -0,0 +1,221 @@
+# File: acquisition.py (Deteksi stabil & penggabungan update berat, dijalankan di thread worker timbangan)
+#
+# Tidak bergantung pada Qt: worker memanggil AcquisitionPipeline.process() untuk setiap pembacaan, dan
+# pipeline memanggil publish(WeightState) paling banyak sekali per frame tampilan, hanya jika berat yang
+# ditampilkan atau status stabil benar-benar berubah. Jika ada recorder (weight_recorder.py), setiap pembacaan
+# mentah juga direkam di sana sebelum digabung, dan jika ada live feed (live_weight_shm.py) setiap pembacaan
+# mentah ditulis ke shared memory untuk program lain di PC yang sama. Deteksi stabil memakai berat yang sudah
+# difilter (weight_filters.py, opsional) dengan toleransi absolut dan/atau relatif terhadap beban; SettleTimer
+# mencatat berapa detik setiap penimbangan menunggu sampai STABLE.
+# SimulatedScale / SerialScale adalah loop pembacaan timbangan tanpa Qt: dibungkus QObject di main_app.py dan
+# dijalankan sebagai thread biasa oleh layanan headless (weighing_service.py).
+
+import csv
+import random
+import time
+from collections import deque, namedtuple
+from datetime import datetime
+
+from indicator_protocols import create_parser
+from live_weight_shm import create_live_writer
+from weight_recorder import create_recorder, replay_samples
+from weight_filters import create_weight_filter, describe
+from metrics import METRICS
+
+STABILITY_WINDOW_SECONDS = 2.0  # Setara 5 pembacaan pada indikator 2 pembacaan/detik
+STABILITY_TOLERANCE = 2.0
+STABILITY_MIN_READINGS = 4
+STABILITY_RELATIVE_TOLERANCE = 0.0  # Mis. 0.0001 = 0.01% beban: 4 kg pada 40 ton, toleransi absolut tetap batas bawahnya
+SETTLE_MIN_LOAD_KG = 200.0  # Di bawah ini jembatan timbang dianggap kosong
+SETTLE_TIMES_KEPT = 500
+SETTLE_BUCKETS = (1, 2, 3, 5, 8, 13, 20, 30, 60, 120)  # Detik, untuk histogram waktu tunggu stabil
+DISPLAY_INTERVAL = 1 / 30
+
+WeightState = namedtuple("WeightState", ["weight", "stable", "timestamp"])
+
+class SlidingMinMax:
+    # Min/max jendela geser berbasis waktu dengan dua monotonic deque: O(1) amortized per sampel
+    def __init__(self, window_seconds):
+        self.window_seconds = window_seconds
+        self._timestamps = deque(); self._max = deque(); self._min = deque()
+
+    def push(self, timestamp, value):
+        self._timestamps.append(timestamp)
+        while self._max and self._max[-1][1] <= value: self._max.pop()
+        self._max.append((timestamp, value))
+        while self._min and self._min[-1][1] >= value: self._min.pop()
+        self._min.append((timestamp, value))
+        cutoff = timestamp - self.window_seconds
+        while self._timestamps[0] < cutoff: self._timestamps.popleft()
+        while self._max[0][0] < cutoff: self._max.popleft()
+        while self._min[0][0] < cutoff: self._min.popleft()
+
+    def clear(self): self._timestamps.clear(); self._max.clear(); self._min.clear()
+    def __len__(self): return len(self._timestamps)
+    @property
+    def spread(self): return self._max[0][1] - self._min[0][1] if self._timestamps else float("inf")
+
+class StabilityDetector:
+    def __init__(self, tolerance=STABILITY_TOLERANCE, window_seconds=STABILITY_WINDOW_SECONDS, min_readings=STABILITY_MIN_READINGS, relative_tolerance=STABILITY_RELATIVE_TOLERANCE):
+        self.tolerance = tolerance; self.window_seconds = window_seconds; self.min_readings = min_readings; self.relative_tolerance = relative_tolerance
+        self.window = SlidingMinMax(window_seconds); self._first_timestamp = None
+
+    def tolerance_at(self, weight): return max(self.tolerance, self.relative_tolerance * abs(weight))
+
+    def update(self, timestamp, weight, indicator_stable=None):
+        if self._first_timestamp is None: self._first_timestamp = timestamp
+        self.window.push(timestamp, weight)
+        # Jika indikator sendiri melaporkan motion, jangan pernah dianggap stabil
+        if indicator_stable is False: return False
+        # Jendela harus sudah terisi penuh (durasi dan jumlah pembacaan) sebelum bisa dinyatakan stabil
+        if timestamp - self._first_timestamp < self.window_seconds or len(self.window) < self.min_readings: return False
+        return self.window.spread <= self.tolerance_at(weight)
+
+    def reset(self): self.window.clear(); self._first_timestamp = None
+
+def create_detector(options):
+    # options: isi "stability" di config.json (per timbangan); kunci yang tidak diisi memakai nilai default di atas
+    options = options or {}
+    return StabilityDetector(float(options.get("tolerance_kg", STABILITY_TOLERANCE)), float(options.get("window_seconds", STABILITY_WINDOW_SECONDS)),
+                             int(options.get("min_readings", STABILITY_MIN_READINGS)), float(options.get("relative_tolerance", STABILITY_RELATIVE_TOLERANCE)))
+
+class SettleTimer:
+    # Waktu tunggu per penimbangan: dari berat pertama kali melewati min_load (truk naik ke jembatan timbang) sampai
+    # pertama kali STABLE. Dihitung sekali per truk; mulai lagi setelah jembatan kosong.
+    def __init__(self, on_settled=None, min_load=SETTLE_MIN_LOAD_KG):
+        self.on_settled = on_settled; self.min_load = min_load; self.times = deque(maxlen=SETTLE_TIMES_KEPT)
+        self._loaded_at = None; self._empty = True
+
+    def update(self, timestamp, weight, stable):
+        if abs(weight) < self.min_load: self._empty = True; self._loaded_at = None; return
+        if self._empty: self._empty = False; self._loaded_at = timestamp
+        if stable and self._loaded_at is not None:
+            seconds = timestamp - self._loaded_at; self._loaded_at = None; self.times.append(seconds)
+            if self.on_settled is not None: self.on_settled(seconds, weight)
+
+def create_settle_logger(scale, weight_filter, detector):
+    # Waktu stabil selalu masuk histogram scale_settle_seconds. "stability": {"log_file": "stability_log.csv"} menambah
+    # satu baris CSV per penimbangan (untuk membandingkan pengaturan filter di lapangan); "log_console": true juga
+    # mencetaknya ke konsol (default mati supaya konsol tidak penuh setiap penimbangan)
+    stability = scale.get("stability") or {}; path = stability.get("log_file"); console = bool(stability.get("log_console")); settings = f"{describe(weight_filter)} tol={detector.tolerance:g}kg rel={detector.relative_tolerance:g}"
+    histogram = METRICS.histogram("scale_settle_seconds", "Time from a truck entering the scale to the first stable reading", buckets=SETTLE_BUCKETS, scale=scale.get("id", ""))
+    def on_settled(seconds, weight):
+        histogram.observe(seconds)
+        if console: print(f"[{scale.get('name', 'Scale')}] Stable after {seconds:.1f} s at {weight:,.1f} kg")
+        if not path: return
+        try:
+            with open(path, "a", newline="") as f: csv.writer(f).writerow([datetime.now().strftime("%Y-%m-%d %H:%M:%S"), scale.get("id", ""), f"{seconds:.2f}", f"{weight:.1f}", settings])
+        except OSError as e: print(f"Gagal menulis log stabil {path}: {e}")
+    return on_settled
+
+def pipeline_options(scale):
+    # Filter, detektor stabil dan pencatat waktu stabil untuk AcquisitionPipeline dari konfigurasi satu timbangan
+    try: weight_filter = create_weight_filter(scale.get("filter"))
+    except ValueError as e: print(f"[{scale.get('name', 'Scale')}] {e}; filter dinonaktifkan."); weight_filter = None
+    detector = create_detector(scale.get("stability"))
+    settle = SettleTimer(create_settle_logger(scale, weight_filter, detector), float((scale.get("stability") or {}).get("min_load_kg", SETTLE_MIN_LOAD_KG)))
+    readings = METRICS.counter("scale_readings_total", "Weight readings received from the indicator", scale=scale.get("id", ""))
+    return {"detector": detector, "weight_filter": weight_filter, "settle": settle, "readings": readings}
+
+class AcquisitionPipeline:
+    def __init__(self, publish, detector=None, display_interval=DISPLAY_INTERVAL, clock=time.monotonic, recorder=None, live=None, weight_filter=None, settle=None, readings=None):
+        self.publish = publish; self.detector = detector or StabilityDetector(); self.display_interval = display_interval; self.clock = clock; self.recorder = recorder; self.live = live
+        self.weight_filter = weight_filter; self.settle = settle; self.readings = readings  # readings: metrics.Counter (opsional)
+        self._last_published = None; self._last_publish_time = float("-inf"); self._pending = None
+
+    def process(self, weight, indicator_stable=None):
+        # Recorder dan live feed menerima berat mentah; yang diuji stabil dan ditampilkan adalah berat terfilter
+        now = self.clock(); raw = weight
+        if self.readings is not None: self.readings.inc()
+        if self.weight_filter is not None: weight = self.weight_filter.update(now, raw)
+        stable = self.detector.update(now, weight, indicator_stable)
+        if self.settle is not None: self.settle.update(now, weight, stable)
+        if self.recorder is not None: self.recorder.record(raw, stable, indicator_stable)
+        if self.live is not None: self.live.record(raw, stable, indicator_stable)
+        last = self._last_published
+        if last is None or stable != last.stable or round(weight, 2) != round(last.weight, 2): self._pending = WeightState(weight, stable, now)
+        else: self._pending = None  # Kembali ke nilai yang sudah tampil, tidak perlu update
+        self.flush(now)
+
+    def flush(self, now=None):
+        # Dipanggil juga secara berkala oleh worker agar perubahan terakhir tidak tertahan saat data berhenti
+        if self._pending is None: return
+        now = self.clock() if now is None else now
+        if now - self._last_publish_time < self.display_interval: return
+        state = self._pending; self._pending = None; self._last_published = state; self._last_publish_time = now
+        self.publish(state)
+
+class SimulatedScale:
+    def __init__(self, publish, replay=None, live=None, **options):
+        self.is_running = True; self.base_weight = 12500.0; self.stability_counter = 0; self.replay = replay; self.replay_time = 0.0; self.live = live
+        # Saat replay, jam pipeline = timestamp rekaman, jadi deteksi stabil sama dengan aslinya berapa pun kecepatannya
+        self.pipeline = AcquisitionPipeline(publish, clock=(lambda: self.replay_time) if replay is not None else time.monotonic, live=live, **options)
+    def run(self):
+        try:
+            if self.replay is not None: self.run_replay(); return
+            self.run_random()
+        finally:
+            if self.live is not None: self.live.close()
+    def run_random(self):
+        while self.is_running:
+            if self.stability_counter < 10: simulated_weight = self.base_weight + random.uniform(-1.5, 1.5)
+            else: simulated_weight = self.base_weight + random.uniform(-5.0, 5.0)
+            self.pipeline.process(simulated_weight); self.stability_counter = (self.stability_counter + 1) % 16; time.sleep(0.5)
+    def run_replay(self):
+        # replay: generator (jeda, TraceSample) dari weight_recorder.replay_samples
+        for delay, sample in self.replay:
+            if not self.is_running: break
+            if delay: time.sleep(delay)
+            self.replay_time = sample.timestamp; self.pipeline.process(sample.weight, sample.indicator_stable)
+        self.pipeline.flush()
+    def stop(self): self.is_running = False
+
+class SerialScale:
+    def __init__(self, publish, port, baudrate, parser=None, recorder=None, on_error=None, live=None, scale_id=None, **options):
+        self.port = port; self.baudrate = baudrate; self.parser = parser or create_parser({}); self.recorder = recorder; self.on_error = on_error or print; self.live = live
+        # Lama ser.read() (termasuk menunggu byte, maks. timeout) dan lama parse + pipeline untuk setiap potongan byte
+        labels = {"scale": scale_id if scale_id is not None else port}
+        self.read_seconds = METRICS.histogram("serial_read_seconds", "Duration of each serial port read call", **labels)
+        self.process_seconds = METRICS.histogram("serial_process_seconds", "Time to parse a serial chunk and run the acquisition pipeline", **labels)
+        self.bytes_read = METRICS.counter("serial_bytes_total", "Bytes read from the serial port", **labels)
+        self.pipeline = AcquisitionPipeline(publish, recorder=recorder, live=live, **options); self.is_running = True; self.ser = None
+    def run(self):
+        try: self.read_serial()
+        finally:
+            if self.live is not None: self.live.close()
+    def read_serial(self):
+        import serial
+        # Timeout pendek agar update yang tertahan tetap dikirim (flush) walaupun indikator berhenti mengirim
+        try: self.ser = serial.Serial(self.port, self.baudrate, timeout=0.05)
+        except serial.SerialException as e: self.on_error(f"Gagal terhubung ke port {self.port}.\nPastikan kabel terhubung dan port sudah benar."); return
+        while self.is_running and self.ser.isOpen():
+            try:
+                # Baca semua byte yang tersedia; parser yang menentukan batas frame (tidak harus newline)
+                started = time.perf_counter(); chunk = self.ser.read(self.ser.in_waiting or 1); read_done = time.perf_counter()
+                if chunk:
+                    self.bytes_read.inc(len(chunk))
+                    for reading in self.parser.feed(chunk): self.pipeline.process(reading.weight, reading.stable)
+                self.pipeline.flush(); self.read_seconds.observe(read_done - started)
+                if chunk: self.process_seconds.observe(time.perf_counter() - read_done)
+            except serial.SerialException: self.on_error("Koneksi ke timbangan terputus."); break
+            except Exception as e: print(f"Error saat membaca data: {e}")
+        if self.ser and self.ser.isOpen(): self.ser.close()
+        if self.recorder is not None: self.recorder.close()
+    def stop(self): self.is_running = False
+
+def create_scale_source(scale, publish, on_error=None):
+    # --- PILIH MODE TIMBANGAN (per timbangan) ---
+    # Set "simulator": true di config.json (atau di entri "scales") untuk menjalankan tanpa timbangan fisik.
+    # "simulator_replay": {"segment": "recordings/weights_....wrec", "speed": 10} memutar ulang rekaman (1x-100x).
+    # "filter" dan "stability" (lihat weight_filters.py dan create_detector) berlaku untuk timbangan fisik maupun simulator.
+    options = pipeline_options(scale)
+    if scale.get("simulator", False):
+        replay = scale.get("simulator_replay")
+        if replay and replay.get("segment"):
+            print(f">>> [{scale['name']}] MENJALANKAN SIMULATOR: REPLAY {replay['segment']} ({replay.get('speed', 1.0)}x) <<<")
+            return SimulatedScale(publish, replay=replay_samples(replay["segment"], replay.get("speed", 1.0)), live=create_live_writer(scale), **options)
+        print(f">>> [{scale['name']}] MENJALANKAN DALAM MODE SIMULATOR <<<")
+        return SimulatedScale(publish, live=create_live_writer(scale), **options)
+    port = scale.get("port", "COM1"); baudrate = scale.get("baudrate", 9600); parser = create_parser(scale)
+    print(f">>> [{scale['name']}] MENCOBA KONEKSI KE TIMBANGAN FISIK di {port} ({baudrate} baud, protokol {parser.name}) <<<")
+    return SerialScale(publish, port, baudrate, parser=parser, recorder=create_recorder(scale), on_error=on_error, live=create_live_writer(scale), scale_id=scale.get("id"), **options)
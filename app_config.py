@@ -0,0 +1,42 @@
+# File: app_config.py (Membaca config.json; dipakai GUI dan layanan headless, tidak bergantung pada Qt)
+#
+# config.json bisa berisi daftar "scales", mis. jembatan masuk dan keluar:
+#   "scales": [
+#       {"id": "IN",  "name": "Inbound",  "port": "COM1", "baudrate": 9600, "protocol": "st_gs"},
+#       {"id": "OUT", "name": "Outbound", "port": "COM2", "baudrate": 9600, "protocol": "toledo_continuous"}
+#   ]
+# Tanpa "scales", port/baudrate/protocol di level atas dipakai sebagai satu timbangan (perilaku lama).
+
+import json
+import os
+
+CONFIG_FILE = "config.json"
+DEFAULT_SCALE_ID = "1"
+SCALE_KEYS = ("port", "baudrate", "protocol", "protocol_options", "simulator", "simulator_replay", "recording", "remote", "remote_token", "live_feed", "filter", "stability")
+
+def load_config(path=CONFIG_FILE):
+    """Membaca file config.json dan mengembalikan pengaturannya."""
+    try:
+        with open(path, 'r') as f:
+            config = json.load(f)
+            # Pastikan nilai baudrate adalah integer
+            config['baudrate'] = int(config.get('baudrate', 9600))
+            return config
+    except (FileNotFoundError, json.JSONDecodeError):
+        # Jika file tidak ada atau rusak, kembalikan pengaturan default
+        return {"port": "COM1", "baudrate": 9600}
+
+def load_scales(config):
+    # Mengembalikan list dict konfigurasi per timbangan; kunci yang tidak diisi diwarisi dari level atas config
+    defaults = {key: config[key] for key in SCALE_KEYS if key in config}
+    entries = config.get("scales") or [{"id": DEFAULT_SCALE_ID, "name": "Scale 1"}]
+    scales = []; seen = set()
+    for index, entry in enumerate(entries, start=1):
+        scale = {**defaults, **entry}; scale["id"] = str(scale.get("id", index)); scale.setdefault("name", f"Scale {scale['id']}")
+        if scale["id"] in seen: print(f"ID timbangan '{scale['id']}' dipakai dua kali, entri kedua diabaikan."); continue
+        seen.add(scale["id"]); scale["baudrate"] = int(scale.get("baudrate", 9600))
+        # Rekaman per timbangan disimpan di subfolder masing-masing agar trace tidak tercampur
+        if len(entries) > 1:
+            recording = dict(scale.get("recording", {})); recording["directory"] = os.path.join(recording.get("directory", "recordings"), scale["id"]); scale["recording"] = recording
+        scales.append(scale)
+    return scales
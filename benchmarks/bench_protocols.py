@@ -0,0 +1,58 @@
+# File: benchmarks/bench_protocols.py (Microbenchmark parser protokol indikator: frame/detik)
+#
+# Contoh:
+#   python benchmarks/bench_protocols.py                      -> semua protokol, stream sintetis
+#   python benchmarks/bench_protocols.py --protocol st_gs --capture rekaman_com1.bin
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from indicator_protocols import PROTOCOLS
+
+def synthetic_stream(parser_class, frames, seed=42):
+    # Meniru truk naik ke jembatan: berat naik, bergoyang, lalu stabil
+    rng = random.Random(seed); chunks = []; weight = 0.0
+    for i in range(frames):
+        target = 12500.0 if (i // 200) % 2 else 0.0
+        weight += (target - weight) * 0.2 + rng.uniform(-3.0, 3.0)
+        chunks.append(parser_class.encode(round(weight, 1), abs(target - weight) < 5.0))
+    return b"".join(chunks)
+
+def split_like_serial(stream, seed=42):
+    # Serial.read() mengembalikan potongan dengan ukuran acak, tidak selalu pas satu frame
+    rng = random.Random(seed); chunks = []; i = 0
+    while i < len(stream):
+        size = rng.randint(1, 64); chunks.append(stream[i:i + size]); i += size
+    return chunks
+
+def bench(name, stream, repeat):
+    chunks = split_like_serial(stream); best = None; frames = 0
+    for _ in range(repeat):
+        parser = PROTOCOLS[name](); start = time.perf_counter(); frames = 0
+        for chunk in chunks: frames += len(parser.feed(chunk))
+        elapsed = time.perf_counter() - start; best = elapsed if best is None else min(best, elapsed)
+    return {"protocol": name, "frames": frames, "bytes": len(stream), "seconds": best, "frames_per_second": frames / best if best else 0.0}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark throughput parser protokol indikator.")
+    parser.add_argument("--protocol", choices=sorted(PROTOCOLS), help="Hanya protokol ini (default: semua)")
+    parser.add_argument("--capture", help="File byte mentah hasil rekaman port serial (butuh --protocol)")
+    parser.add_argument("--frames", type=int, default=100_000, help="Jumlah frame stream sintetis")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+    if args.capture and not args.protocol: parser.error("--capture membutuhkan --protocol")
+    results = []
+    for name in ([args.protocol] if args.protocol else sorted(PROTOCOLS)):
+        if args.capture:
+            with open(args.capture, "rb") as f: stream = f.read()
+        else: stream = synthetic_stream(PROTOCOLS[name], args.frames)
+        result = bench(name, stream, args.repeat); results.append(result)
+        print(f"{name:20s} {result['frames']:>9d} frames  {result['bytes']:>10d} bytes  {result['frames_per_second']:>12,.0f} frames/s")
+    return results
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# File: benchmarks/evaluate_filters.py (Bandingkan pengaturan filter berat dan kriteria stabil secara offline)
+#
+# Memutar ulang rekaman berat (.wrec dari weight_recorder.py) atau trace sintetis (truk naik, trailer bergoyang,
+# noise, spike, dengan beban sebenarnya diketahui) melalui AcquisitionPipeline dengan setiap kandidat pengaturan, lalu
+# melaporkan per pengaturan: berapa penimbangan yang mencapai STABLE, waktu tunggu sampai STABLE (median/p90/maks),
+# dan selisih berat saat STABLE terhadap berat acuan. Acuan = beban sebenarnya (sintetis) atau median pembacaan mentah
+# di 30% akhir waktu truk di atas jembatan (rekaman). "Premature" = STABLE dengan selisih > --max-error kg.
+#
+# Contoh:
+#   python benchmarks/evaluate_filters.py recordings/                  -> semua segmen rekaman di folder
+#   python benchmarks/evaluate_filters.py --synthetic 200 --rate 2     -> 200 penimbangan sintetis, 2 pembacaan/detik
+#   python benchmarks/evaluate_filters.py --synthetic 100 --candidates kandidat.json --json hasil.json
+# kandidat.json: [{"label": "kalman-3", "filter": {"type": "kalman", "measurement_noise_kg": 3}, "stability": {"tolerance_kg": 3}}]
+# Isi "filter" dan "stability" yang terbaik bisa langsung disalin ke konfigurasi timbangan di config.json.
+
+import argparse
+import json
+import math
+import os
+import random
+import statistics
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from acquisition import AcquisitionPipeline, SettleTimer, SETTLE_MIN_LOAD_KG, create_detector
+from weight_filters import create_weight_filter, describe
+from weight_recorder import Segment, list_segments
+
+DEFAULT_MAX_ERROR_KG = 10.0  # Satu divisi jembatan timbang yang umum
+REFERENCE_TAIL = 0.3
+MIN_WEIGH_SECONDS = 3.0  # Berat di atas min_load lebih singkat dari ini = spike, bukan truk
+CANDIDATES = [
+    {"label": "raw", "filter": None, "stability": {}},
+    {"label": "raw rel", "filter": None, "stability": {"relative_tolerance": 0.0002}},
+    {"label": "median5", "filter": {"type": "median", "window": 5}, "stability": {}},
+    {"label": "median5 rel", "filter": {"type": "median", "window": 5}, "stability": {"relative_tolerance": 0.0002}},
+    {"label": "ema", "filter": {"type": "ema"}, "stability": {}},
+    {"label": "ema rel", "filter": {"type": "ema"}, "stability": {"relative_tolerance": 0.0002}},
+    {"label": "kalman", "filter": {"type": "kalman"}, "stability": {}},
+    {"label": "kalman rel", "filter": {"type": "kalman"}, "stability": {"relative_tolerance": 0.0002}},
+    {"label": "kalman 1s", "filter": {"type": "kalman"}, "stability": {"window_seconds": 1.0, "min_readings": 3}},
+]
+
+def synthetic_trace(count, rate, seed=42):
+    # (samples, weighs): samples = [(timestamp, berat, None)], weighs = [(awal, akhir, beban sebenarnya)] per penimbangan
+    rng = random.Random(seed); samples = []; weighs = []; t = 0.0; step = 1.0 / rate
+    def add(weight): nonlocal t; samples.append((t, weight + rng.gauss(0.0, 1.5) + (rng.choice((-1, 1)) * rng.uniform(150, 400) if rng.random() < 0.01 else 0.0), None)); t += step
+    for _ in range(count):
+        load = round(rng.uniform(6000, 45000), -1)
+        amplitude = rng.uniform(20, 150); decay = rng.uniform(1.5, 6.0); frequency = rng.uniform(0.3, 0.9); phase = rng.uniform(0, 2 * math.pi)
+        for _ in range(int(5 * rate)): add(0.0)
+        ramp = int(rng.uniform(1.5, 3.0) * rate); start = len(samples)
+        for i in range(ramp): add(load * (i + 1) / ramp)
+        for i in range(int(rng.uniform(20, 35) * rate)):
+            elapsed = i * step; add(load + amplitude * math.exp(-elapsed / decay) * math.sin(2 * math.pi * frequency * elapsed + phase))
+        for i in range(ramp): add(load * (ramp - i - 1) / ramp)
+        weighs.append((start, len(samples), load))
+    return samples, weighs
+
+def recorded_traces(paths):
+    # Satu trace per segmen .wrec; folder = semua segmen di dalamnya
+    for path in paths:
+        for segment_path in (list_segments(path) if os.path.isdir(path) else [path]):
+            with Segment(segment_path) as segment: yield segment_path, [(s.timestamp, s.weight, s.indicator_stable) for s in segment.samples()]
+
+def split_weighs(samples, min_load):
+    # [(awal, akhir, None)] saat jembatan berisi (berat >= min_load minimal MIN_WEIGH_SECONDS); acuan dihitung dari rekaman
+    weighs = []; start = None
+    for index, (_, weight, _) in enumerate(samples + [(None, 0.0, None)]):
+        if abs(weight) >= min_load and start is None: start = index
+        elif abs(weight) < min_load and start is not None:
+            if samples[index - 1][0] - samples[start][0] >= MIN_WEIGH_SECONDS: weighs.append((start, index, None))
+            start = None
+    return weighs
+
+def evaluate(samples, candidate, weighs=None):
+    # Hasil per penimbangan: (detik sampai STABLE atau None, selisih kg atau None)
+    stability = candidate.get("stability") or {}; min_load = float(stability.get("min_load_kg", SETTLE_MIN_LOAD_KG))
+    settled = []; now = [0.0]
+    timer = SettleTimer(lambda seconds, weight: settled.append((now[0], seconds, weight)), min_load)
+    pipeline = AcquisitionPipeline(lambda state: None, detector=create_detector(stability), clock=lambda: now[0], weight_filter=create_weight_filter(candidate.get("filter")), settle=timer)
+    for timestamp, weight, indicator_stable in samples: now[0] = timestamp; pipeline.process(weight, indicator_stable)
+    results = []
+    for start, stop, load in (weighs if weighs is not None else split_weighs(samples, min_load)):
+        begin = samples[start][0]; end = samples[stop - 1][0]
+        hit = next((s for s in settled if begin <= s[0] <= end), None)
+        if hit is None: results.append((None, None)); continue
+        if load is not None: reference = load
+        else: reference = statistics.median(w for _, w, _ in samples[start + int((stop - start) * (1 - REFERENCE_TAIL)):stop])
+        results.append((hit[1], hit[2] - reference))
+    return results
+
+def summarize(label, candidate, results, max_error):
+    times = sorted(r[0] for r in results if r[0] is not None); errors = [abs(r[1]) for r in results if r[1] is not None]
+    def percentile(p): return times[min(len(times) - 1, int(round(p / 100 * (len(times) - 1))))] if times else None
+    return {"label": label, "filter": describe(create_weight_filter(candidate.get("filter"))), "stability": candidate.get("stability") or {}, "weighs": len(results), "settled": len(times),
+            "median_seconds": percentile(50), "p90_seconds": percentile(90), "max_seconds": times[-1] if times else None,
+            "mean_error_kg": statistics.fmean(errors) if errors else None, "max_error_kg": max(errors) if errors else None, "premature": sum(e > max_error for e in errors)}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bandingkan filter berat dan kriteria stabil pada rekaman atau trace sintetis.")
+    parser.add_argument("paths", nargs="*", help="File .wrec atau folder rekaman (default: --synthetic)")
+    parser.add_argument("--synthetic", type=int, default=0, help="Jumlah penimbangan sintetis (default 100 jika tanpa rekaman)")
+    parser.add_argument("--rate", type=float, default=2.0, help="Pembacaan per detik untuk trace sintetis")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--candidates", help="File JSON berisi daftar kandidat (label, filter, stability) pengganti daftar bawaan")
+    parser.add_argument("--max-error", type=float, default=DEFAULT_MAX_ERROR_KG, help="Selisih (kg) di atas ini dihitung premature")
+    parser.add_argument("--json", help="Simpan hasil ke file JSON")
+    args = parser.parse_args(argv)
+    if args.candidates:
+        with open(args.candidates) as f: candidates = json.load(f)
+    else: candidates = CANDIDATES
+    traces = []
+    if args.paths: traces.extend((name, samples, None) for name, samples in recorded_traces(args.paths))
+    if args.synthetic or not args.paths: traces.append(("synthetic", *synthetic_trace(args.synthetic or 100, args.rate, args.seed)))
+    if not traces: parser.error("Tidak ada rekaman yang ditemukan")
+    summaries = []
+    print(f"{'candidate':14s} {'settled':>11s} {'median s':>9s} {'p90 s':>7s} {'max s':>7s} {'mean err':>9s} {'max err':>9s} {'premature':>9s}")
+    for index, candidate in enumerate(candidates):
+        label = candidate.get("label") or f"#{index + 1}"; results = []
+        for _, samples, weighs in traces: results.extend(evaluate(samples, candidate, weighs))
+        summary = summarize(label, candidate, results, args.max_error); summaries.append(summary)
+        show = lambda value, fmt: format(value, fmt) if value is not None else "-".rjust(int(fmt.split(".")[0]))
+        print(f"{label:14s} {summary['settled']:>5d}/{summary['weighs']:<5d} {show(summary['median_seconds'], '9.1f')} {show(summary['p90_seconds'], '7.1f')} {show(summary['max_seconds'], '7.1f')} "
+              f"{show(summary['mean_error_kg'], '9.1f')} {show(summary['max_error_kg'], '9.1f')} {summary['premature']:>9d}")
+    if args.json:
+        with open(args.json, "w") as f: json.dump({"traces": [name for name, _, _ in traces], "max_error_kg": args.max_error, "results": summaries}, f, indent=2)
+        print(f"Hasil disimpan ke {args.json}")
+    return summaries
+
+if __name__ == "__main__":
+    main()
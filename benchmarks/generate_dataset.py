@@ -0,0 +1,91 @@
+# File: benchmarks/generate_dataset.py (Dataset transaksi sintetis untuk benchmark, seeded & reproducible)
+#
+# Contoh:
+#   python benchmarks/generate_dataset.py --rows 100000 --output bench_100k.db
+#   python benchmarks/generate_dataset.py --rows 1000000 --years 5 --seed 7 --output bench_1m.db
+#
+# Plat nomor dan jenis barang dibuat miring (Zipf): sedikit truk langganan datang sangat sering, banyak truk
+# hanya sesekali. Transaksi tersebar di jam kerja selama beberapa tahun; sebagian kecil yang terbaru masih PENDING.
+
+import argparse
+import itertools
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database import init_db
+
+GOODS_TYPES = ["BILLET 100 X 7650", "PIPA", "TUBING 3 1/2 J55 EU", "SEMEN", "PASIR", "BATU SPLIT", "BATU BARA", "KAYU LOG", "CPO", "TBS SAWIT", "PUPUK", "BESI BETON"]
+LOCATIONS = ["BATAM", "TANJUNG UBAN", "KABIL", "SEKUPANG", "BATU AMPAR", "TANJUNG PINANG", "BINTAN", "KARIMUN", "DUMAI", "PEKANBARU"]
+DRIVERS = ["Budi", "Andi", "Slamet", "Joko", "Rudi", "Agus", "Hendra", "Yusuf", "Rahmat", "Dedi", "Irwan", "Sutrisno"]
+PLATE_PREFIXES = ["BP", "BM", "BA", "B", "BK"]
+PENDING_RATIO = 0.02
+INSERT_BATCH = 10_000
+
+def _zipf_weights(count, exponent): return [1.0 / (rank ** exponent) for rank in range(1, count + 1)]
+
+def generate_rows(rows, years=3, seed=42, end_date=None):
+    # Generator tuple kolom transaksi, urut kronologis (sama seperti data asli yang tumbuh per hari)
+    rng = random.Random(seed); end_date = end_date or date.today(); days = max(1, int(years * 365))
+    plates = [f"{rng.choice(PLATE_PREFIXES)} {rng.randint(1, 9999)} {''.join(rng.choices('ABCDEFGHJKLMNPRSTUVWXYZ', k=rng.randint(1, 3)))}" for _ in range(max(50, rows // 40))]
+    plate_weights = list(itertools.accumulate(_zipf_weights(len(plates), 0.6))); goods_weights = list(itertools.accumulate(_zipf_weights(len(GOODS_TYPES), 0.8)))
+    per_day = rows / days; pending_from = rows - max(1, int(rows * PENDING_RATIO)); produced = 0
+    for day_index in range(days):
+        day = end_date - timedelta(days=days - 1 - day_index); day_str = day.isoformat()
+        count = int(per_day * (day_index + 1)) - int(per_day * day_index)
+        if day_index == days - 1: count = rows - produced
+        # Jam kedatangan 06:00-20:00, diurutkan agar nomor urut harian sesuai urutan waktu
+        arrivals = sorted(rng.randint(6 * 3600, 20 * 3600) for _ in range(count))
+        for seq, seconds in enumerate(arrivals, start=1):
+            first_ts = f"{day_str} {seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+            goods = rng.choices(GOODS_TYPES, cum_weights=goods_weights)[0]
+            gross = round(rng.uniform(14000, 42000), 1); tare = round(rng.uniform(7000, 13000), 1)
+            loaded_in = rng.random() < 0.6  # Masuk bermuatan (gross dulu) atau masuk kosong (tare dulu)
+            first_kg = gross if loaded_in else tare
+            if produced >= pending_from:
+                status, second_kg, net, second_ts, remake, deduction = 'PENDING', None, None, None, '', 0.0
+            else:
+                dwell = rng.randint(5 * 60, 90 * 60); second_seconds = min(seconds + dwell, 24 * 3600 - 1)
+                second_ts = f"{day_str} {second_seconds // 3600:02d}:{second_seconds // 60 % 60:02d}:{second_seconds % 60:02d}"
+                deduction = round(rng.uniform(5, 150), 2) if rng.random() < 0.15 else 0.0
+                status, second_kg, net = 'COMPLETED', tare if loaded_in else gross, round(gross - tare - deduction, 2)
+                remake = f"(Deduction : {deduction:,.2f} KG.)" if deduction else rng.choice(['', '', '', 'basah', 'muatan campur', 'segel OK'])
+            yield (f"W{day_str[2:4]}{day_str[5:7]}{day_str[8:10]}{seq:04d}", rng.choices(plates, cum_weights=plate_weights)[0], goods, rng.choice(DRIVERS), '', '',
+                   str(rng.randint(1, 40)), status, first_kg, second_kg, net, first_ts, second_ts, day_str, rng.choice(LOCATIONS), rng.choice(LOCATIONS), remake, deduction)
+            produced += 1
+
+def generate_dataset(path, rows, years=3, seed=42, end_date=None):
+    # Membuat DB baru berskema lengkap (init_db) lalu mengisi transaksi lewat executemany per batch
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix): os.remove(path + suffix)
+    conn = init_db(path); started = time.perf_counter()
+    query = ("INSERT INTO transactions (transaction_id, plate_number, goods_type, driver_name, vendor, customer, quantity, status, first_weigh_kg, second_weigh_kg, net_weigh_kg, "
+             "first_weigh_timestamp, second_weigh_timestamp, weigh_date, goods_origin, goods_destination, remake, deduction_kg) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)")
+    source = generate_rows(rows, years, seed, end_date)
+    while True:
+        batch = list(itertools.islice(source, INSERT_BATCH))
+        if not batch: break
+        conn.executemany(query, batch); conn.commit()
+    # Nomor urut harian harus ikut, kalau tidak create_first_weigh akan membuat ID yang bentrok
+    conn.execute("INSERT OR REPLACE INTO daily_sequence (day, last_seq) SELECT weigh_date, COUNT(*) FROM transactions GROUP BY weigh_date")
+    # Log perubahan dari pengisian massal tidak relevan untuk benchmark
+    conn.execute("DELETE FROM transaction_changes"); conn.commit()
+    conn.execute("ANALYZE"); conn.execute("PRAGMA wal_checkpoint(TRUNCATE)"); conn.close()
+    return time.perf_counter() - started
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Buat DB transaksi sintetis untuk benchmark.")
+    parser.add_argument("--rows", type=int, default=100_000, help="Jumlah transaksi (1k - 1M)")
+    parser.add_argument("--years", type=float, default=3, help="Rentang tanggal data, dalam tahun")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--end-date", type=date.fromisoformat, help="Tanggal transaksi terakhir, YYYY-MM-DD (default: hari ini)")
+    parser.add_argument("--output", default="bench_dataset.db")
+    args = parser.parse_args(argv)
+    elapsed = generate_dataset(args.output, args.rows, args.years, args.seed, args.end_date)
+    print(f"{args.rows:,} transactions written to {args.output} in {elapsed:.1f} s ({args.rows / elapsed:,.0f} rows/s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+# File: benchmarks/run_benchmarks.py (Suite benchmark jalur-jalur panas, hasil dalam file JSON)
+#
+# Contoh:
+#   python benchmarks/run_benchmarks.py --sizes 1000,100000 --output results_v2.json
+#   python benchmarks/run_benchmarks.py --sizes 1000000 --compare results_v1.json
+#
+# Dataset dibuat sekali oleh generate_dataset.py (seed & tanggal akhir tetap) lalu dipakai ulang dari --workdir.
+# Benchmark tulis dijalankan pada salinan DB agar dataset tetap identik antar run. Qt dijalankan offscreen.
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT); sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import database
+from generate_dataset import generate_dataset
+from acquisition import AcquisitionPipeline
+from live_weight_shm import LiveWeightWriter
+import report_analytics
+
+END_DATE = date(2025, 12, 31)  # Tetap, agar dataset dan rentang query sama di setiap mesin/hari
+REGRESSION_THRESHOLD = 1.2
+REGRESSION_MIN_MS = 0.1
+
+def measure(func, repeat=5, warmup=1):
+    for _ in range(warmup): func()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter(); func(); timings.append(time.perf_counter() - start)
+    return {"min_ms": min(timings) * 1000, "median_ms": statistics.median(timings) * 1000, "max_ms": max(timings) * 1000, "repeat": repeat}
+
+class Suite:
+    def __init__(self, repeat): self.repeat = repeat; self.results = []
+
+    def run(self, name, size, func, repeat=None, items=None, warmup=1):
+        result = {"name": name, "size": size, **measure(func, repeat or self.repeat, warmup)}
+        if items: result["items"] = items; result["items_per_second"] = items / (result["median_ms"] / 1000) if result["median_ms"] else 0.0
+        self.results.append(result)
+        print(f"{name:38s} {size:>9,d}  median {result['median_ms']:10.2f} ms  min {result['min_ms']:10.2f} ms" + (f"  {result['items_per_second']:>12,.0f} items/s" if items else ""))
+        return result
+
+def bench_queries(suite, conn, size):
+    today = END_DATE.isoformat(); month_ago = (END_DATE - timedelta(days=30)).isoformat(); year_ago = (END_DATE - timedelta(days=365)).isoformat()
+    frequent_plate = conn.execute("SELECT plate_number FROM transactions GROUP BY plate_number ORDER BY COUNT(*) DESC LIMIT 1").fetchone()[0]
+    pending_plate = conn.execute("SELECT plate_number FROM transactions WHERE status = 'PENDING' LIMIT 1").fetchone()
+    suite.run("get_filtered_transactions_30d", size, lambda: database.get_filtered_transactions(conn, month_ago, today))
+    suite.run("get_filtered_transactions_30d_goods", size, lambda: database.get_filtered_transactions(conn, month_ago, today, "PIPA"))
+    suite.run("get_transactions_page_first", size, lambda: database.get_transactions_page(conn, year_ago, today, "", None, 200))
+    deep_key = conn.execute("SELECT weigh_date, first_weigh_timestamp, id FROM transactions WHERE weigh_date BETWEEN ? AND ? ORDER BY weigh_date DESC, first_weigh_timestamp DESC, id DESC LIMIT 1 OFFSET 5000", (year_ago, today)).fetchone()
+    if deep_key: suite.run("get_transactions_page_deep", size, lambda: database.get_transactions_page(conn, year_ago, today, "", tuple(deep_key), 200))
+    suite.run("count_filtered_transactions_1y", size, lambda: database.count_filtered_transactions(conn, year_ago, today))
+    suite.run("search_transactions_plate_1y", size, lambda: database.search_transactions(conn, year_ago, today, frequent_plate))
+    suite.run("search_transactions_prefix_all", size, lambda: database.search_transactions(conn, "0000-01-01", today, "ba"))
+    suite.run("get_rollup_summary_1y", size, lambda: database.get_rollup_summary(conn, year_ago, today))
+    if report_analytics.np is not None: suite.run("report_statistics_1y", size, lambda: report_analytics.report_statistics(conn, year_ago, today), repeat=3)
+    suite.run("find_pending_by_plate_number_hit", size, lambda: database.find_pending_by_plate_number(conn, pending_plate[0] if pending_plate else frequent_plate))
+    suite.run("find_pending_by_plate_number_miss", size, lambda: database.find_pending_by_plate_number(conn, "ZZ 0000 ZZ"))
+    suite.run("peek_next_transaction_id", size, lambda: database.peek_next_transaction_id(conn))
+
+def bench_writes(suite, path, size, count=200):
+    # Salinan DB: create_first_weigh mengalokasikan ID harian (menggantikan generate_transaction_id) lalu INSERT
+    copy_path = path + ".write.db"; shutil.copy(path, copy_path); conn = database.connect_db(copy_path)
+    data = {'plate_number': 'BENCH 1', 'goods_type': 'PIPA', 'goods_origin': 'BATAM', 'goods_destination': 'KABIL', 'driver_name': 'Budi', 'vendor': '', 'customer': '', 'quantity': '1', 'remake': '', 'weight': 25000.0}
+    def create_many():
+        for i in range(count): database.create_first_weigh(conn, dict(data, plate_number=f"BENCH {i}"))
+    suite.run("create_first_weigh", size, create_many, repeat=3, items=count)
+    pending = [row['transaction_id'] for row in conn.execute("SELECT transaction_id FROM transactions WHERE plate_number LIKE 'BENCH %' AND status = 'PENDING' LIMIT ?", (count,))]
+    def complete_all():
+        for transaction_id in pending: database.complete_second_weigh(conn, transaction_id, 9000.0, 16000.0, "")
+    # Hanya bisa sekali: setelah itu transaksi sudah COMPLETED
+    suite.run("complete_second_weigh", size, complete_all, repeat=1, warmup=0, items=len(pending))
+    conn.close()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(copy_path + suffix): os.remove(copy_path + suffix)
+
+def bench_stability(suite, size, readings=100_000):
+    # Logika stabil yang dulu ada di update_berat_display, sekarang AcquisitionPipeline (dipanggil per pembacaan)
+    clock = [0.0]
+    def run(live=None):
+        pipeline = AcquisitionPipeline(lambda state: None, clock=lambda: clock[0], live=live)
+        for i in range(readings):
+            clock[0] = i * 0.02; pipeline.process(12500.0 + (i % 7) * 0.5 if (i // 500) % 2 else 0.0)
+    suite.run("acquisition_pipeline_process", size, run, repeat=3, items=readings)
+    # Sama, plus setiap pembacaan ditulis ke segmen shared memory live feed
+    live = LiveWeightWriter(f"weighing_live_bench_{os.getpid()}")
+    try: suite.run("acquisition_pipeline_process_live_feed", size, lambda: run(live), repeat=3, items=readings)
+    finally: live.close()
+
+def bench_gui(suite, conn, path, size):
+    from PySide6.QtWidgets import QApplication, QTableView
+    from PySide6.QtCore import QModelIndex
+    from transaction_table_model import TransactionTableModel, format_report_date
+    from pdf_export import PdfExportTask
+    app = QApplication.instance() or QApplication([])
+    headers = ["Transaction ID", "Date", "Vehicle Plate No.", "Goods Type", "Origin", "Destination", "Status", "Gross", "Tare", "Net", "Quantity", "Remake"]
+    start = (END_DATE - timedelta(days=30)).isoformat(); end = END_DATE.isoformat()
+    model = TransactionTableModel(headers, format_report_date); view = QTableView(); view.setModel(model); view.resize(1200, 700); view.show()
+    # fetch_page sinkron: yang diukur biaya model + view, bukan antrean DatabaseService
+    source = lambda after, limit, callback: callback(database.get_transactions_page(conn, start, end, "", after, limit))
+    def first_page(): model.set_source(source); app.processEvents()
+    suite.run("table_model_first_page_30d", size, first_page)
+    def populate_all():
+        model.set_source(source)
+        while model.canFetchMore(QModelIndex()): model.fetchMore(QModelIndex())
+        view.scrollToBottom(); app.processEvents()
+    suite.run("table_model_populate_all_30d", size, populate_all, repeat=3, items=database.count_filtered_transactions(conn, start, end))
+    view.close()
+    week_start = (END_DATE - timedelta(days=6)).isoformat(); rows = database.count_filtered_transactions(conn, week_start, end)
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, "report.pdf")
+        suite.run("export_pdf_7d", size, lambda: PdfExportTask(pdf_path, week_start, end, period_label="bench", db_path=path).run(), repeat=1, warmup=0, items=rows)
+
+def git_revision():
+    try: return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except Exception: return None
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f: baseline = {(r["name"], r["size"]): r for r in json.load(f)["results"]}
+    regressions = 0
+    print(f"\nComparison with {baseline_path} (median, >{REGRESSION_THRESHOLD:.0%} = regression):")
+    for result in results:
+        old = baseline.get((result["name"], result["size"]))
+        if not old or not old["median_ms"]: continue
+        # Selisih di bawah REGRESSION_MIN_MS dianggap noise (query mikrodetik mudah berfluktuasi 20%)
+        ratio = result["median_ms"] / old["median_ms"]; flag = "  REGRESSION" if ratio > REGRESSION_THRESHOLD and result["median_ms"] - old["median_ms"] > REGRESSION_MIN_MS else ""
+        regressions += bool(flag)
+        print(f"{result['name']:38s} {result['size']:>9,d}  {old['median_ms']:10.2f} -> {result['median_ms']:10.2f} ms  x{ratio:5.2f}{flag}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark query DB, tabel Qt, export PDF dan deteksi stabil.")
+    parser.add_argument("--sizes", default="1000,100000", help="Jumlah transaksi dataset, dipisah koma (1000 - 1000000)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "weighing_bench"), help="Lokasi cache dataset")
+    parser.add_argument("--regenerate", action="store_true", help="Buat ulang dataset walaupun sudah ada")
+    parser.add_argument("--skip-gui", action="store_true", help="Lewati benchmark tabel Qt dan export PDF")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="File hasil sebelumnya untuk dibandingkan")
+    args = parser.parse_args(argv)
+    os.makedirs(args.workdir, exist_ok=True); suite = Suite(args.repeat)
+    for size in (int(s) for s in args.sizes.split(",")):
+        path = os.path.join(args.workdir, f"bench_{size}_{args.seed}_{END_DATE:%Y%m%d}_v{database.SCHEMA_VERSION}.db")
+        if args.regenerate or not os.path.exists(path):
+            elapsed = generate_dataset(path, size, years=3, seed=args.seed, end_date=END_DATE)
+            print(f"Dataset {size:,} rows generated in {elapsed:.1f} s -> {path}")
+        conn = database.connect_db(path)
+        bench_queries(suite, conn, size)
+        if not args.skip_gui: bench_gui(suite, conn, path, size)
+        conn.close()
+        bench_writes(suite, path, size)
+    bench_stability(suite, 0)  # Tidak bergantung pada dataset (size 0)
+    report = {"meta": {"created": datetime.now().isoformat(timespec="seconds"), "git_revision": git_revision(), "python": platform.python_version(), "sqlite": sqlite3.sqlite_version,
+                       "platform": platform.platform(), "machine": platform.machine(), "seed": args.seed, "end_date": END_DATE.isoformat(), "schema_version": database.SCHEMA_VERSION},
+              "results": suite.results}
+    with open(args.output, "w") as f: json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+    if args.compare: return 1 if compare(suite.results, args.compare) else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
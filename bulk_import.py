@@ -0,0 +1,169 @@
+# File: bulk_import.py (Import massal tiket dari software timbangan lama: CSV atau Excel)
+#
+# Baris sumber di-stream (tidak dimuat semua ke memori), divalidasi dan dipetakan ke kolom transactions, lalu
+# ditulis per batch besar dengan executemany dalam satu transaksi (database.insert_imported_batch). ID dan
+# timestamp asli dipertahankan. Index sekunder dan trigger (rollup, FTS, change log) ditunda selama import lalu
+# dibangun sekali di akhir. Posisi import disimpan bersama setiap batch, jadi import yang terputus bisa
+# dilanjutkan dengan perintah yang sama. Dipakai lewat: python weighing_cli.py import tiket_lama.csv
+#
+# Pemetaan kolom: default header yang namanya sama dengan kolom DB (huruf besar/kecil, spasi dan '_' diabaikan),
+# atau {"kolom_db": "Header Sumber", ...} lewat --mapping file.json / --map kolom_db="Header Sumber".
+# Wajib: transaction_id, plate_number, first_weigh_kg, first_weigh_timestamp. Status kosong = COMPLETED jika
+# ada berat kedua, selain itu PENDING; net kosong = selisih berat pertama dan kedua dikurangi potongan; deduction_kg kosong = dibaca dari
+# teks remake ("Deduction : x KG." / "Potongan: x KG.").
+
+import csv
+import itertools
+import os
+import time
+from datetime import date, datetime
+
+from database import IMPORT_COLUMNS, parse_deduction, begin_bulk_import, insert_imported_batch, finish_bulk_import
+
+DEFAULT_BATCH_SIZE = 20_000
+REQUIRED_FIELDS = ("transaction_id", "plate_number", "first_weigh_kg", "first_weigh_timestamp")
+IMPORT_FIELDS = tuple(column for column in IMPORT_COLUMNS if column != "weigh_date")  # weigh_date selalu dari timestamp pertama
+TIMESTAMP_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M:%S", "%Y/%m/%d %H:%M:%S", "%Y/%m/%d %H:%M",
+                     "%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M", "%d-%m-%Y %H:%M:%S", "%d-%m-%Y %H:%M", "%d.%m.%Y %H:%M:%S")
+CSV_DELIMITERS = ",;\t|"
+
+class RowError(ValueError): pass
+
+class ImportStats:
+    def __init__(self, resumed_from=0):
+        self.resumed_from = resumed_from; self.rows = resumed_from; self.inserted = 0; self.duplicates = 0; self.rejected = 0; self.started = time.perf_counter()
+    @property
+    def elapsed(self): return time.perf_counter() - self.started
+    @property
+    def rate(self): return (self.rows - self.resumed_from) / self.elapsed if self.elapsed > 0 else 0.0
+
+def _key(name): return "".join(ch for ch in str(name).lower() if ch.isalnum())
+
+def read_records(path, sheet=None, delimiter=None, encoding="utf-8-sig"):
+    # (header, iterator (nomor baris, list nilai)); Excel lewat openpyxl (opsional) dalam mode read-only
+    if path.lower().endswith((".xlsx", ".xlsm")): return _read_excel(path, sheet)
+    handle = open(path, newline="", encoding=encoding)
+    if delimiter is None:
+        sample = handle.read(64 * 1024); handle.seek(0)
+        try: delimiter = csv.Sniffer().sniff(sample, delimiters=CSV_DELIMITERS).delimiter
+        except csv.Error: delimiter = ","
+    reader = csv.reader(handle, delimiter=delimiter)
+    header = next(reader, None)
+    if header is None: handle.close(); raise ValueError(f"{path} is empty.")
+    def records():
+        with handle:
+            for values in reader:
+                if any(values): yield reader.line_num, values
+    return [name.strip() for name in header], records()
+
+def _read_excel(path, sheet):
+    try: import openpyxl
+    except ImportError: raise RuntimeError("Excel import needs openpyxl (pip install openpyxl), or save the sheet as CSV.")
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    worksheet = workbook[sheet] if sheet else workbook.active
+    rows = worksheet.iter_rows(values_only=True)
+    header = next(rows, None)
+    if header is None: workbook.close(); raise ValueError(f"{path} is empty.")
+    def records():
+        try:
+            for line, values in enumerate(rows, start=2):
+                if any(value not in (None, "") for value in values): yield line, list(values)
+        finally: workbook.close()
+    return ["" if name is None else str(name).strip() for name in header], records()
+
+def resolve_mapping(header, mapping=None):
+    # kolom DB -> index kolom sumber
+    positions = {name: index for index, name in enumerate(header)}; by_key = {_key(name): index for index, name in enumerate(header)}
+    mapping = mapping or {}; resolved = {}
+    unknown = [field for field in mapping if field not in IMPORT_FIELDS]
+    if unknown: raise ValueError(f"Unknown target column(s) in mapping: {', '.join(unknown)}. Valid: {', '.join(IMPORT_FIELDS)}")
+    for field in IMPORT_FIELDS:
+        if field in mapping:
+            if mapping[field] not in positions: raise ValueError(f"Column '{mapping[field]}' (mapped to {field}) is not in the file header.")
+            resolved[field] = positions[mapping[field]]
+        elif _key(field) in by_key: resolved[field] = by_key[_key(field)]
+    missing = [field for field in REQUIRED_FIELDS if field not in resolved]
+    if missing: raise ValueError(f"No source column for {', '.join(missing)}; use --map {missing[0]}=\"<header>\".")
+    return resolved
+
+def _text(value):
+    if value is None: return ""
+    if isinstance(value, float) and value.is_integer(): value = int(value)  # Excel menyimpan angka bulat sebagai float
+    return str(value).strip()
+
+def _number(value, decimal_comma):
+    if value is None or isinstance(value, (int, float)): return value
+    text = str(value).strip().replace(" ", "").upper().removesuffix("KG")
+    if not text: return None
+    text = text.replace(".", "").replace(",", ".") if decimal_comma else text.replace(",", "")
+    try: return float(text)
+    except ValueError: raise RowError(f"'{value}' is not a number")
+
+class TimestampParser:
+    # Format yang terakhir cocok dicoba lebih dulu: satu file ekspor hampir selalu memakai satu format, jadi
+    # strptime yang gagal (mahal karena exception) hanya terjadi di baris-baris awal
+    def __init__(self, formats=TIMESTAMP_FORMATS): self.formats = list(formats)
+    def __call__(self, value):
+        if value is None or value == "": return None
+        if isinstance(value, datetime): return value.strftime("%Y-%m-%d %H:%M:%S")
+        if isinstance(value, date): return value.strftime("%Y-%m-%d 00:00:00")
+        text = str(value).strip()
+        for index, fmt in enumerate(self.formats):
+            try: parsed = datetime.strptime(text, fmt)
+            except ValueError: continue
+            if index: self.formats.insert(0, self.formats.pop(index))
+            return parsed.strftime("%Y-%m-%d %H:%M:%S")
+        raise RowError(f"'{value}' is not a recognised date/time")
+
+def convert_row(values, mapping, decimal_comma=False, parse_timestamp=None):
+    # Satu baris sumber -> tuple urutan IMPORT_COLUMNS, atau RowError dengan alasan penolakan
+    parse_timestamp = parse_timestamp or TimestampParser()
+    def raw(field):
+        index = mapping.get(field)
+        return values[index] if index is not None and index < len(values) else None
+    text = {field: _text(raw(field)) for field in ("transaction_id", "plate_number", "goods_type", "driver_name", "vendor", "customer", "quantity", "status", "goods_origin", "goods_destination", "remake", "first_scale_id", "second_scale_id")}
+    for field in ("transaction_id", "plate_number"):
+        if not text[field]: raise RowError(f"{field} is empty")
+    first_kg = _number(raw("first_weigh_kg"), decimal_comma); second_kg = _number(raw("second_weigh_kg"), decimal_comma); net_kg = _number(raw("net_weigh_kg"), decimal_comma)
+    deduction_kg = _number(raw("deduction_kg"), decimal_comma)
+    if deduction_kg is None: deduction_kg = parse_deduction(text["remake"])  # Tanpa kolom potongan: dari teks remake, sama dengan migrasi 11
+    if first_kg is None: raise RowError("first_weigh_kg is empty")
+    first_ts = parse_timestamp(raw("first_weigh_timestamp")); second_ts = parse_timestamp(raw("second_weigh_timestamp"))
+    if first_ts is None: raise RowError("first_weigh_timestamp is empty")
+    if second_ts is not None and second_ts < first_ts: raise RowError("second weigh is before first weigh")
+    status = text["status"].upper() or ("COMPLETED" if second_kg is not None else "PENDING")
+    if status not in ("PENDING", "COMPLETED"): raise RowError(f"unknown status '{text['status']}'")
+    if status == "COMPLETED":
+        if second_kg is None: raise RowError("COMPLETED without second_weigh_kg")
+        if net_kg is None: net_kg = abs(first_kg - second_kg) - deduction_kg  # Sama dengan timbang kedua di aplikasi: gross - tare - potongan
+    else: second_kg = net_kg = second_ts = None; deduction_kg = 0.0
+    return (text["transaction_id"], text["plate_number"], text["goods_type"], text["driver_name"], text["vendor"], text["customer"], text["quantity"], status,
+            first_kg, second_kg, net_kg, first_ts, second_ts, first_ts[:10], text["goods_origin"], text["goods_destination"], text["remake"],
+            text["first_scale_id"] or None, text["second_scale_id"] or None, deduction_kg)
+
+def import_file(conn, path, mapping=None, batch_size=DEFAULT_BATCH_SIZE, restart=False, sheet=None, delimiter=None, encoding="utf-8-sig",
+                decimal_comma=False, timestamp_formats=TIMESTAMP_FORMATS, on_progress=None, on_reject=None):
+    # Mengembalikan ImportStats, atau None jika file ini sudah pernah selesai diimport (pakai restart=True untuk mengulang).
+    # on_reject(nomor_baris, nilai, alasan) dipanggil setelah batch-nya di-commit, jadi tidak dobel saat dilanjutkan.
+    header, records = read_records(path, sheet, delimiter, encoding)
+    columns = resolve_mapping(header, mapping)
+    source = os.path.abspath(path); info = os.stat(path)
+    rows_done = begin_bulk_import(conn, source, f"{info.st_size}:{info.st_mtime_ns}", restart)
+    if rows_done is None: return None
+    stats = ImportStats(rows_done); parse_timestamp = TimestampParser(timestamp_formats)
+    records = itertools.islice(records, rows_done, None)  # Lanjut setelah baris terakhir yang sudah di-commit
+    while True:
+        chunk = list(itertools.islice(records, batch_size))
+        if not chunk: break
+        batch = []; rejects = []
+        for line, values in chunk:
+            try: batch.append(convert_row(values, columns, decimal_comma, parse_timestamp))
+            except RowError as e: rejects.append((line, values, str(e)))
+        stats.rows += len(chunk)
+        inserted = insert_imported_batch(conn, source, batch, stats.rows, len(rejects))
+        stats.inserted += inserted; stats.duplicates += len(batch) - inserted; stats.rejected += len(rejects)
+        if on_reject is not None:
+            for reject in rejects: on_reject(*reject)
+        if on_progress is not None: on_progress(stats)
+    finish_bulk_import(conn, source)
+    return stats
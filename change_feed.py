@@ -0,0 +1,34 @@
+# File: change_feed.py (Notifikasi perubahan transaksi untuk refresh tabel secara inkremental)
+
+from PySide6.QtCore import QObject, QTimer, Signal
+
+from database import get_change_cursor, read_changes
+
+class ChangeFeed(QObject):
+    # Dipakai bersama oleh MainWindow dan ReportWindow agar semua jendela yang terbuka tetap konsisten.
+    # Polling juga menangkap perubahan dari stasiun timbang lain yang memakai file DB yang sama.
+    transactions_changed = Signal(object)
+
+    def __init__(self, db, interval_ms=1000, parent=None):
+        super().__init__(parent)
+        self.db = db; self.last_seq = None; self._polling = False; self._poll_again = False
+        self.db.read(get_change_cursor, callback=self._set_cursor)
+        self.timer = QTimer(self); self.timer.setInterval(interval_ms); self.timer.timeout.connect(self.poll); self.timer.start()
+
+    def _set_cursor(self, seq): self.last_seq = seq
+
+    def poll(self):
+        if self.last_seq is None: return
+        if self._polling: self._poll_again = True; return
+        self._polling = True
+        self.db.read(read_changes, self.last_seq, callback=self._on_changes, error_callback=self._on_error)
+
+    def _on_changes(self, result):
+        self._polling = False; self.last_seq, changes = result
+        if changes: self.transactions_changed.emit(changes)
+        if self._poll_again: self._poll_again = False; self.poll()
+
+    def _on_error(self, error):
+        # Permintaan poll selama pembacaan yang gagal tetap dijalankan (cursor belum maju, jadi tidak ada yang terlewat)
+        self._polling = False
+        if self._poll_again: self._poll_again = False; self.poll()
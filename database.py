@@ -1,12 +1,269 @@
 # File: database.py (Dengan Tambahan Tabel Users)
+import os
+import re
 import sqlite3
-from datetime import datetime
+from datetime import date, datetime, timedelta
 import hashlib
+import random
+import time
+from collections import namedtuple
 
 DATABASE_FILE = "weighing_system.db"
+BUSY_TIMEOUT_SECONDS = 10  # Beberapa stasiun timbang bisa menulis ke file DB yang sama
+WRITE_RETRIES = 5
 
-def init_db():
-    conn = sqlite3.connect(DATABASE_FILE)
+# --- Migrasi skema (versi disimpan di PRAGMA user_version) ---
+# Setiap migrasi hanya boleh ditambahkan di akhir list, jangan diubah urutannya.
+def _migration_1_weigh_date_indexes(cursor):
+    # Kolom tanggal terpisah agar filter tanggal bisa memakai index (DATE(...) per baris selalu full scan)
+    columns = [row[1] for row in cursor.execute("PRAGMA table_info(transactions)")]
+    if 'weigh_date' not in columns: cursor.execute("ALTER TABLE transactions ADD COLUMN weigh_date TEXT")
+    cursor.execute("UPDATE transactions SET weigh_date = substr(first_weigh_timestamp, 1, 10) WHERE weigh_date IS NULL")
+    # Jaga-jaga untuk INSERT dari luar aplikasi yang tidak mengisi weigh_date
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_transactions_weigh_date AFTER INSERT ON transactions
+    WHEN NEW.weigh_date IS NULL BEGIN
+        UPDATE transactions SET weigh_date = substr(NEW.first_weigh_timestamp, 1, 10) WHERE id = NEW.id;
+    END""")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_transactions_date_goods ON transactions(weigh_date, goods_type)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_transactions_status_plate ON transactions(status, plate_number)")
+
+def _migration_2_daily_sequence(cursor):
+    # Nomor urut harian untuk transaction_id; hanya naik, tidak pernah dipakai ulang setelah delete
+    cursor.execute("CREATE TABLE IF NOT EXISTS daily_sequence (day TEXT PRIMARY KEY, last_seq INTEGER NOT NULL) WITHOUT ROWID")
+    cursor.execute("""
+    INSERT OR IGNORE INTO daily_sequence (day, last_seq)
+    SELECT weigh_date, MAX(MAX(CAST(substr(transaction_id, 8) AS INTEGER)), COUNT(*)) FROM transactions
+    WHERE weigh_date IS NOT NULL GROUP BY weigh_date""")
+
+def _migration_3_date_timestamp_index(cursor):
+    # Urutan index = urutan tampilan (terbaru di atas), jadi halaman tabel dibaca tanpa sort
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_transactions_date_ts ON transactions(weigh_date, first_weigh_timestamp)")
+
+def _migration_4_change_log(cursor):
+    # Log perubahan yang ditulis trigger, dibaca oleh ChangeFeed (change_feed.py) untuk refresh inkremental
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS transaction_changes (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT, transaction_id TEXT NOT NULL, op TEXT NOT NULL,
+        changed_at TEXT NOT NULL DEFAULT (datetime('now', 'localtime'))
+    )""")
+    cursor.execute("CREATE TRIGGER IF NOT EXISTS trg_transactions_change_insert AFTER INSERT ON transactions BEGIN INSERT INTO transaction_changes (transaction_id, op) VALUES (NEW.transaction_id, 'I'); END")
+    cursor.execute("CREATE TRIGGER IF NOT EXISTS trg_transactions_change_update AFTER UPDATE ON transactions BEGIN INSERT INTO transaction_changes (transaction_id, op) VALUES (NEW.transaction_id, 'U'); END")
+    cursor.execute("CREATE TRIGGER IF NOT EXISTS trg_transactions_change_delete AFTER DELETE ON transactions BEGIN INSERT INTO transaction_changes (transaction_id, op) VALUES (OLD.transaction_id, 'D'); END")
+
+# --- Rollup harian & per jam, dijaga trigger di transaksi yang sama dengan INSERT/UPDATE/DELETE ---
+# Kontribusi satu baris transaksi; dipakai trigger (alias NEW/OLD) dan rebuild_rollups (alias t).
+# NULL pada kolom kunci disimpan sebagai '' karena tabel WITHOUT ROWID tidak boleh punya PK NULL.
+def _rollup_values(row):
+    second_kg = f"COALESCE({row}.second_weigh_kg, 0)"
+    completed = f"({row}.status = 'COMPLETED')"
+    dwell = f"(julianday({row}.second_weigh_timestamp) - julianday({row}.first_weigh_timestamp)) * 86400"
+    return {
+        "day": f"substr({row}.first_weigh_timestamp, 1, 10)", "goods_type": f"COALESCE({row}.goods_type, '')",
+        "goods_origin": f"COALESCE({row}.goods_origin, '')", "goods_destination": f"COALESCE({row}.goods_destination, '')",
+        "trucks": "1", "completed": f"{completed}",
+        "gross_kg": f"CASE WHEN {completed} THEN MAX({row}.first_weigh_kg, {second_kg}) ELSE 0 END",
+        "tare_kg": f"CASE WHEN {completed} THEN MIN({row}.first_weigh_kg, {second_kg}) ELSE 0 END",
+        "net_kg": f"COALESCE({row}.net_weigh_kg, 0)",
+        "dwell_seconds": f"CASE WHEN {row}.second_weigh_timestamp IS NOT NULL THEN {dwell} ELSE 0 END",
+        "dwell_count": f"({row}.second_weigh_timestamp IS NOT NULL)",
+    }
+DAILY_ROLLUP_KEYS = ("day", "goods_type", "goods_origin", "goods_destination")
+DAILY_ROLLUP_MEASURES = ("trucks", "completed", "gross_kg", "tare_kg", "net_kg", "dwell_seconds", "dwell_count")
+
+def _rollup_trigger_sql(row, sign):
+    # UPSERT untuk menambah (sign '+') atau mengurangi (sign '-') kontribusi baris ke tabel rollup
+    values = _rollup_values(row); columns = DAILY_ROLLUP_KEYS + DAILY_ROLLUP_MEASURES
+    measures = [f"{sign}({values[m]})" for m in DAILY_ROLLUP_MEASURES]
+    updates = ", ".join(f"{m} = {m} + excluded.{m}" for m in DAILY_ROLLUP_MEASURES)
+    statements = [
+        f"INSERT INTO daily_rollup ({', '.join(columns)}) VALUES ({', '.join([values[k] for k in DAILY_ROLLUP_KEYS] + measures)}) "
+        f"ON CONFLICT ({', '.join(DAILY_ROLLUP_KEYS)}) DO UPDATE SET {updates};",
+        # Kedatangan dihitung pada jam timbang pertama, kepergian pada jam timbang kedua
+        f"INSERT INTO hourly_rollup (day, hour, arrivals, departures) VALUES (substr({row}.first_weigh_timestamp, 1, 10), CAST(substr({row}.first_weigh_timestamp, 12, 2) AS INTEGER), {sign}1, 0) "
+        f"ON CONFLICT (day, hour) DO UPDATE SET arrivals = arrivals + excluded.arrivals;",
+        f"INSERT INTO hourly_rollup (day, hour, arrivals, departures) SELECT substr({row}.second_weigh_timestamp, 1, 10), CAST(substr({row}.second_weigh_timestamp, 12, 2) AS INTEGER), 0, {sign}1 "
+        f"WHERE {row}.second_weigh_timestamp IS NOT NULL ON CONFLICT (day, hour) DO UPDATE SET departures = departures + excluded.departures;",
+    ]
+    if sign == "-":
+        # Baris rollup yang sudah kosong dibuang (hanya baris milik kunci ini, bukan scan seluruh tabel)
+        statements.append(f"DELETE FROM daily_rollup WHERE {' AND '.join(f'{k} = {values[k]}' for k in DAILY_ROLLUP_KEYS)} AND trucks = 0;")
+        statements.append(f"DELETE FROM hourly_rollup WHERE day IN (substr({row}.first_weigh_timestamp, 1, 10), substr({row}.second_weigh_timestamp, 1, 10)) AND arrivals = 0 AND departures = 0;")
+    return "\n        ".join(statements)
+
+def _migration_5_rollups(cursor):
+    # Total per hari/jenis barang/asal/tujuan dan jumlah truk per jam tanpa harus scan tabel transactions
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS daily_rollup (
+        day TEXT NOT NULL, goods_type TEXT NOT NULL, goods_origin TEXT NOT NULL, goods_destination TEXT NOT NULL,
+        trucks INTEGER NOT NULL DEFAULT 0, completed INTEGER NOT NULL DEFAULT 0,
+        gross_kg REAL NOT NULL DEFAULT 0, tare_kg REAL NOT NULL DEFAULT 0, net_kg REAL NOT NULL DEFAULT 0,
+        dwell_seconds REAL NOT NULL DEFAULT 0, dwell_count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, goods_type, goods_origin, goods_destination)
+    ) WITHOUT ROWID""")
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS hourly_rollup (
+        day TEXT NOT NULL, hour INTEGER NOT NULL, arrivals INTEGER NOT NULL DEFAULT 0, departures INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, hour)
+    ) WITHOUT ROWID""")
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS trg_transactions_rollup_insert AFTER INSERT ON transactions BEGIN\n        {_rollup_trigger_sql('NEW', '+')}\n    END")
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS trg_transactions_rollup_update AFTER UPDATE ON transactions BEGIN\n        {_rollup_trigger_sql('OLD', '-')}\n        {_rollup_trigger_sql('NEW', '+')}\n    END")
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS trg_transactions_rollup_delete AFTER DELETE ON transactions BEGIN\n        {_rollup_trigger_sql('OLD', '-')}\n    END")
+    _fill_rollups(cursor)
+
+def _fill_rollups(cursor, source="transactions"):
+    # source: nama tabel atau subquery (rebuild_rollups menyertakan transaksi di file arsip)
+    values = _rollup_values("t")
+    cursor.execute(f"""
+    INSERT INTO daily_rollup ({', '.join(DAILY_ROLLUP_KEYS + DAILY_ROLLUP_MEASURES)})
+    SELECT {', '.join([values[k] for k in DAILY_ROLLUP_KEYS] + [f"SUM({values[m]})" for m in DAILY_ROLLUP_MEASURES])}
+    FROM {source} t GROUP BY 1, 2, 3, 4""")
+    cursor.execute(f"""
+    INSERT INTO hourly_rollup (day, hour, arrivals, departures)
+    SELECT day, hour, SUM(arrivals), SUM(departures) FROM (
+        SELECT substr(first_weigh_timestamp, 1, 10) AS day, CAST(substr(first_weigh_timestamp, 12, 2) AS INTEGER) AS hour, 1 AS arrivals, 0 AS departures FROM {source}
+        UNION ALL
+        SELECT substr(second_weigh_timestamp, 1, 10), CAST(substr(second_weigh_timestamp, 12, 2) AS INTEGER), 0, 1 FROM {source} WHERE second_weigh_timestamp IS NOT NULL
+    ) GROUP BY day, hour""")
+
+# --- Pencarian teks (FTS5, external content: teks tidak disimpan dua kali, hanya index-nya) ---
+SEARCH_COLUMNS = ("plate_number", "driver_name", "goods_type", "goods_origin", "goods_destination", "remake")
+SEARCH_WEIGHTS = (10.0, 5.0, 3.0, 1.0, 1.0, 2.0)  # Bobot bm25 per kolom: cocok di plat nomor paling relevan
+
+def _migration_6_fulltext_search(cursor):
+    columns = ", ".join(SEARCH_COLUMNS)
+    try: cursor.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts USING fts5({columns}, content='transactions', content_rowid='id', prefix='2 3')")
+    except sqlite3.OperationalError as e:
+        # SQLite tanpa FTS5: search_transactions otomatis memakai LIKE
+        print(f"FTS5 not available ({e}); text search will use LIKE."); return
+    new_values = ", ".join(f"NEW.{c}" for c in SEARCH_COLUMNS); old_values = ", ".join(f"OLD.{c}" for c in SEARCH_COLUMNS)
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS trg_transactions_fts_insert AFTER INSERT ON transactions BEGIN INSERT INTO transactions_fts (rowid, {columns}) VALUES (NEW.id, {new_values}); END")
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS trg_transactions_fts_delete AFTER DELETE ON transactions BEGIN INSERT INTO transactions_fts (transactions_fts, rowid, {columns}) VALUES ('delete', OLD.id, {old_values}); END")
+    # Hanya UPDATE pada kolom yang di-index yang perlu menyentuh FTS (mis. timbang kedua mengubah remake)
+    cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_transactions_fts_update AFTER UPDATE OF {columns} ON transactions BEGIN
+        INSERT INTO transactions_fts (transactions_fts, rowid, {columns}) VALUES ('delete', OLD.id, {old_values});
+        INSERT INTO transactions_fts (rowid, {columns}) VALUES (NEW.id, {new_values});
+    END""")
+    cursor.execute("INSERT INTO transactions_fts (transactions_fts) VALUES ('rebuild')")
+
+def _migration_7_scale_ids(cursor):
+    # Timbangan (scale_registry.py) yang dipakai untuk timbang pertama dan kedua; NULL untuk data lama
+    columns = [row[1] for row in cursor.execute("PRAGMA table_info(transactions)")]
+    for column in ("first_scale_id", "second_scale_id"):
+        if column not in columns: cursor.execute(f"ALTER TABLE transactions ADD COLUMN {column} TEXT")
+
+MAINTENANCE_SKIP_TRIGGER = "WHEN NOT EXISTS (SELECT 1 FROM maintenance_flags WHERE name = 'archiving')"
+
+def _migration_8_archive(cursor):
+    # Arsip per tahun (archive_transactions): daftar tahun yang sudah diarsip dan rentang tanggalnya
+    cursor.execute("CREATE TABLE IF NOT EXISTS archive_index (year INTEGER PRIMARY KEY, first_day TEXT NOT NULL, last_day TEXT NOT NULL, rows INTEGER NOT NULL DEFAULT 0)")
+    # Baris yang dipindah ke arsip tidak benar-benar dihapus: selama flag 'archiving' ada (hanya di dalam transaksi
+    # archive_transactions), trigger DELETE tidak mengurangi rollup dan tidak mencatat 'D' di change log
+    cursor.execute("CREATE TABLE IF NOT EXISTS maintenance_flags (name TEXT PRIMARY KEY) WITHOUT ROWID")
+    cursor.execute("DROP TRIGGER IF EXISTS trg_transactions_change_delete"); cursor.execute("DROP TRIGGER IF EXISTS trg_transactions_rollup_delete")
+    cursor.execute(f"CREATE TRIGGER trg_transactions_change_delete AFTER DELETE ON transactions {MAINTENANCE_SKIP_TRIGGER} BEGIN INSERT INTO transaction_changes (transaction_id, op) VALUES (OLD.transaction_id, 'D'); END")
+    cursor.execute(f"CREATE TRIGGER trg_transactions_rollup_delete AFTER DELETE ON transactions {MAINTENANCE_SKIP_TRIGGER} BEGIN\n        {_rollup_trigger_sql('OLD', '-')}\n    END")
+
+def _migration_9_bulk_import(cursor):
+    # Import massal (bulk_import.py): posisi per file sumber untuk melanjutkan setelah terputus, dan SQL index/trigger
+    # tabel transactions yang di-DROP selama import (dibuat ulang oleh restore_deferred_schema)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS import_progress (
+        source TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, rows_done INTEGER NOT NULL DEFAULT 0, inserted INTEGER NOT NULL DEFAULT 0,
+        duplicates INTEGER NOT NULL DEFAULT 0, rejected INTEGER NOT NULL DEFAULT 0, started_at TEXT NOT NULL, updated_at TEXT, finished_at TEXT
+    )""")
+    cursor.execute("CREATE TABLE IF NOT EXISTS deferred_schema (name TEXT PRIMARY KEY, type TEXT NOT NULL, sql TEXT NOT NULL) WITHOUT ROWID")
+
+def _migration_10_pending_plate_index(cursor):
+    # Index parsial: hanya baris PENDING (sedikit) yang masuk, urut per plat lalu waktu timbang pertama, jadi
+    # find_pending_by_plate_number langsung seek ke plat itu (termasuk ORDER BY) tanpa melewati baris COMPLETED
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_transactions_pending_plate ON transactions(plate_number, first_weigh_timestamp) WHERE status = 'PENDING'")
+
+# Potongan (kg) yang ditulis ke remake oleh timbang kedua: "(Deduction : 1,234.00 KG.)", data lama "Potongan: 50 KG."
+DEDUCTION_PATTERN = re.compile(r"(?:deduction|potongan)\s*:\s*([\d.,]+)\s*kg", re.IGNORECASE)
+
+def parse_deduction(remake):
+    match = DEDUCTION_PATTERN.search(remake or "")
+    if not match: return 0.0
+    text = match.group(1).strip(".,")
+    # Koma sebagai desimal hanya jika koma adalah pemisah terakhir dan tidak diikuti tepat 3 digit ("1.234,5", "12,5")
+    last_comma = text.rfind(","); last_dot = text.rfind(".")
+    if last_comma > last_dot and len(text) - last_comma - 1 != 3: text = text.replace(".", "").replace(",", ".")
+    else: text = text.replace(",", "")
+    try: return float(text)
+    except ValueError: return 0.0
+
+def _backfill_deductions(conn, schema="main"):
+    rows = conn.execute(f"SELECT id, remake FROM {schema}.transactions WHERE remake LIKE '%deduction%' OR remake LIKE '%potongan%'").fetchall()
+    conn.executemany(f"UPDATE {schema}.transactions SET deduction_kg = ? WHERE id = ?", [(parse_deduction(remake), row_id) for row_id, remake in rows])
+
+def _migration_11_deduction_column(cursor):
+    # Potongan sebagai angka (report_analytics.py), tidak hanya tersimpan sebagai teks di remake
+    if "deduction_kg" not in [row[1] for row in cursor.execute("PRAGMA table_info(transactions)")]:
+        cursor.execute("ALTER TABLE transactions ADD COLUMN deduction_kg REAL NOT NULL DEFAULT 0")
+    _backfill_deductions(cursor.connection)
+
+MIGRATIONS = [_migration_1_weigh_date_indexes, _migration_2_daily_sequence, _migration_3_date_timestamp_index, _migration_4_change_log, _migration_5_rollups, _migration_6_fulltext_search, _migration_7_scale_ids, _migration_8_archive, _migration_9_bulk_import, _migration_10_pending_plate_index, _migration_11_deduction_column]
+CHANGE_LOG_RETENTION_DAYS = 2
+SCHEMA_VERSION = len(MIGRATIONS)
+
+def migrate_db(conn):
+    current_version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for version in range(current_version + 1, SCHEMA_VERSION + 1):
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            MIGRATIONS[version - 1](conn.cursor())
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+            print(f"Database migrated to schema version {version}.")
+        except Exception:
+            conn.rollback(); raise
+# ------------------------------------
+
+class WeighingConnection(sqlite3.Connection):
+    # Selama 'batching' aktif (diatur oleh DatabaseService di db_service.py), commit() ditunda agar beberapa
+    # penulisan cukup satu commit/fsync, dan rollback() hanya membatalkan permintaan yang sedang berjalan.
+    batching = False
+    def commit(self):
+        if not self.batching: super().commit()
+    def rollback(self):
+        if self.batching: self.execute("ROLLBACK TO batch_item")
+        else: super().rollback()
+
+def connect_db(path=None):
+    conn = sqlite3.connect(path or DATABASE_FILE, timeout=BUSY_TIMEOUT_SECONDS, factory=WeighingConnection)
+    conn.row_factory = sqlite3.Row  # Diatur sekali di sini, fungsi lain tidak boleh mengubahnya
+    # WAL: pembaca tidak memblokir penulis, aman untuk beberapa stasiun pada satu file DB
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_SECONDS * 1000}")
+    return conn
+
+def _is_busy_error(error):
+    message = str(error).lower(); return 'locked' in message or 'busy' in message
+
+def _write_transaction(conn, work):
+    # Sudah di dalam transaksi (batch DatabaseService): write lock sudah dipegang, cukup jalankan
+    if conn.in_transaction:
+        try: return work(conn.cursor())
+        except Exception:
+            conn.rollback(); raise
+    # BEGIN IMMEDIATE langsung mengambil write lock, jadi dua stasiun tidak akan mendapat nomor urut yang sama
+    for attempt in range(WRITE_RETRIES):
+        try: conn.execute("BEGIN IMMEDIATE")
+        except sqlite3.OperationalError as e:
+            if not _is_busy_error(e) or attempt == WRITE_RETRIES - 1: raise
+            time.sleep(0.1 * (2 ** attempt) + random.uniform(0, 0.05)); continue
+        try:
+            result = work(conn.cursor()); conn.commit(); return result
+        except Exception:
+            conn.rollback(); raise
+
+def init_db(path=None):
+    conn = connect_db(path)
+    if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+        # Skema sudah terbaru (kasus normal setiap startup): lewati CREATE TABLE dan migrasi
+        _ensure_default_user(conn); prune_change_log(conn); _restore_interrupted_import(conn)
+        return conn
     cursor = conn.cursor()
     cursor.execute("""
     CREATE TABLE IF NOT EXISTS transactions (
@@ -26,17 +283,25 @@ def init_db():
         role TEXT NOT NULL
     )""")
     
+    _ensure_default_user(conn)
+    # ------------------------------------
+
+    conn.commit()
+    migrate_db(conn)
+    prune_change_log(conn)
+    _restore_interrupted_import(conn)
+    print("Database initialized successfully.")
+    return conn
+
+def _ensure_default_user(conn):
+    cursor = conn.cursor()
     cursor.execute("SELECT COUNT(*) FROM users")
     if cursor.fetchone()[0] == 0:
         password_hash = hashlib.sha256('fakhriganteng24'.encode()).hexdigest()
         cursor.execute("INSERT INTO users (username, password_hash, role) VALUES (?, ?, ?)", 
                        ('admin', password_hash, 'Administrator'))
+        conn.commit()
         print("Default 'admin' user created.")
-    # ------------------------------------
-
-    conn.commit()
-    print("Database initialized successfully.")
-    return conn
 
 # --- FUNGSI BARU DITAMBAHKAN DI SINI ---
 def verify_user(conn, username, password):
@@ -46,7 +311,6 @@ def verify_user(conn, username, password):
     return cursor.fetchone() is not None
 
 def get_all_users(conn):
-    conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
     cursor.execute("SELECT id, username, role FROM users")
     return cursor.fetchall()
@@ -68,58 +332,403 @@ def delete_user(conn, user_id):
 # ------------------------------------
 
 # ... (Sisa fungsi lainnya tidak berubah)
-def generate_transaction_id(conn):
-    cursor = conn.cursor(); cursor.execute("SELECT COUNT(*) FROM transactions WHERE DATE(first_weigh_timestamp) = DATE('now', 'localtime')"); count = cursor.fetchone()[0]
-    today_str = datetime.now().strftime("%y%m%d"); new_id = f"W{today_str}{count + 1:04d}"; return new_id
+def _format_transaction_id(day, seq): return f"W{day[2:4]}{day[5:7]}{day[8:10]}{seq:04d}"
+def peek_next_transaction_id(conn):
+    # Hanya untuk label "Next Transaction ID" (lookup primary key, tanpa scan); nomor final diambil saat INSERT
+    day = datetime.now().strftime("%Y-%m-%d"); row = conn.execute("SELECT last_seq FROM daily_sequence WHERE day = ?", (day,)).fetchone()
+    return _format_transaction_id(day, (row[0] if row else 0) + 1)
+def _allocate_transaction_id(cursor, day):
+    cursor.execute("INSERT INTO daily_sequence (day, last_seq) VALUES (?, 1) ON CONFLICT(day) DO UPDATE SET last_seq = last_seq + 1", (day,))
+    seq = cursor.execute("SELECT last_seq FROM daily_sequence WHERE day = ?", (day,)).fetchone()[0]; return _format_transaction_id(day, seq)
 def create_first_weigh(conn, data):
+    def insert(cursor):
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S"); new_id = _allocate_transaction_id(cursor, timestamp[:10])
+        query = "INSERT INTO transactions (transaction_id, plate_number, goods_type, driver_name, vendor, customer, quantity, status, first_weigh_kg, first_weigh_timestamp, weigh_date, goods_origin, goods_destination, remake, first_scale_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+        cursor.execute(query, (new_id, data['plate_number'], data['goods_type'], data['driver_name'], data['vendor'], data['customer'], data['quantity'], 'PENDING', data['weight'], timestamp, timestamp[:10], data['goods_origin'], data['goods_destination'], data['remake'], data.get('scale_id'))); return new_id
     try:
-        new_id = generate_transaction_id(conn); timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S"); cursor = conn.cursor()
-        query = "INSERT INTO transactions (transaction_id, plate_number, goods_type, driver_name, vendor, customer, quantity, status, first_weigh_kg, first_weigh_timestamp, goods_origin, goods_destination, remake) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
-        cursor.execute(query, (new_id, data['plate_number'], data['goods_type'], data['driver_name'], data['vendor'], data['customer'], data['quantity'], 'PENDING', data['weight'], timestamp, data['goods_origin'], data['goods_destination'], data['remake'])); conn.commit(); return True
+        _write_transaction(conn, insert); return True
     except Exception as e: print(f"Error in create_first_weigh: {e}"); return False
 # Di dalam file database.py
 
 # Di dalam file database.py
 
-def complete_second_weigh(conn, transaction_id, second_weight, final_net_weight, remake_info):
-    try:
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT first_weigh_kg FROM transactions WHERE transaction_id = ?", (transaction_id,))
-        result = cursor.fetchone()
-        if not result:
-            return False
-
+def complete_second_weigh(conn, transaction_id, second_weight, final_net_weight, remake_info, scale_id=None, deduction_kg=0.0):
+    def update(cursor):
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        # Query diubah untuk mengupdate kolom 'remake' juga
-        query = "UPDATE transactions SET second_weigh_kg = ?, net_weigh_kg = ?, status = 'COMPLETED', second_weigh_timestamp = ?, remake = ? WHERE transaction_id = ? AND status = 'PENDING'"
-        cursor.execute(query, (second_weight, final_net_weight, timestamp, remake_info, transaction_id))
-        
-        conn.commit()
-        return cursor.rowcount > 0
+        # Query diubah untuk mengupdate kolom 'remake' juga; hanya transaksi yang masih PENDING yang diselesaikan
+        query = "UPDATE transactions SET second_weigh_kg = ?, net_weigh_kg = ?, status = 'COMPLETED', second_weigh_timestamp = ?, remake = ?, second_scale_id = ?, deduction_kg = ? WHERE transaction_id = ? AND status = 'PENDING'"
+        cursor.execute(query, (second_weight, final_net_weight, timestamp, remake_info, scale_id, deduction_kg or 0.0, transaction_id)); return cursor.rowcount > 0
+    try: return _write_transaction(conn, update)
     except Exception as e:
         print(f"Error in complete_second_weigh: {e}")
         return False
 def get_filtered_transactions(conn, start_date, end_date, goods_type=""):
     try:
-        conn.row_factory = sqlite3.Row; cursor = conn.cursor()
-        query = "SELECT * FROM transactions WHERE DATE(first_weigh_timestamp) BETWEEN ? AND ?"; params = [start_date, end_date]
+        cursor = conn.cursor()
+        # Range predicate pada kolom weigh_date (ber-index), bukan DATE(first_weigh_timestamp)
+        query = f"SELECT * FROM {_transactions_source(conn, start_date, end_date)} WHERE weigh_date BETWEEN ? AND ?"; params = [start_date, end_date]
         if goods_type: query += " AND goods_type LIKE ?"; params.append(f"%{goods_type}%")
-        query += " ORDER BY first_weigh_timestamp DESC"; results = cursor.execute(query, params).fetchall(); return results
+        query += " ORDER BY weigh_date DESC, first_weigh_timestamp DESC, id DESC"; results = cursor.execute(query, params).fetchall(); return results
     except Exception as e: print(f"Error in get_filtered_transactions: {e}"); return []
+def iter_filtered_transactions(conn, start_date, end_date, goods_type="", batch_size=500):
+    # Generator dengan fetchmany: memori tetap kecil walaupun rentang tanggal mencakup ratusan ribu baris
+    cursor = conn.cursor()
+    query = f"SELECT * FROM {_transactions_source(conn, start_date, end_date)} WHERE weigh_date BETWEEN ? AND ?"; params = [start_date, end_date]
+    if goods_type: query += " AND goods_type LIKE ?"; params.append(f"%{goods_type}%")
+    cursor.execute(query + " ORDER BY weigh_date DESC, first_weigh_timestamp DESC, id DESC", params)
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows: break
+        yield from rows
+def iter_transaction_batches(conn, start_date, end_date, goods_type="", status="", batch_size=5000):
+    # Untuk export massal (weighing_cli.py): urutan kronologis mengikuti index, per batch list baris (bukan per baris)
+    query = f"SELECT * FROM {_transactions_source(conn, start_date, end_date)} WHERE weigh_date BETWEEN ? AND ?"; params = [start_date, end_date]
+    if goods_type: query += " AND goods_type LIKE ?"; params.append(f"%{goods_type}%")
+    if status: query += " AND status = ?"; params.append(status)
+    cursor = conn.execute(query + " ORDER BY weigh_date, first_weigh_timestamp, id", params)
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows: break
+        yield rows
+def get_transactions_page(conn, start_date, end_date, goods_type="", after=None, limit=200):
+    # Keyset pagination: 'after' adalah kunci (weigh_date, first_weigh_timestamp, id) baris terakhir halaman sebelumnya
+    try:
+        cursor = conn.cursor(); source = _transactions_source(conn, start_date, end_date)
+        # Jika ada 'after', kunci itu sudah menjadi batas atas (SQLite bisa seek langsung ke posisinya di index)
+        if after: query = f"SELECT * FROM {source} WHERE weigh_date >= ? AND (weigh_date, first_weigh_timestamp, id) < (?, ?, ?)"; params = [start_date, *after]
+        else: query = f"SELECT * FROM {source} WHERE weigh_date BETWEEN ? AND ?"; params = [start_date, end_date]
+        if goods_type: query += " AND goods_type LIKE ?"; params.append(f"%{goods_type}%")
+        query += " ORDER BY weigh_date DESC, first_weigh_timestamp DESC, id DESC LIMIT ?"; params.append(limit)
+        return cursor.execute(query, params).fetchall()
+    except Exception as e: print(f"Error in get_transactions_page: {e}"); return []
+def count_filtered_transactions(conn, start_date, end_date, goods_type=""):
+    try:
+        query = f"SELECT COUNT(*) FROM {_transactions_source(conn, start_date, end_date)} WHERE weigh_date BETWEEN ? AND ?"; params = [start_date, end_date]
+        if goods_type: query += " AND goods_type LIKE ?"; params.append(f"%{goods_type}%")
+        return conn.execute(query, params).fetchone()[0]
+    except Exception as e: print(f"Error in count_filtered_transactions: {e}"); return 0
+def get_transactions_by_status(conn, status, start_date="0000-01-01", end_date="9999-12-31", limit=200, offset=0):
+    # Untuk API weighing_service.py (mis. daftar truk yang masih PENDING di gerbang), terbaru di atas
+    try:
+        # Arsip hanya berisi COMPLETED, jadi daftar PENDING tidak pernah membuka file arsip
+        source = _transactions_source(conn, start_date, end_date) if status == 'COMPLETED' else "transactions"
+        query = f"SELECT * FROM {source} WHERE status = ? AND weigh_date BETWEEN ? AND ? ORDER BY weigh_date DESC, first_weigh_timestamp DESC, id DESC LIMIT ? OFFSET ?"
+        return conn.execute(query, (status, start_date, end_date, limit, offset)).fetchall()
+    except Exception as e: print(f"Error in get_transactions_by_status: {e}"); return []
+def get_pending_transactions(conn):
+    # Semua transaksi yang menunggu timbang kedua, untuk PendingIndex (pending_index.py)
+    try: return conn.execute("SELECT * FROM transactions WHERE status = 'PENDING'").fetchall()
+    except Exception as e: print(f"Error in get_pending_transactions: {e}"); return []
 def find_pending_by_plate_number(conn, plate_number):
     try:
-        conn.row_factory = sqlite3.Row; cursor = conn.cursor(); query = "SELECT * FROM transactions WHERE plate_number = ? AND status = 'PENDING' ORDER BY first_weigh_timestamp DESC"
+        cursor = conn.cursor(); query = "SELECT * FROM transactions WHERE plate_number = ? AND status = 'PENDING' ORDER BY first_weigh_timestamp DESC"
         result = cursor.execute(query, (plate_number,)).fetchone(); return result
     except Exception as e: print(f"Error in find_pending_by_plate_number: {e}"); return None
 def get_transaction_by_id(conn, transaction_id):
     try:
-        conn.row_factory = sqlite3.Row; cursor = conn.cursor(); query = "SELECT * FROM transactions WHERE transaction_id = ?"
-        result = cursor.execute(query, (transaction_id,)).fetchone(); return result
+        cursor = conn.cursor(); query = "SELECT * FROM transactions WHERE transaction_id = ?"
+        result = cursor.execute(query, (transaction_id,)).fetchone()
+        if result is None: result = next(iter(_get_archived_by_ids(conn, [transaction_id])), None)
+        return result
     except Exception as e: print(f"Error in get_transaction_by_id: {e}"); return None
 def delete_transaction_by_id(conn, transaction_id):
+    def delete(cursor): cursor.execute("DELETE FROM transactions WHERE transaction_id = ?", (transaction_id,)); return cursor.rowcount > 0
+    try: return _write_transaction(conn, delete)
+    except Exception as e: print(f"Error in delete_transaction_by_id: {e}"); return False
+def get_transactions_by_ids(conn, transaction_ids):
+    try:
+        transaction_ids = list(transaction_ids)
+        if not transaction_ids: return []
+        query = f"SELECT * FROM transactions WHERE transaction_id IN ({', '.join('?' * len(transaction_ids))})"
+        rows = conn.execute(query, transaction_ids).fetchall()
+        if len(rows) < len(set(transaction_ids)):
+            found = {row['transaction_id'] for row in rows}; rows += _get_archived_by_ids(conn, [tid for tid in transaction_ids if tid not in found])
+        return rows
+    except Exception as e: print(f"Error in get_transactions_by_ids: {e}"); return []
+
+# --- Pencarian: teks bebas (prefix per kata) + rentang tanggal; tanpa teks sama dengan daftar per tanggal ---
+def search_terms(text): return [term.lower() for term in re.findall(r"\w+", text or "")]
+def _has_fulltext(conn): return conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'transactions_fts'").fetchone() is not None
+def _search_query(conn, start_date, end_date, text):
+    terms = search_terms(text); source = _transactions_source(conn, start_date, end_date)
+    if not terms: return f"SELECT t.* FROM {source} t WHERE t.weigh_date BETWEEN ? AND ?", [start_date, end_date], " ORDER BY t.weigh_date DESC, t.first_weigh_timestamp DESC, t.id DESC"
+    # Index FTS hanya mencakup DB utama; rentang yang mencapai arsip dicari dengan LIKE (urut tanggal, bukan bm25)
+    if source == "transactions" and _has_fulltext(conn):
+        # "kata"* = prefix match; semua kata harus cocok (AND implisit FTS5). Urutan: bm25 lalu terbaru.
+        match = " ".join(f'"{term}"*' for term in terms)
+        query = "SELECT t.* FROM transactions_fts JOIN transactions t ON t.id = transactions_fts.rowid WHERE transactions_fts MATCH ? AND t.weigh_date BETWEEN ? AND ?"
+        order = f" ORDER BY bm25(transactions_fts, {', '.join(map(str, SEARCH_WEIGHTS))}), t.weigh_date DESC, t.first_weigh_timestamp DESC, t.id DESC"
+        return query, [match, start_date, end_date], order
+    query = f"SELECT t.* FROM {source} t WHERE t.weigh_date BETWEEN ? AND ?"; params = [start_date, end_date]
+    for term in terms:
+        query += " AND (" + " OR ".join(f"t.{c} LIKE ?" for c in SEARCH_COLUMNS) + ")"; params.extend([f"%{term}%"] * len(SEARCH_COLUMNS))
+    return query, params, " ORDER BY t.weigh_date DESC, t.first_weigh_timestamp DESC, t.id DESC"
+def search_transactions(conn, start_date, end_date, text="", limit=200, offset=0):
+    try:
+        query, params, order = _search_query(conn, start_date, end_date, text)
+        return conn.execute(query + order + " LIMIT ? OFFSET ?", params + [limit, offset]).fetchall()
+    except Exception as e: print(f"Error in search_transactions: {e}"); return []
+def iter_search_transactions(conn, start_date, end_date, text="", batch_size=500):
+    query, params, order = _search_query(conn, start_date, end_date, text)
+    cursor = conn.execute(query + order, params)
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows: break
+        yield from rows
+def iter_search_columns(conn, start_date, end_date, text, columns, batch_size=50_000):
+    # Hanya kolom/ekspresi tertentu, sebagai tuple biasa (tanpa sqlite3.Row) per batch besar: untuk report_analytics.py
+    query, params, order = _search_query(conn, start_date, end_date, text)
+    cursor = conn.cursor(); cursor.row_factory = None
+    cursor.execute(f"SELECT {', '.join(columns)} FROM ({query})", params)
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows: break
+        yield rows
+def count_search_results(conn, start_date, end_date, text=""):
     try:
-        cursor = conn.cursor(); query = "DELETE FROM transactions WHERE transaction_id = ?"; cursor.execute(query, (transaction_id,)); conn.commit(); return cursor.rowcount > 0
-    except Exception as e: print(f"Error in delete_transaction_by_id: {e}"); return False
\ No newline at end of file
+        query, params, order = _search_query(conn, start_date, end_date, text)
+        return conn.execute(f"SELECT COUNT(*) FROM ({query})", params).fetchone()[0]
+    except Exception as e: print(f"Error in count_search_results: {e}"); return 0
+
+# --- Change feed: dibaca berdasarkan nomor seq terakhir yang sudah dilihat ---
+TransactionChanges = namedtuple("TransactionChanges", ["upserted", "deleted"])
+def get_change_cursor(conn):
+    return conn.execute("SELECT COALESCE(MAX(seq), 0) FROM transaction_changes").fetchone()[0]
+def get_changes_since(conn, last_seq, limit=1000):
+    try: return conn.execute("SELECT seq, transaction_id, op FROM transaction_changes WHERE seq > ? ORDER BY seq LIMIT ?", (last_seq, limit)).fetchall()
+    except Exception as e: print(f"Error in get_changes_since: {e}"); return []
+def read_changes(conn, last_seq):
+    # Dijalankan di thread reader DatabaseService (atau thread DB weighing_service.py); mengembalikan (seq terakhir, TransactionChanges atau None)
+    latest_ops = {}
+    while True:
+        changes = get_changes_since(conn, last_seq)
+        if not changes: break
+        for seq, transaction_id, op in changes: latest_ops[transaction_id] = op
+        last_seq = changes[-1][0]
+    if not latest_ops: return last_seq, None
+    # Beberapa perubahan pada transaksi yang sama digabung; yang dihitung hanya status terakhirnya
+    upserted = get_transactions_by_ids(conn, [tid for tid, op in latest_ops.items() if op != 'D'])
+    found = {t['transaction_id'] for t in upserted}
+    deleted = [tid for tid in latest_ops if tid not in found]
+    return last_seq, TransactionChanges(upserted, deleted)
+def prune_change_log(conn, keep_days=CHANGE_LOG_RETENTION_DAYS):
+    try: conn.execute("DELETE FROM transaction_changes WHERE changed_at < datetime('now', 'localtime', ?)", (f"-{keep_days} days",)); conn.commit()
+    except Exception as e: print(f"Error in prune_change_log: {e}")
+
+# --- Rollup: ringkasan rentang tanggal dibaca dari daily_rollup/hourly_rollup (tanpa scan transactions) ---
+def rebuild_rollups(conn):
+    # Hitung ulang semua rollup dari tabel transactions dan arsip (mis. setelah data diubah di luar aplikasi dengan trigger nonaktif)
+    source = _transactions_source(conn, "0000-01-01", "9999-12-31")
+    def rebuild(cursor):
+        cursor.execute("DELETE FROM daily_rollup"); cursor.execute("DELETE FROM hourly_rollup"); _fill_rollups(cursor, source)
+        return cursor.execute("SELECT COUNT(*) FROM daily_rollup").fetchone()[0]
+    return _write_transaction(conn, rebuild)
+def get_rollup_summary(conn, start_date, end_date, goods_type=""):
+    try:
+        # Filter jenis barang sama dengan laporan (LIKE). hourly_rollup tidak per jenis barang, jadi truk/jam dan jam
+        # puncak hanya dihitung tanpa filter jenis barang (None jika difilter)
+        goods_clause = " AND goods_type LIKE ?" if goods_type else ""
+        range_params = (start_date, end_date, f"%{goods_type}%") if goods_type else (start_date, end_date)
+        totals = conn.execute(f"""
+            SELECT COALESCE(SUM(trucks), 0) AS trucks, COALESCE(SUM(completed), 0) AS completed, COALESCE(SUM(gross_kg), 0) AS gross_kg,
+                   COALESCE(SUM(tare_kg), 0) AS tare_kg, COALESCE(SUM(net_kg), 0) AS net_kg, COALESCE(SUM(dwell_seconds), 0) AS dwell_seconds,
+                   COALESCE(SUM(dwell_count), 0) AS dwell_count
+            FROM daily_rollup WHERE day BETWEEN ? AND ?{goods_clause}""", range_params).fetchone()
+        hours = None if goods_type else conn.execute("SELECT COUNT(*), COALESCE(MAX(arrivals), 0) FROM hourly_rollup WHERE day BETWEEN ? AND ? AND arrivals > 0", range_params[:2]).fetchone()
+        by_goods = conn.execute(f"""
+            SELECT goods_type, SUM(trucks) AS trucks, SUM(completed) AS completed, SUM(net_kg) AS net_kg FROM daily_rollup
+            WHERE day BETWEEN ? AND ?{goods_clause} GROUP BY goods_type ORDER BY net_kg DESC""", range_params).fetchall()
+        by_route = conn.execute(f"""
+            SELECT goods_origin, goods_destination, SUM(trucks) AS trucks, SUM(completed) AS completed, SUM(net_kg) AS net_kg FROM daily_rollup
+            WHERE day BETWEEN ? AND ?{goods_clause} GROUP BY goods_origin, goods_destination ORDER BY net_kg DESC""", range_params).fetchall()
+        summary = dict(totals)
+        summary['pending'] = summary['trucks'] - summary['completed']
+        summary['avg_dwell_minutes'] = summary['dwell_seconds'] / summary['dwell_count'] / 60 if summary['dwell_count'] else 0.0
+        # Truk per jam dihitung dari jam yang benar-benar ada kedatangan (jam tutup tidak ikut membagi)
+        summary['active_hours'], summary['peak_hour_trucks'] = hours if not goods_type else (None, None)
+        if goods_type: summary['trucks_per_hour'] = None
+        else: summary['trucks_per_hour'] = summary['trucks'] / summary['active_hours'] if summary['active_hours'] else 0.0
+        summary['by_goods'] = by_goods; summary['by_route'] = by_route
+        return summary
+    except Exception as e: print(f"Error in get_rollup_summary: {e}"); return None
+
+# --- Arsip per tahun: transaksi COMPLETED lama dipindah ke archive/weighing_archive_<tahun>.db ---
+# DB utama tetap kecil (query harian, pending, nomor transaksi, backup); query dengan rentang tanggal yang
+# mencapai tahun arsip meng-ATTACH file arsip tahun itu saja dan membaca UNION ALL dengan tabel utama.
+# Rollup (daily_rollup/hourly_rollup) tetap di DB utama, jadi ringkasan laporan tidak perlu membuka arsip.
+# Transaksi di arsip hanya-baca (hapus dari Report tidak berlaku untuk transaksi arsip).
+ARCHIVE_DIRECTORY = "archive"
+ARCHIVE_FILE = "weighing_archive_{year}.db"
+ARCHIVE_AFTER_DAYS = 365
+MAX_ATTACHED_ARCHIVES = 9  # Batas default SQLite 10 database ter-ATTACH per koneksi
+
+def _archive_schema(year): return f"archive_{year}"
+def archive_path(conn, year):
+    main_file = next((row[2] for row in conn.execute("PRAGMA database_list") if row[1] == "main"), "")
+    return os.path.join(os.path.dirname(main_file) if main_file else os.getcwd(), ARCHIVE_DIRECTORY, ARCHIVE_FILE.format(year=year))
+def _transaction_columns(conn, schema="main"): return [row[1] for row in conn.execute(f"PRAGMA {schema}.table_info(transactions)")]
+def _archive_years(conn, start_date="0000-01-01", end_date="9999-12-31"):
+    try: return [row[0] for row in conn.execute("SELECT year FROM archive_index WHERE first_day <= ? AND last_day >= ? ORDER BY year DESC", (end_date, start_date))]
+    except sqlite3.OperationalError: return []  # Skema sebelum versi 8
+
+def _ensure_archive_table(conn, schema):
+    # Kolom sama persis (urutan dan id) dengan tabel utama; kolom dari migrasi baru ditambahkan ke arsip lama
+    columns = conn.execute("PRAGMA main.table_info(transactions)").fetchall(); existing = set(_transaction_columns(conn, schema))
+    if not existing:
+        conn.execute(f"CREATE TABLE {schema}.transactions ({', '.join(c['name'] + ' ' + c['type'] + (' PRIMARY KEY' if c['pk'] else '') for c in columns)})")
+        conn.execute(f"CREATE UNIQUE INDEX {schema}.idx_archive_transaction_id ON transactions(transaction_id)")
+        conn.execute(f"CREATE INDEX {schema}.idx_archive_date_ts ON transactions(weigh_date, first_weigh_timestamp)")
+        return
+    for c in columns:
+        if c['name'] not in existing:
+            conn.execute(f"ALTER TABLE {schema}.transactions ADD COLUMN {c['name']} {c['type']}" + (f" NOT NULL DEFAULT {c['dflt_value']}" if c['notnull'] and c['dflt_value'] is not None else ""))
+            if c['name'] == "deduction_kg": _backfill_deductions(conn, schema)  # Arsip dari sebelum migrasi 11
+
+def _attach_archives(conn, years, create=False):
+    # ATTACH file arsip (sekali per koneksi, tetap ter-ATTACH untuk query berikutnya); mengembalikan tahun yang tersedia
+    attached = {row[1] for row in conn.execute("PRAGMA database_list")}; available = []
+    for year in years:
+        schema = _archive_schema(year)
+        if schema in attached: available.append(year); continue
+        path = archive_path(conn, year)
+        # ATTACH tidak bisa di dalam transaksi; arsip yang belum ter-ATTACH dilewati (mis. koneksi writer saat batch)
+        if conn.in_transaction or (not create and not os.path.exists(path)): continue
+        if len(available) >= MAX_ATTACHED_ARCHIVES: print(f"Too many archive years in one query; only the newest {MAX_ATTACHED_ARCHIVES} are included."); break
+        # Lepas arsip lain yang tidak dipakai query ini agar tidak melewati batas ATTACH
+        idle = sorted(name for name in attached if name.startswith("archive_") and int(name[8:]) not in years)
+        while idle and sum(name.startswith("archive_") for name in attached) >= MAX_ATTACHED_ARCHIVES: name = idle.pop(0); conn.execute(f"DETACH DATABASE {name}"); attached.discard(name)
+        if create: os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn.execute(f"ATTACH DATABASE ? AS {schema}", (path,)); attached.add(schema)
+        _ensure_archive_table(conn, schema); available.append(year)
+    return available
+
+def _transactions_source(conn, start_date, end_date):
+    # "transactions" jika rentang tanggal tidak mencapai arsip (kasus normal, tanpa ATTACH); selain itu subquery
+    # UNION ALL tabel utama dan tabel arsip per tahun (filter weigh_date di-push ke setiap bagian oleh SQLite)
+    years = _attach_archives(conn, _archive_years(conn, start_date, end_date))
+    if not years: return "transactions"
+    columns = ", ".join(_transaction_columns(conn))
+    return "(" + " UNION ALL ".join([f"SELECT {columns} FROM main.transactions"] + [f"SELECT {columns} FROM {_archive_schema(year)}.transactions" for year in years]) + ")"
+
+def _archive_year_of(transaction_id):
+    # Tahun dari nomor transaksi WyyMMddNNNN (sama dengan tahun weigh_date, dasar pembagian file arsip)
+    match = re.fullmatch(r"W(\d{2})\d{4}\d{4,}", transaction_id or ""); return 2000 + int(match.group(1)) if match else None
+
+def _get_archived_by_ids(conn, transaction_ids):
+    # ID berformat W dicari di arsip tahunnya saja; ID lain (mis. nomor tiket lama dari bulk_import.py) dicari di
+    # semua arsip, dari tahun terbaru, sampai semuanya ditemukan
+    wanted = {}
+    for transaction_id in transaction_ids: wanted.setdefault(_archive_year_of(transaction_id), []).append(transaction_id)
+    unknown = set(wanted.pop(None, [])); rows = []
+    for year in _attach_archives(conn, [year for year in _archive_years(conn) if year in wanted or unknown]):
+        ids = wanted.get(year, []) + sorted(unknown)
+        if not ids: continue
+        found = conn.execute(f"SELECT * FROM {_archive_schema(year)}.transactions WHERE transaction_id IN ({', '.join('?' * len(ids))})", ids).fetchall()
+        rows.extend(found); unknown.difference_update(row['transaction_id'] for row in found)
+    return rows
+
+def archive_transactions(conn, older_than_days=ARCHIVE_AFTER_DAYS, dry_run=False):
+    # Pindahkan transaksi COMPLETED dengan weigh_date lebih lama dari older_than_days ke file arsip per tahun.
+    # Salin + hapus + archive_index dalam satu transaksi per tahun; aman diulang (INSERT OR IGNORE, yang dihapus
+    # hanya baris yang sudah ada di arsip). Mengembalikan [(tahun, jumlah baris dipindah)].
+    cutoff = (date.today() - timedelta(days=older_than_days)).isoformat()
+    years = [int(row[0]) for row in conn.execute("SELECT DISTINCT substr(weigh_date, 1, 4) FROM transactions WHERE weigh_date < ? AND status = 'COMPLETED' ORDER BY 1", (cutoff,))]
+    if dry_run: return [(year, conn.execute("SELECT COUNT(*) FROM transactions WHERE weigh_date BETWEEN ? AND ? AND weigh_date < ? AND status = 'COMPLETED'", (f"{year}-01-01", f"{year}-12-31", cutoff)).fetchone()[0]) for year in years]
+    moved = []
+    for year in years:
+        _attach_archives(conn, [year], create=True); schema = _archive_schema(year); columns = ", ".join(_transaction_columns(conn))
+        where = "weigh_date BETWEEN ? AND ? AND weigh_date < ? AND status = 'COMPLETED'"; params = (f"{year}-01-01", f"{year}-12-31", cutoff)
+        def move(cursor):
+            cursor.execute(f"INSERT OR IGNORE INTO {schema}.transactions ({columns}) SELECT {columns} FROM main.transactions WHERE {where}", params)
+            cursor.execute("INSERT OR IGNORE INTO maintenance_flags (name) VALUES ('archiving')")
+            cursor.execute(f"DELETE FROM main.transactions WHERE {where} AND transaction_id IN (SELECT transaction_id FROM {schema}.transactions)", params); count = cursor.rowcount
+            cursor.execute("DELETE FROM maintenance_flags WHERE name = 'archiving'")
+            # "WHERE true" wajib: tanpa itu SQLite membaca ON CONFLICT sebagai bagian dari SELECT
+            cursor.execute(f"""INSERT INTO archive_index (year, first_day, last_day, rows) SELECT ?, MIN(weigh_date), MAX(weigh_date), COUNT(*) FROM {schema}.transactions WHERE true
+                ON CONFLICT(year) DO UPDATE SET first_day = excluded.first_day, last_day = excluded.last_day, rows = excluded.rows""", (year,))
+            return count
+        moved.append((year, _write_transaction(conn, move)))
+    return moved
+
+def get_archive_summary(conn):
+    try: return conn.execute("SELECT year, first_day, last_day, rows FROM archive_index ORDER BY year").fetchall()
+    except sqlite3.OperationalError: return []
+
+# --- Import massal (bulk_import.py): executemany per batch besar, index & trigger ditunda sampai selesai ---
+IMPORT_COLUMNS = ("transaction_id", "plate_number", "goods_type", "driver_name", "vendor", "customer", "quantity", "status", "first_weigh_kg", "second_weigh_kg", "net_weigh_kg",
+                  "first_weigh_timestamp", "second_weigh_timestamp", "weigh_date", "goods_origin", "goods_destination", "remake", "first_scale_id", "second_scale_id", "deduction_kg")
+IMPORT_STALE_SECONDS = 120  # Import yang tidak commit batch selama ini dianggap terputus (bukan sedang berjalan)
+
+def defer_transaction_schema(conn):
+    # Simpan lalu DROP index sekunder dan trigger tabel transactions (rollup, FTS, change log). UNIQUE transaction_id
+    # (autoindex) tetap ada untuk menolak duplikat. Sampai restore_deferred_schema, jangan menimbang dengan DB ini.
+    def defer(cursor):
+        objects = cursor.execute("SELECT name, type, sql FROM sqlite_master WHERE tbl_name = 'transactions' AND type IN ('index', 'trigger') AND sql IS NOT NULL").fetchall()
+        for name, object_type, sql in objects:
+            cursor.execute("INSERT OR REPLACE INTO deferred_schema (name, type, sql) VALUES (?, ?, ?)", (name, object_type, sql)); cursor.execute(f"DROP {object_type.upper()} {name}")
+        return len(objects)
+    return _write_transaction(conn, defer)
+
+def restore_deferred_schema(conn):
+    # Buat ulang index/trigger yang ditunda (index sekali bangun, bukan per baris), lalu hitung ulang data turunan
+    # yang dilewati selama trigger tidak aktif: index FTS, rollup dan nomor urut harian
+    source = _transactions_source(conn, "0000-01-01", "9999-12-31")
+    def restore(cursor):
+        existing = {row[0] for row in cursor.execute("SELECT name FROM sqlite_master")}
+        objects = cursor.execute("SELECT name, sql FROM deferred_schema ORDER BY type = 'trigger', name").fetchall()
+        for name, sql in objects:
+            if name not in existing: cursor.execute(sql)
+        cursor.execute("DELETE FROM deferred_schema")
+        if _has_fulltext(conn): cursor.execute("INSERT INTO transactions_fts (transactions_fts) VALUES ('rebuild')")
+        cursor.execute("DELETE FROM daily_rollup"); cursor.execute("DELETE FROM hourly_rollup"); _fill_rollups(cursor, source)
+        # ID asli yang berformat WyyMMddNNNN menaikkan nomor urut hari itu agar ID baru tidak bentrok
+        cursor.execute("""
+        INSERT INTO daily_sequence (day, last_seq)
+        SELECT '20' || substr(transaction_id, 2, 2) || '-' || substr(transaction_id, 4, 2) || '-' || substr(transaction_id, 6, 2), MAX(CAST(substr(transaction_id, 8) AS INTEGER))
+        FROM transactions WHERE transaction_id GLOB 'W[0-9][0-9][0-9][0-9][0-9][0-9][0-9]*' GROUP BY 1
+        ON CONFLICT(day) DO UPDATE SET last_seq = MAX(last_seq, excluded.last_seq)""")
+        return len(objects)
+    restored = _write_transaction(conn, restore); conn.execute("PRAGMA optimize")
+    return restored
+
+def _restore_interrupted_import(conn):
+    # Dipanggil init_db: index/trigger yang masih tertunda karena import terputus dibuat ulang sebelum DB dipakai menimbang
+    try:
+        if conn.execute("SELECT 1 FROM deferred_schema LIMIT 1").fetchone() is None: return
+        running = conn.execute("SELECT 1 FROM import_progress WHERE finished_at IS NULL AND updated_at > datetime('now', 'localtime', ?)", (f"-{IMPORT_STALE_SECONDS} seconds",)).fetchone()
+    except sqlite3.OperationalError: return
+    if running: print("Warning: a bulk import is running (or stopped less than 2 minutes ago) on this database; indexes and triggers are restored when it finishes."); return
+    print("Restoring indexes and triggers left deferred by an interrupted bulk import..."); restore_deferred_schema(conn)
+
+def begin_bulk_import(conn, source, fingerprint, restart=False):
+    # Mengembalikan jumlah baris sumber yang sudah diproses (0 = mulai dari awal), atau None jika file ini sudah selesai diimport.
+    # File yang berubah (ukuran/waktu) dimulai lagi dari awal; baris yang sudah ada dilewati sebagai duplikat.
+    row = conn.execute("SELECT fingerprint, rows_done, finished_at FROM import_progress WHERE source = ?", (source,)).fetchone()
+    if row is not None and row['fingerprint'] == fingerprint and not restart:
+        if row['finished_at'] is not None: return None
+        rows_done = row['rows_done']
+    else:
+        rows_done = 0
+        def reset(cursor):
+            cursor.execute("""INSERT INTO import_progress (source, fingerprint, started_at, updated_at) VALUES (?, ?, datetime('now', 'localtime'), datetime('now', 'localtime'))
+                ON CONFLICT(source) DO UPDATE SET fingerprint = excluded.fingerprint, rows_done = 0, inserted = 0, duplicates = 0, rejected = 0,
+                started_at = excluded.started_at, updated_at = excluded.updated_at, finished_at = NULL""", (source, fingerprint))
+        _write_transaction(conn, reset)
+    defer_transaction_schema(conn)
+    return rows_done
+
+def insert_imported_batch(conn, source, rows, rows_done, rejected=0):
+    # Satu transaksi per batch: baris (urutan IMPORT_COLUMNS) + posisi import, jadi posisi tidak pernah mendahului data.
+    # ID yang sudah ada dilewati (ON CONFLICT DO NOTHING) dan dihitung sebagai duplikat. Mengembalikan jumlah baris baru.
+    query = f"INSERT INTO transactions ({', '.join(IMPORT_COLUMNS)}) VALUES ({', '.join('?' * len(IMPORT_COLUMNS))}) ON CONFLICT(transaction_id) DO NOTHING"
+    def insert(cursor):
+        inserted = cursor.executemany(query, rows).rowcount if rows else 0
+        cursor.execute("""UPDATE import_progress SET rows_done = ?, inserted = inserted + ?, duplicates = duplicates + ?, rejected = rejected + ?,
+            updated_at = datetime('now', 'localtime') WHERE source = ?""", (rows_done, inserted, len(rows) - inserted, rejected, source))
+        return inserted
+    return _write_transaction(conn, insert)
+
+def finish_bulk_import(conn, source):
+    restore_deferred_schema(conn)
+    _write_transaction(conn, lambda cursor: cursor.execute("UPDATE import_progress SET finished_at = datetime('now', 'localtime') WHERE source = ?", (source,)))
+    return conn.execute("SELECT * FROM import_progress WHERE source = ?", (source,)).fetchone()
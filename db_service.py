@@ -0,0 +1,160 @@
+# File: db_service.py (Layanan database asinkron: SQLite hanya diakses dari thread worker, GUI tidak pernah menunggu)
+#
+# Pemakaian dari GUI:
+#   self.db.read(get_transaction_by_id, transaction_id, callback=self.tampilkan_transaksi)
+#   self.db.write(create_first_weigh, data, callback=self.selesai_simpan)
+# Fungsi di database.py dipanggil dengan koneksi milik worker sebagai argumen pertama. Callback dijalankan
+# di thread GUI (lewat signal Qt), dan setiap pemanggilan juga mengembalikan concurrent.futures.Future.
+# Baris transaksi dari hasil query disimpan di cache LRU (transaction_cache.py); get_transaction() memakai
+# cache itu sehingga klik baris dan cetak ulang slip biasanya tidak perlu ke thread database sama sekali.
+# Lama setiap fungsi database.py dicatat per koneksi di histogram db_query_seconds (metrics.py), begitu juga
+# panjang antrean setiap worker (db_queue_depth) dan statistik cache.
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from PySide6.QtCore import QObject, Signal
+
+import database
+from transaction_cache import TransactionCache, DEFAULT_CACHE_SIZE
+from metrics import METRICS
+
+class _DbWorker(threading.Thread):
+    def __init__(self, name, connect, service, batch_writes=False, wait_for=None):
+        super().__init__(name=name, daemon=True)
+        self._connect = connect; self._service = service; self._batch_writes = batch_writes; self._wait_for = wait_for
+        self._queue = queue.Queue(); self.ready = threading.Event(); self._histograms = {}
+        METRICS.gauge("db_queue_depth", "Requests waiting for a database worker", function=self._queue.qsize, connection=name)
+
+    def submit(self, request): self._queue.put(request)
+    def stop(self): self._queue.put(None)
+
+    def run(self):
+        if self._wait_for is not None: self._wait_for.wait()
+        try: conn = self._connect()
+        except Exception as e:
+            print(f"Error opening database connection in {self.name}: {e}"); self.ready.set(); self._fail_pending(e); return
+        self.ready.set()
+        try:
+            running = True
+            while running:
+                request = self._queue.get()
+                if request is None: break
+                batch = [request]
+                if self._batch_writes:
+                    # Gabungkan semua permintaan tulis yang sudah antre menjadi satu transaksi (satu commit)
+                    while True:
+                        try: request = self._queue.get_nowait()
+                        except queue.Empty: break
+                        if request is None: running = False; break
+                        batch.append(request)
+                if len(batch) == 1: self._run_single(conn, batch[0])
+                else: self._run_batch(conn, batch)
+        finally: conn.close()
+
+    def _histogram(self, func):
+        # Histogram per fungsi database, dibuat sekali (hanya dipakai dari thread worker ini)
+        histogram = self._histograms.get(func)
+        if histogram is None: histogram = self._histograms[func] = METRICS.histogram("db_query_seconds", "Time spent running a database.py function", query=getattr(func, "__name__", "query"), connection=self.name)
+        return histogram
+
+    def _run_single(self, conn, request):
+        func, args, kwargs, future, callback, error_callback = request; token = self._service.cache.begin()
+        try:
+            with self._histogram(func).time(): result = func(conn, *args, **kwargs)
+        except Exception as e: self._service._finish(future, None, e, callback, error_callback); return
+        if self._batch_writes: self._update_cache(conn, [request])
+        else: self._service.cache.remember(result, token)
+        self._service._finish(future, result, None, callback, error_callback)
+
+    def _update_cache(self, conn, requests):
+        # Setelah commit: buang entri yang berubah, lalu baca ulang hasil timbang kedua (write-through)
+        for func, args, *_ in requests:
+            transaction_id = self._service.cache.written(func, args)
+            if transaction_id is None: continue
+            try: self._service.cache.remember(database.get_transaction_by_id(conn, transaction_id))
+            except Exception as e: print(f"Error refreshing cached transaction {transaction_id}: {e}")
+
+    def _run_batch(self, conn, batch):
+        outcomes = []
+        try:
+            conn.execute("BEGIN IMMEDIATE"); conn.batching = True
+            for func, args, kwargs, future, callback, error_callback in batch:
+                # Savepoint per permintaan: kegagalan satu permintaan tidak membatalkan yang lain
+                conn.execute("SAVEPOINT batch_item"); started = time.perf_counter()
+                try: result = func(conn, *args, **kwargs); error = None
+                except Exception as e: conn.execute("ROLLBACK TO batch_item"); result = None; error = e
+                self._histogram(func).observe(time.perf_counter() - started)
+                conn.execute("RELEASE batch_item"); outcomes.append((result, error))
+            conn.batching = False
+            with self._histogram(conn.commit).time(): conn.commit()
+        except Exception as e:
+            conn.batching = False
+            if conn.in_transaction: conn.rollback()
+            outcomes = [(None, e)] * len(batch)
+        self._update_cache(conn, batch)
+        # Hasil baru dikirim setelah commit, jadi callback selalu melihat data yang sudah tersimpan
+        for (func, args, kwargs, future, callback, error_callback), (result, error) in zip(batch, outcomes):
+            self._service._finish(future, result, error, callback, error_callback)
+
+    def _fail_pending(self, error):
+        while True:
+            try: request = self._queue.get_nowait()
+            except queue.Empty: return
+            if request is not None: self._service._finish(request[3], None, error, request[4], request[5])
+
+class DatabaseService(QObject):
+    _completed = Signal(object, object, object, object)  # callback, result, error, error_callback
+
+    def __init__(self, path=None, parent=None, cache_size=DEFAULT_CACHE_SIZE):
+        super().__init__(parent)
+        self.path = path or database.DATABASE_FILE; self.cache = TransactionCache(cache_size)
+        METRICS.gauge("transaction_cache_rows", "Rows held in the transaction cache", function=lambda: self.cache.stats()["size"])
+        METRICS.gauge("transaction_cache_hit_rate", "Transaction cache hit rate since start", function=self._cache_hit_rate)
+        # Signal dipancarkan dari thread worker -> otomatis queued ke thread GUI
+        self._completed.connect(self._deliver)
+        # Writer menjalankan init_db (migrasi) dulu; reader baru membuka koneksi setelah skema siap
+        self._writer = _DbWorker("db-writer", lambda: database.init_db(self.path), self, batch_writes=True)
+        self._reader = _DbWorker("db-reader", lambda: database.connect_db(self.path), self, wait_for=self._writer.ready)
+
+    def _cache_hit_rate(self):
+        stats = self.cache.stats()
+        return stats["hit_rate"] if stats["hits"] + stats["misses"] else None  # Belum ada pencarian: tidak ditampilkan
+
+    def start(self):
+        self._writer.start(); self._reader.start(); return self
+
+    def stop(self):
+        for worker in (self._reader, self._writer): worker.stop()
+        for worker in (self._reader, self._writer):
+            if worker.is_alive(): worker.join()
+
+    def read(self, func, *args, callback=None, error_callback=None, **kwargs):
+        return self._submit(self._reader, func, args, kwargs, callback, error_callback)
+
+    def write(self, func, *args, callback=None, error_callback=None, **kwargs):
+        return self._submit(self._writer, func, args, kwargs, callback, error_callback)
+
+    def get_transaction(self, transaction_id, callback=None, error_callback=None):
+        # Seperti read(get_transaction_by_id, ...), tetapi baris dari cache langsung dipakai tanpa antre ke reader
+        row = self.cache.get(transaction_id)
+        if row is None: return self.read(database.get_transaction_by_id, transaction_id, callback=callback, error_callback=error_callback)
+        future = Future(); future.set_result(row)
+        if callback is not None: callback(row)
+        return future
+
+    def _submit(self, worker, func, args, kwargs, callback, error_callback):
+        future = Future(); worker.submit((func, args, kwargs, future, callback, error_callback)); return future
+
+    def _finish(self, future, result, error, callback, error_callback):
+        if error is None: future.set_result(result)
+        else: future.set_exception(error)
+        if callback is not None or error is not None: self._completed.emit(callback, result, error, error_callback)
+
+    def _deliver(self, callback, result, error, error_callback):
+        if error is not None:
+            print(f"Database error: {error}")
+            if error_callback is not None: error_callback(error)
+            return
+        callback(result)
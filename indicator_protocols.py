@@ -0,0 +1,180 @@
+# File: indicator_protocols.py (Parser frame indikator timbangan, inkremental per byte)
+#
+# Setiap parser menerima potongan byte apa adanya dari port serial (feed), menyimpan sisa frame yang belum
+# lengkap di buffer, dan mengembalikan Reading untuk setiap frame yang valid. Tidak perlu newline, jadi
+# indikator yang mengirim stream kontinu juga bisa dibaca.
+
+import re
+from abc import ABC, abstractmethod
+from collections import namedtuple
+
+# stable: True/False dari flag indikator, atau None jika protokol tidak mengirim flag stabil
+Reading = namedtuple("Reading", ["weight", "stable", "unit"])
+
+_NUMBER_WITH_UNIT = re.compile(rb'([-+]?\d*\.\d+|[-+]?\d+)\s*([A-Za-z]*)')
+STX = 0x02
+CR = 0x0D
+
+def _as_bytes(value): return value.encode('latin-1') if isinstance(value, str) else bytes(value)
+
+class FrameParser(ABC):
+    # Subclass wajib mengisi _split_frames, parse_frame dan encode; yang kurang gagal saat dibuat, bukan di thread serial
+    name = ""
+    description = ""
+
+    def __init__(self, max_buffer=4096):
+        self._buffer = bytearray(); self.max_buffer = max_buffer
+        self.frames_ok = 0; self.frames_rejected = 0
+
+    def feed(self, data):
+        self._buffer += data; readings = []
+        for frame in self._split_frames():
+            reading = self.parse_frame(frame)
+            if reading is None: self.frames_rejected += 1
+            else: self.frames_ok += 1; readings.append(reading)
+        # Buang data sampah yang tidak pernah membentuk frame agar buffer tidak tumbuh terus
+        if len(self._buffer) > self.max_buffer: del self._buffer[:-self.max_buffer]
+        return readings
+
+    def reset(self): self._buffer.clear()
+
+    @abstractmethod
+    def _split_frames(self): ...
+    @abstractmethod
+    def parse_frame(self, frame): ...
+
+    @classmethod
+    @abstractmethod
+    def encode(cls, weight, stable=True):
+        # Membuat satu frame contoh (dipakai benchmark dan pengetesan tanpa indikator fisik)
+        ...
+
+class DelimitedFrameParser(FrameParser):
+    terminator = b"\n"
+
+    def __init__(self, terminator=None, max_buffer=4096):
+        super().__init__(max_buffer)
+        if terminator is not None: self.terminator = _as_bytes(terminator)
+
+    def _split_frames(self):
+        buffer = self._buffer; terminator = self.terminator; start = 0
+        while True:
+            end = buffer.find(terminator, start)
+            if end < 0: break
+            frame = bytes(buffer[start:end]).strip()
+            if frame: yield frame
+            start = end + len(terminator)
+        if start: del buffer[:start]
+
+class GenericLineParser(DelimitedFrameParser):
+    # Perilaku lama: angka pertama pada setiap baris, tanpa flag stabil
+    name = "generic_line"
+    description = "Generic ASCII line (first number per line)"
+
+    def parse_frame(self, frame):
+        match = _NUMBER_WITH_UNIT.search(frame)
+        if not match: return None
+        return Reading(float(match.group(1)), None, match.group(2).decode('ascii').lower() or None)
+
+    @classmethod
+    def encode(cls, weight, stable=True): return f"{weight:.1f} kg\r\n".encode('ascii')
+
+class StGsParser(DelimitedFrameParser):
+    # Format umum indikator A&D / Avery / banyak indikator lokal: "ST,GS,+0012345kg\r\n"
+    # ST = stabil, US = bergerak, OL = overload (frame ditolak). GS/NT = gross/net.
+    name = "st_gs"
+    description = "ST/US,GS/NT comma-separated (A&D style)"
+    terminator = b"\r\n"
+
+    def parse_frame(self, frame):
+        fields = frame.split(b",")
+        if len(fields) < 2: return None
+        header = fields[0].strip().upper()
+        if header not in (b"ST", b"US"): return None
+        match = _NUMBER_WITH_UNIT.search(fields[-1])
+        if not match: return None
+        return Reading(float(match.group(1)), header == b"ST", match.group(2).decode('ascii').lower() or None)
+
+    @classmethod
+    def encode(cls, weight, stable=True): return f"{'ST' if stable else 'US'},GS,{weight:+09.1f}kg\r\n".encode('ascii')
+
+class ToledoContinuousParser(FrameParser):
+    # Mettler Toledo continuous output: STX, SWA, SWB, SWC, 6 digit berat, 6 digit tara, CR, [checksum]
+    name = "toledo_continuous"
+    description = "Mettler Toledo continuous (STX framed, status bytes)"
+    FRAME_LENGTH = 17
+    # SWA bit 0-2: posisi titik desimal
+    DECIMAL_FACTORS = (100, 10, 1, 0.1, 0.01, 0.001, 0.0001, 0.00001)
+
+    def __init__(self, checksum=True, max_buffer=4096):
+        super().__init__(max_buffer); self.checksum = checksum
+
+    def _split_frames(self):
+        buffer = self._buffer; length = self.FRAME_LENGTH + (1 if self.checksum else 0); start = 0
+        while True:
+            start = buffer.find(STX, start)
+            if start < 0: buffer.clear(); return
+            if len(buffer) - start < length: break
+            frame = bytes(buffer[start:start + length])
+            if frame[self.FRAME_LENGTH - 1] != CR:
+                start += 1; continue  # Bukan awal frame yang sebenarnya, cari STX berikutnya
+            yield frame; start += length
+        if start: del buffer[:start]
+
+    def parse_frame(self, frame):
+        if self.checksum and (sum(frame) & 0x7F) != 0: return None
+        swa, swb = frame[1], frame[2]
+        if swb & 0x04: return None  # Over/under range
+        digits = frame[4:10]
+        if not digits.strip().isdigit(): return None
+        weight = int(digits) * self.DECIMAL_FACTORS[swa & 0x07]
+        if swb & 0x02: weight = -weight
+        return Reading(float(weight), not (swb & 0x08), "kg" if swb & 0x10 else "lb")
+
+    @classmethod
+    def encode(cls, weight, stable=True):
+        swa = 0x20 | 0x03  # Satu angka desimal
+        swb = 0x20 | 0x10 | (0x02 if weight < 0 else 0) | (0 if stable else 0x08)
+        body = bytes([STX, swa, swb, 0x20]) + f"{round(abs(weight) * 10):06d}".encode('ascii') + b"000000" + bytes([CR])
+        return body + bytes([(-sum(body)) & 0x7F])
+
+class Xk3190ReverseParser(FrameParser):
+    # Indikator XK3190 (mode kontinu): "=" diikuti digit berat dalam urutan terbalik, tanpa newline.
+    # Contoh 1250.0 kg dikirim sebagai "=0.0521" (angka nol di depan menjadi nol di belakang).
+    name = "xk3190_reverse"
+    description = "XK3190 continuous ('=' delimited, reversed digits)"
+
+    def __init__(self, delimiter="=", max_buffer=4096):
+        super().__init__(max_buffer); self.delimiter = _as_bytes(delimiter)
+
+    def _split_frames(self):
+        # Frame lengkap = teks di antara dua delimiter
+        buffer = self._buffer; delimiter = self.delimiter
+        start = buffer.find(delimiter)
+        if start < 0: buffer.clear(); return
+        while True:
+            end = buffer.find(delimiter, start + len(delimiter))
+            if end < 0: break
+            frame = bytes(buffer[start + len(delimiter):end]).strip()
+            if frame: yield frame
+            start = end
+        del buffer[:start]
+
+    def parse_frame(self, frame):
+        text = frame[::-1]
+        negative = text.startswith(b"-") or text.endswith(b"-")
+        try: weight = float(text.strip(b"-+"))
+        except ValueError: return None
+        return Reading(-weight if negative else weight, None, "kg")
+
+    @classmethod
+    def encode(cls, weight, stable=True): return b"=" + f"{weight:07.1f}".encode('ascii')[::-1]
+
+PROTOCOLS = {parser.name: parser for parser in (GenericLineParser, StGsParser, ToledoContinuousParser, Xk3190ReverseParser)}
+DEFAULT_PROTOCOL = GenericLineParser.name
+
+def create_parser(config):
+    # config: dict dari config.json, memakai kunci "protocol" dan "protocol_options"
+    name = config.get("protocol", DEFAULT_PROTOCOL)
+    if name not in PROTOCOLS: print(f"Protokol '{name}' tidak dikenal, memakai {DEFAULT_PROTOCOL}."); name = DEFAULT_PROTOCOL
+    return PROTOCOLS[name](**config.get("protocol_options", {}))
@@ -0,0 +1,161 @@
+# File: live_weight_shm.py (Berat live di shared memory untuk program lain di PC yang sama)
+#
+# Papan display luar, skrip kamera, lampu lalu lintas dll. bisa membaca berat dan status stabil setiap pembacaan
+# indikator tanpa socket, tanpa serialisasi, dan tanpa membebani aplikasi utama:
+#
+#   from live_weight_shm import LiveWeightReader
+#   with LiveWeightReader("weighing_live_1") as reader:
+#       for reading in reader.readings():          # Hanya pembacaan baru; otomatis sambung ulang saat aplikasi restart
+#           print(reading.weight, reading.stable)
+#
+# Atau dari terminal: python live_weight_shm.py weighing_live_1
+#
+# Layout segmen (64 byte, little-endian):
+#   0  magic "WLIVE001" | 8 versi u16 | 10 flags u16 (1 = penulis aktif) | 12 pid penulis u32
+#   16 seqlock u64: ganjil = sedang ditulis, genap = konsisten
+#   24 nomor pembacaan u64 | 32 timestamp epoch f64 | 40 berat f64 | 48 stabil i8 | 49 flag stabil indikator i8 (-1 = tidak ada)
+# Satu penulis (thread timbangan) per segmen; pembaca mengulang baca jika seqlock berubah di tengah jalan.
+
+import os
+import struct
+import sys
+import time
+from collections import namedtuple
+from multiprocessing import shared_memory
+
+MAGIC = b"WLIVE001"
+VERSION = 1
+HEADER = struct.Struct("<8sHHI")
+SEQ = struct.Struct("<Q")
+SEQ_OFFSET = 16
+DATA = struct.Struct("<Qddbb6x")
+DATA_OFFSET = 24
+SEGMENT_SIZE = 64
+FLAG_ACTIVE = 1
+DEFAULT_PREFIX = "weighing_live"
+READ_RETRIES = 1000
+POLL_INTERVAL = 0.01
+REOPEN_INTERVAL = 1.0
+
+LiveReading = namedtuple("LiveReading", ["seq", "timestamp", "weight", "stable", "indicator_stable"])
+
+def segment_name(scale_id, prefix=DEFAULT_PREFIX): return f"{prefix}_{scale_id}"
+
+def _pid_alive(pid):
+    # Di Windows segmen hilang bersama proses terakhir yang membukanya, jadi segmen yang ada = penulisnya masih hidup
+    if os.name == "nt": return True
+    try: os.kill(pid, 0)
+    except ProcessLookupError: return False
+    except PermissionError: pass
+    return True
+
+def _attach(name):
+    # Python < 3.13 mendaftarkan segmen yang hanya dibuka ke resource_tracker, yang lalu menghapus (unlink) segmen
+    # milik penulis saat pembaca keluar. Pembaca tidak boleh memiliki segmen: lepaskan dari tracker (kecuali
+    # penulisnya proses ini sendiri, karena tracker per proses dan pendaftaran itu milik penulis).
+    try: return shared_memory.SharedMemory(name, track=False)
+    except TypeError: pass
+    shm = shared_memory.SharedMemory(name)
+    if os.name != "nt" and HEADER.unpack_from(shm.buf, 0)[3] != os.getpid():
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+class LiveWeightWriter:
+    # Dipanggil AcquisitionPipeline untuk setiap pembacaan mentah (antarmuka sama dengan WeightRecorder.record)
+    def __init__(self, name):
+        self.name = name; self._seq = 0; self._count = 0
+        try: self._shm = shared_memory.SharedMemory(name, create=True, size=SEGMENT_SIZE)
+        except FileExistsError:
+            # Sisa proses yang crash (Linux/macOS): dipakai ulang, kecuali penulisnya masih hidup
+            self._shm = shared_memory.SharedMemory(name)
+            magic, _, flags, pid = HEADER.unpack_from(self._shm.buf, 0)
+            if magic == MAGIC and flags & FLAG_ACTIVE and _pid_alive(pid):
+                self._shm.close(); raise RuntimeError(f"shared memory '{name}' is already published by process {pid}")
+            self._seq = SEQ.unpack_from(self._shm.buf, SEQ_OFFSET)[0] & ~1 if magic == MAGIC else 0
+        self._buf = self._shm.buf
+        SEQ.pack_into(self._buf, SEQ_OFFSET, self._seq); HEADER.pack_into(self._buf, 0, MAGIC, VERSION, FLAG_ACTIVE, os.getpid())
+
+    def record(self, weight, stable, indicator_stable=None, timestamp=None):
+        # Seqlock: nomor ganjil -> tulis data -> nomor genap. Pembaca yang melihat angka ganjil atau angka yang
+        # berbeda sebelum/sesudah membaca data akan mengulang. (Urutan tulis dijamin di x86; cukup untuk PC timbangan.)
+        self._seq += 1; SEQ.pack_into(self._buf, SEQ_OFFSET, self._seq)
+        self._count += 1
+        DATA.pack_into(self._buf, DATA_OFFSET, self._count, time.time() if timestamp is None else timestamp, weight, 1 if stable else 0, -1 if indicator_stable is None else int(indicator_stable))
+        self._seq += 1; SEQ.pack_into(self._buf, SEQ_OFFSET, self._seq)
+
+    def close(self):
+        if self._buf is None: return
+        # Flag nonaktif dulu agar pembaca tahu harus membuka ulang setelah aplikasi restart
+        HEADER.pack_into(self._buf, 0, MAGIC, VERSION, 0, os.getpid()); self._buf = None
+        self._shm.close()
+        try: self._shm.unlink()
+        except FileNotFoundError: pass
+
+def create_live_writer(scale):
+    # scale: dict dari app_config.load_scales. "live_feed": {"enabled": true, "prefix": "weighing_live"} -> segmen
+    # <prefix>_<id timbangan>; "name" hanya untuk entri di "scales" yang butuh nama segmen tertentu.
+    options = scale.get("live_feed", {})
+    if not options.get("enabled", True): return None
+    name = options.get("name") or segment_name(scale.get("id", "1"), options.get("prefix", DEFAULT_PREFIX))
+    try: writer = LiveWeightWriter(name)
+    except (OSError, RuntimeError) as e: print(f"Live weight feed dinonaktifkan: {e}"); return None
+    print(f"Live weight feed: shared memory '{name}'"); return writer
+
+class LiveWeightReader:
+    def __init__(self, name):
+        self.name = name; self._shm = _attach(name); self._buf = self._shm.buf
+        magic, version, _, _ = HEADER.unpack_from(self._buf, 0)
+        if magic != MAGIC or version != VERSION: self.close(); raise ValueError(f"shared memory '{name}' is not a live weight feed")
+
+    @property
+    def active(self): return bool(HEADER.unpack_from(self._buf, 0)[2] & FLAG_ACTIVE)
+
+    def read(self):
+        # Pembacaan terakhir (LiveReading), atau None jika belum ada pembacaan sama sekali
+        for _ in range(READ_RETRIES):
+            before = SEQ.unpack_from(self._buf, SEQ_OFFSET)[0]
+            if before & 1: time.sleep(0); continue  # Penulis sedang menulis (atau sedang di-preempt OS di tengah tulis)
+            seq, timestamp, weight, stable, indicator_stable = DATA.unpack_from(self._buf, DATA_OFFSET)
+            if SEQ.unpack_from(self._buf, SEQ_OFFSET)[0] == before:
+                return LiveReading(seq, timestamp, weight, bool(stable), None if indicator_stable < 0 else bool(indicator_stable)) if seq else None
+        raise TimeoutError(f"live weight feed '{self.name}' kept changing while reading")
+
+    def readings(self, poll_interval=POLL_INTERVAL):
+        # Generator pembacaan baru. Jika penulis berhenti (aplikasi ditutup/restart), segmen dibuka ulang otomatis.
+        last_seq = None
+        while True:
+            if not self.active:
+                self._reopen(); last_seq = None; continue
+            reading = self.read()
+            if reading is not None and reading.seq != last_seq: last_seq = reading.seq; yield reading
+            else: time.sleep(poll_interval)
+
+    def _reopen(self):
+        self.close()
+        while True:
+            time.sleep(REOPEN_INTERVAL)
+            try:
+                shm = _attach(self.name)
+                if HEADER.unpack_from(shm.buf, 0)[2] & FLAG_ACTIVE: self._shm = shm; self._buf = shm.buf; return
+                shm.close()
+            except FileNotFoundError: pass
+
+    def close(self):
+        if self._buf is not None: self._buf = None; self._shm.close()
+    def __enter__(self): return self
+    def __exit__(self, *exc): self.close()
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    name = argv[0] if argv else segment_name("1")
+    try:
+        with LiveWeightReader(name) as reader:
+            for reading in reader.readings():
+                print(f"{reading.seq:>10d}  {time.strftime('%H:%M:%S', time.localtime(reading.timestamp))}  {reading.weight:12,.2f}  {'STABLE' if reading.stable else 'UNSTABLE'}", flush=True)
+    except FileNotFoundError: print(f"Shared memory '{name}' not found. Is the weighing application running?", file=sys.stderr); return 1
+    except KeyboardInterrupt: pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,14 +3,15 @@
 from PySide6.QtWidgets import (QWidget, QLabel, QLineEdit, QPushButton, QVBoxLayout, QMessageBox)
 from PySide6.QtCore import Qt, Signal
 from PySide6.QtGui import QFont
-from database import verify_user, init_db # Import fungsi baru
+from database import verify_user # Import fungsi baru
 
 class LoginWindow(QWidget):
     login_successful = Signal(str)
 
-    def __init__(self):
+    def __init__(self, db):
         super().__init__()
-        self.db_conn = init_db() # Buka koneksi DB
+        # DatabaseService milik aplikasi (db_service.py), dipakai ulang oleh MainWindow setelah login
+        self.db = db
         
         self.setWindowTitle("WAIO System - Login"); self.setGeometry(0, 0, 400, 250)
         self.setStyleSheet("""
@@ -29,13 +30,14 @@ class LoginWindow(QWidget):
         password = self.password_input.text()
         
         # Ganti pengecekan hardcoded dengan verifikasi ke database
-        if verify_user(self.db_conn, username, password):
+        self.login_button.setEnabled(False)
+        self.db.read(verify_user, username, password, callback=lambda ok: self.selesai_login(username, ok), error_callback=lambda e: self.selesai_login(username, False))
+
+    def selesai_login(self, username, ok):
+        self.login_button.setEnabled(True)
+        if ok:
             print(f"Login berhasil untuk user: {username}")
             self.login_successful.emit(username)
             self.close()
         else:
-            QMessageBox.warning(self, "Login Failed", "Invalid username or password.")
-            
-    def closeEvent(self, event):
-        if self.db_conn: self.db_conn.close()
-        event.accept()
\ No newline at end of file
+            QMessageBox.warning(self, "Login Failed", "Invalid username or password.")
\ No newline at end of file
@@ -2,45 +2,34 @@
 
 import sys
 import time
-import random
+STARTUP_STARTED = time.perf_counter()  # Diambil sebelum import Qt, untuk log waktu startup
 from datetime import datetime
-import re
-import serial
-from collections import deque 
 import json # <-- DITAMBAHKAN: Untuk membaca file konfigurasi
+from urllib.parse import urlencode
 
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QLabel, QLineEdit, 
     QPushButton, QVBoxLayout, QHBoxLayout, QGridLayout, 
-    QFrame, QMessageBox, QStatusBar,
-    QTableWidget, QTableWidgetItem, QAbstractItemView, QHeaderView
+    QFrame, QMessageBox, QStatusBar, QComboBox,
+    QTableView, QAbstractItemView, QHeaderView, QCompleter
 )
-from PySide6.QtCore import QThread, Qt, Signal, QObject, QTimer
-from PySide6.QtGui import QFont, QColor, QBrush, QDoubleValidator, QTextDocument
-from PySide6.QtPrintSupport import QPrinter, QPrintPreviewDialog
+from PySide6.QtCore import Qt, Signal, QObject, QTimer, QUrl, QStringListModel
+from PySide6.QtGui import QDoubleValidator, QKeySequence, QShortcut
 
-from database import init_db, create_first_weigh, complete_second_weigh, get_filtered_transactions, find_pending_by_plate_number, get_transaction_by_id, generate_transaction_id
-from report_window import ReportWindow
+from database import create_first_weigh, complete_second_weigh, get_transactions_page, find_pending_by_plate_number, get_pending_transactions, peek_next_transaction_id
+from transaction_table_model import TransactionTableModel, StatusColorDelegate, STATUS_COLUMN, format_short_date
+from change_feed import ChangeFeed
+from pending_index import PendingIndex
+from db_service import DatabaseService
+from acquisition import WeightState, create_scale_source
+from app_config import load_config, load_scales
+from scale_registry import ScaleRegistry
 from login_window import LoginWindow
-from settings_window import SettingsWindow 
+from metrics import METRICS, PROFILER, SLOW_ACTION_SECONDS, create_dumper, operator_action, status_summary
+# report_window (reportlab), settings_window, QtPrintSupport dan pyserial baru di-import saat pertama dipakai:
+# form login tampil lebih cepat di PC timbangan yang lambat
 
-STABILITY_WINDOW_SIZE = 5
-STABILITY_TOLERANCE = 2.0
-CONFIG_FILE = "config.json" # <-- DITAMBAHKAN: Nama file konfigurasi
-
-# --- DITAMBAHKAN: Fungsi untuk memuat pengaturan dari file ---
-def load_config():
-    """Membaca file config.json dan mengembalikan pengaturannya."""
-    try:
-        with open(CONFIG_FILE, 'r') as f:
-            config = json.load(f)
-            # Pastikan nilai baudrate adalah integer
-            config['baudrate'] = int(config.get('baudrate', 9600))
-            return config
-    except (FileNotFoundError, json.JSONDecodeError):
-        # Jika file tidak ada atau rusak, kembalikan pengaturan default
-        return {"port": "COM1", "baudrate": 9600}
-# -------------------------------------------------------------
+REMOTE_RECONNECT_MS = 3000
 
 STYLESHEET = """
     #main_window, #main_widget { background-color: #1A2C2C; } 
@@ -63,8 +52,8 @@ STYLESHEET = """
     QPushButton#print_button { background-color: #3182CE; color: white; font-size: 9pt; font-weight: bold; padding: 5px 10px; border-radius: 4px; }
     QPushButton#print_button:hover { background-color: #2B6CB0; }
     QStatusBar { background-color: #2D3748; color: #A0AEC0; font-size: 9pt; }
-    QTableWidget { background-color: #2D3748; border-radius: 8px; border: 1px solid #4A5568; gridline-color: #4A5568; }
-    QTableWidget::item { padding: 5px; }
+    QTableView { background-color: #2D3748; border-radius: 8px; border: 1px solid #4A5568; gridline-color: #4A5568; }
+    QTableView::item { padding: 5px; }
     QHeaderView::section { background-color: #1A202C; color: #E2E8F0; padding: 8px; border-bottom: 1px solid #4A5568; border-right: 1px solid #4A5568; font-size: 9pt; font-weight: bold; }
     QMessageBox { background-color: #2D3748; }
     QMessageBox QLabel { color: #E2E8F0; font-size: 10pt; font-weight: normal; }
@@ -72,40 +61,57 @@ STYLESHEET = """
     QMessageBox QPushButton:hover { background-color: #319795; }
 """
 
-class TimbanganSimulatorWorker(QObject):
-    data_terbaca = Signal(float)
-    def __init__(self): super().__init__(); self.is_running = True; self.base_weight = 12500.0; self.stability_counter = 0
-    def run(self):
-        while self.is_running:
-            if self.stability_counter < 10: simulated_weight = self.base_weight + random.uniform(-1.5, 1.5)
-            else: simulated_weight = self.base_weight + random.uniform(-5.0, 5.0)
-            self.data_terbaca.emit(simulated_weight); self.stability_counter = (self.stability_counter + 1) % 16; time.sleep(0.5)
-    def stop(self): self.is_running = False
+class TimbanganWorker(QObject):
+    # Pembungkus Qt untuk loop pembacaan tanpa Qt di acquisition.py (simulator, replay rekaman, atau port serial)
+    state_berubah = Signal(object)  # WeightState, sudah digabung per frame tampilan oleh AcquisitionPipeline
+    error_terjadi = Signal(str)
+    def __init__(self, scale):
+        super().__init__(); self.backlog = METRICS.gauge("scale_signal_backlog", "Weight updates emitted by a scale worker but not yet handled by the GUI", scale=scale["id"])
+        self.source = create_scale_source(scale, self.kirim_state, self.error_terjadi.emit)
+    def kirim_state(self, state): self.backlog.inc(); self.state_berubah.emit(state)  # Diturunkan lagi oleh ScaleRegistry di thread GUI
+    def run(self): self.source.run()
+    def stop(self): self.source.stop()
 
-class TimbanganSerialWorker(QObject):
-    data_terbaca = Signal(float)
+class TimbanganRemoteWorker(QObject):
+    # Berat live dari weighing_service.py lewat WebSocket: port serial dipegang layanan, aplikasi ini hanya klien
+    state_berubah = Signal(object)
     error_terjadi = Signal(str)
-    def __init__(self, port, baudrate): super().__init__(); self.port = port; self.baudrate = baudrate; self.is_running = True; self.ser = None
+    def __init__(self, url, scale_id): super().__init__(); self.url = url; self.scale_id = scale_id; self.socket = None; self.reported = False
     def run(self):
-        try: self.ser = serial.Serial(self.port, self.baudrate, timeout=1)
-        except serial.SerialException as e: self.error_terjadi.emit(f"Gagal terhubung ke port {self.port}.\nPastikan kabel terhubung dan port sudah benar."); return
-        while self.is_running and self.ser.isOpen():
-            try:
-                line = self.ser.readline()
-                if line:
-                    decoded_line = line.decode('utf-8', errors='ignore').strip(); match = re.search(r'[-+]?\d*\.\d+|\d+', decoded_line)
-                    if match: self.data_terbaca.emit(float(match.group(0)))
-            except serial.SerialException: self.error_terjadi.emit("Koneksi ke timbangan terputus."); break
-            except Exception as e: print(f"Error saat membaca data: {e}")
-        if self.ser and self.ser.isOpen(): self.ser.close()
-    def stop(self): self.is_running = False
+        from PySide6.QtWebSockets import QWebSocket
+        # Dibuat di sini (thread worker), bukan di __init__, agar socket hidup di event loop thread yang sama
+        self.socket = QWebSocket(parent=self); self.socket.textMessageReceived.connect(self.terima_pesan)
+        self.socket.connected.connect(self.on_connected); self.socket.disconnected.connect(self.on_disconnected); self.socket.open(QUrl(self.url))
+    def terima_pesan(self, text):
+        message = json.loads(text)
+        if message.get("scale_id") != self.scale_id: return
+        if message["type"] == "weight": self.state_berubah.emit(WeightState(message["weight"], message["stable"], message["timestamp"]))
+        elif message["type"] == "error": self.error_terjadi.emit(message["message"])
+    def on_connected(self): self.reported = False
+    def on_disconnected(self):
+        # Pesan error hanya sekali per koneksi putus; setelah itu coba sambung ulang diam-diam
+        if not self.reported: self.reported = True; self.error_terjadi.emit(f"Tidak terhubung ke layanan timbangan ({self.url}).")
+        QTimer.singleShot(REMOTE_RECONNECT_MS, lambda: self.socket.open(QUrl(self.url)))
+    def stop(self): pass  # Socket ikut dihapus bersama worker saat thread selesai
+
+def create_scale_worker(scale):
+    # "remote": "host:port" -> berat diambil dari weighing_service.py (opsional "remote_scale" dan "remote_token")
+    if scale.get("remote"):
+        remote_id = str(scale.get("remote_scale", scale["id"])); query = urlencode({"scale": remote_id, **({"token": scale["remote_token"]} if scale.get("remote_token") else {})})
+        print(f">>> [{scale['name']}] MEMAKAI LAYANAN TIMBANGAN di {scale['remote']} (timbangan {remote_id}) <<<")
+        return TimbanganRemoteWorker(f"ws://{scale['remote']}/ws?{query}", remote_id)
+    return TimbanganWorker(scale)
 
 class MainWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, db=None, started=None):
         super().__init__()
         self.setObjectName("main_window"); self.setWindowTitle("RTM - Weighing System"); self.setGeometry(100, 100, 1400, 800); self.setStyleSheet(STYLESHEET)
-        self.db_conn = init_db()
-        self.weight_readings = deque(maxlen=STABILITY_WINDOW_SIZE); self.is_stable = False
+        # Semua akses SQLite lewat thread worker DatabaseService; GUI hanya menerima hasil lewat callback
+        self.db = db if db is not None else DatabaseService(parent=self).start(); self.started = started
+        self.change_feed = ChangeFeed(self.db, parent=self); self.history_date = None
+        # Kendaraan yang menunggu timbang kedua (pending_index.py): dimuat sekali, lalu mengikuti change feed
+        self.pending_index = PendingIndex(); self.db.read(get_pending_transactions, callback=self.pending_index.load); self.change_feed.transactions_changed.connect(self.pending_index.apply_changes)
+        self.is_stable = None; self.selected_scale_id = None; self.scale_errors = set()
         self.report_win = None; self.settings_win = None
         self.last_selected_transaction_id = None
         main_widget = QWidget(objectName="main_widget"); self.setCentralWidget(main_widget)
@@ -115,6 +121,8 @@ class MainWindow(QMainWindow):
         weight_card_layout = QGridLayout(weight_card)
         weight_card_layout.setContentsMargins(15, 15, 15, 15)
         self.live_weight_label = QLabel("Timbangan Saat Ini", objectName="live_weight_label")
+        self.scale_selector = QComboBox(); self.scale_selector.setToolTip("Scale used for the next weigh"); self.scale_selector.setVisible(False)
+        live_weight_header = QHBoxLayout(); live_weight_header.addStretch(); live_weight_header.addWidget(self.live_weight_label); live_weight_header.addWidget(self.scale_selector); live_weight_header.addStretch()
         self.live_weight_display = QLabel("0.00", objectName="live_weight_display")
         self.stability_status_label = QLabel("CONNECTING...")
         self.stability_status_label.setStyleSheet("font-size: 10pt; font-weight: bold; color: #A0AEC0;")
@@ -124,7 +132,7 @@ class MainWindow(QMainWindow):
         self.display_net = QLineEdit("0.0"); self.display_net.setReadOnly(True); self.display_net.setAlignment(Qt.AlignmentFlag.AlignRight); self.display_net.setStyleSheet(summary_display_style)
         self.input_potongan = QLineEdit("0.0"); self.input_potongan.setValidator(QDoubleValidator()); self.input_potongan.setAlignment(Qt.AlignmentFlag.AlignRight); self.input_potongan.setObjectName("potongan_input"); self.input_potongan.setStyleSheet(summary_display_style + "color: #F6E05E;")
         self.display_total_bersih = QLineEdit("0.0"); self.display_total_bersih.setReadOnly(True); self.display_total_bersih.setAlignment(Qt.AlignmentFlag.AlignRight); self.display_total_bersih.setObjectName("total_bersih_display"); self.display_total_bersih.setStyleSheet(summary_display_style + "color: #48BB78; font-size: 14pt;")
-        weight_card_layout.addWidget(self.live_weight_label, 0, 0, 1, 2, Qt.AlignmentFlag.AlignCenter); weight_card_layout.addWidget(self.live_weight_display, 1, 0, 1, 2, Qt.AlignmentFlag.AlignCenter); weight_card_layout.addWidget(self.stability_status_label, 2, 0, 1, 2, Qt.AlignmentFlag.AlignCenter); weight_card_layout.addWidget(QFrame(styleSheet="border-bottom: 1px solid #4A5568;"), 3, 0, 1, 2)
+        weight_card_layout.addLayout(live_weight_header, 0, 0, 1, 2); weight_card_layout.addWidget(self.live_weight_display, 1, 0, 1, 2, Qt.AlignmentFlag.AlignCenter); weight_card_layout.addWidget(self.stability_status_label, 2, 0, 1, 2, Qt.AlignmentFlag.AlignCenter); weight_card_layout.addWidget(QFrame(styleSheet="border-bottom: 1px solid #4A5568;"), 3, 0, 1, 2)
         summary_label_style = "font-size: 10pt; font-weight: bold; color: #A0AEC0;"
         label_gross = QLabel("Gross"); label_gross.setStyleSheet(summary_label_style); label_tare = QLabel("Tare"); label_tare.setStyleSheet(summary_label_style); label_net = QLabel("Net"); label_net.setStyleSheet(summary_label_style); label_potongan = QLabel("Deduction "); label_potongan.setStyleSheet(summary_label_style); label_total_bersih = QLabel("Total Bersih"); label_total_bersih.setStyleSheet(summary_label_style)
         weight_card_layout.addWidget(label_gross, 4, 0); weight_card_layout.addWidget(self.display_gross, 4, 1); weight_card_layout.addWidget(label_tare, 5, 0); weight_card_layout.addWidget(self.display_tare, 5, 1); weight_card_layout.addWidget(label_net, 6, 0); weight_card_layout.addWidget(self.display_net, 6, 1); weight_card_layout.addWidget(label_potongan, 7, 0); weight_card_layout.addWidget(self.input_potongan, 7, 1); weight_card_layout.addWidget(label_total_bersih, 8, 0); weight_card_layout.addWidget(self.display_total_bersih, 8, 1)
@@ -139,6 +147,9 @@ class MainWindow(QMainWindow):
         self.input_jenis_barang = QLineEdit(); self.input_quantity = QLineEdit()
         self.input_asal = QLineEdit(); self.input_tujuan = QLineEdit()
         self.input_remake = QLineEdit()
+        # Autocomplete plat dari kendaraan PENDING; memilih saran langsung memuat transaksinya untuk timbang kedua
+        self.plate_completer = QCompleter(QStringListModel(self), self); self.plate_completer.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion); self.input_nomor_kendaraan.setCompleter(self.plate_completer)
+        self.input_nomor_kendaraan.textEdited.connect(self.saran_plat); self.plate_completer.activated[str].connect(self.pilih_kendaraan_pending)
         input_card_layout.addWidget(QLabel("Next Transaction ID:"), 0, 0); input_card_layout.addWidget(self.next_transaction_id_label, 0, 1); input_card_layout.addLayout(top_right_buttons_layout, 0, 3, alignment=Qt.AlignmentFlag.AlignRight)
         input_card_layout.addWidget(QLabel("Plate No.:"), 1, 0); input_card_layout.addWidget(self.input_nomor_kendaraan, 1, 1); input_card_layout.addWidget(QLabel("Driver Name:"), 1, 2); input_card_layout.addWidget(self.input_nama_sopir, 1, 3)
         input_card_layout.addWidget(QLabel("Goods Type:"), 2, 0); input_card_layout.addWidget(self.input_jenis_barang, 2, 1); input_card_layout.addWidget(QLabel("Quantity:"), 2, 2); input_card_layout.addWidget(self.input_quantity, 2, 3)
@@ -149,92 +160,100 @@ class MainWindow(QMainWindow):
         nav_layout = QVBoxLayout(); nav_layout.setAlignment(Qt.AlignmentFlag.AlignTop | Qt.AlignmentFlag.AlignRight)
         for nav in ["REVIEW", "SETTINGS"]: btn = QPushButton(nav, objectName="nav_button"); btn.clicked.connect(self.open_report_window if nav == "REVIEW" else self.open_settings_window); nav_layout.addWidget(btn)
         top_area_layout.addWidget(weight_card, 2); top_area_layout.addWidget(input_card, 5); top_area_layout.addLayout(nav_layout, 1)
-        bottom_area_card = QFrame(objectName="card"); bottom_area_layout = QVBoxLayout(bottom_area_card); history_label = QLabel("Today's History", objectName="header"); bottom_area_layout.addWidget(history_label); self.history_table = QTableWidget(); self.history_table.setColumnCount(12); headers = ["Transaction ID", "Date", "Plate No.", "Goods Type", "Origin", "Destination", "Status", "Gross", "Tare", "Net", "Quantity", "Remake"]; self.history_table.setHorizontalHeaderLabels(headers); header = self.history_table.horizontalHeader(); header.setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents); header.setSectionResizeMode(3, QHeaderView.ResizeMode.Stretch); header.setSectionResizeMode(11, QHeaderView.ResizeMode.Stretch); self.history_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows); self.history_table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection); self.history_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers); self.history_table.verticalHeader().setVisible(False); self.history_table.verticalHeader().setDefaultSectionSize(35); self.history_table.setAlternatingRowColors(True); bottom_area_layout.addWidget(self.history_table)
+        bottom_area_card = QFrame(objectName="card"); bottom_area_layout = QVBoxLayout(bottom_area_card); history_label = QLabel("Today's History", objectName="header"); bottom_area_layout.addWidget(history_label); headers = ["Transaction ID", "Date", "Plate No.", "Goods Type", "Origin", "Destination", "Status", "Gross", "Tare", "Net", "Quantity", "Remake"]; self.history_model = TransactionTableModel(headers, format_short_date, parent=self, name="history"); self.history_table = QTableView(); self.history_table.setModel(self.history_model); self.change_feed.transactions_changed.connect(self.history_model.apply_changes); self.history_table.setItemDelegateForColumn(STATUS_COLUMN, StatusColorDelegate(self.history_table)); header = self.history_table.horizontalHeader(); header.setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents); header.setSectionResizeMode(3, QHeaderView.ResizeMode.Stretch); header.setSectionResizeMode(11, QHeaderView.ResizeMode.Stretch); self.history_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows); self.history_table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection); self.history_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers); self.history_table.verticalHeader().setVisible(False); self.history_table.verticalHeader().setDefaultSectionSize(35); self.history_table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed); self.history_table.setAlternatingRowColors(True); bottom_area_layout.addWidget(self.history_table)
         main_layout.addLayout(top_area_layout, 1); main_layout.addWidget(bottom_area_card, 2)
-        self.statusBar = QStatusBar(); self.setStatusBar(self.statusBar); self.status_datetime_label = QLabel(""); self.status_datetime_label.setStyleSheet("color: #A0AEC0; margin: 0 10px;"); self.statusBar.addPermanentWidget(self.status_datetime_label)
-        self.setup_timbangan()
+        self.statusBar = QStatusBar(); self.setStatusBar(self.statusBar)
+        self.diagnostics_label = QLabel(""); self.diagnostics_label.setStyleSheet("color: #718096; margin: 0 10px;"); self.statusBar.addPermanentWidget(self.diagnostics_label); self.diagnostics_state = None
+        self.status_datetime_label = QLabel(""); self.status_datetime_label.setStyleSheet("color: #A0AEC0; margin: 0 10px;"); self.statusBar.addPermanentWidget(self.status_datetime_label)
+        self.scale_overview_label = QLabel(""); self.scale_overview_label.setStyleSheet("color: #A0AEC0; margin: 0 10px;"); self.statusBar.addWidget(self.scale_overview_label)
+        self.setup_timbangan(); self.setup_diagnostics()
         self.btn_input.clicked.connect(self.proses_input_cerdas); self.btn_clear.clicked.connect(self.clear_form)
         self.btn_print.clicked.connect(self.print_selected_slip)
         self.input_potongan.textChanged.connect(self.recalculate_total_net)
         self.timer = QTimer(self); self.timer.setInterval(1000); self.timer.timeout.connect(self.update_datetime_status_bar); self.timer.start()
-        self.update_datetime_status_bar(); self.history_table.cellClicked.connect(self.load_transaction_by_id); self.refresh_history_table(); self.update_next_transaction_id()
+        self.update_datetime_status_bar(); self.history_table.clicked.connect(lambda index: self.load_transaction_by_id(index.row(), index.column())); self.refresh_history_table(); self.update_next_transaction_id()
 
     # --- DIUBAH: Fungsi ini sekarang membaca dari config.json ---
     def setup_timbangan(self):
-        self.thread = QThread()
         config = load_config() # Memuat pengaturan
+        # Satu worker + QThread per timbangan (lihat scale_registry.py); form memakai timbangan yang dipilih di combo
+        self.scales = ScaleRegistry(load_scales(config), create_scale_worker, parent=self)
+        for scale_id, scale in self.scales.scales.items(): self.scale_selector.addItem(scale["name"], scale_id)
+        self.scale_selector.setVisible(len(self.scales.scales) > 1); self.scale_overview_label.setVisible(len(self.scales.scales) > 1)
+        self.selected_scale_id = self.scale_selector.currentData()
+        self.scale_selector.currentIndexChanged.connect(self.ganti_timbangan)
+        self.scales.state_changed.connect(self.update_berat_display); self.scales.error_occurred.connect(self.tampilkan_error_koneksi)
+        self.scales.start()
 
-        # --- PILIH MODE TIMBANGAN ---
-        # Ganti variabel di bawah ini menjadi False untuk menggunakan timbangan fisik
-        USE_SIMULATOR = False 
-
-        if USE_SIMULATOR:
-            self.worker = TimbanganSimulatorWorker()
-            print(f">>> MENJALANKAN DALAM MODE SIMULATOR <<<")
-        else:
-            port = config.get("port", "COM1")
-            baudrate = config.get("baudrate", 9600)
-            self.worker = TimbanganSerialWorker(port=port, baudrate=baudrate)
-            self.worker.error_terjadi.connect(self.tampilkan_error_koneksi)
-            print(f">>> MENCOBA KONEKSI KE TIMBANGAN FISIK di {port} ({baudrate} baud) <<<")
-        # ---------------------------
-
-        self.worker.moveToThread(self.thread)
-        self.worker.data_terbaca.connect(self.update_berat_display)
-        self.thread.started.connect(self.worker.run)
-        self.thread.finished.connect(self.worker.deleteLater)
-        self.thread.finished.connect(self.thread.deleteLater)
-        self.thread.start()
-        
+    def setup_diagnostics(self):
+        # "metrics" di config.json: file/interval_seconds/format untuk dump berkala (metrics.py), status_bar (default true),
+        # profile_actions/profile_memory/slow_action_ms untuk ActionProfiler. Ctrl+Shift+D menyalakan/mematikan profil.
+        config = load_config(); options = config.get("metrics") or {}
+        self.metrics_dumper = create_dumper(config)
+        if self.metrics_dumper is not None: self.metrics_dumper.start(); print(f"Metrics: ditulis ke {self.metrics_dumper.path} setiap {self.metrics_dumper.interval_seconds:g} s")
+        PROFILER.slow_seconds = float(options.get("slow_action_ms", SLOW_ACTION_SECONDS * 1000)) / 1000; self.profile_memory = bool(options.get("profile_memory", False))
+        if options.get("profile_actions"): PROFILER.enable(memory=self.profile_memory)
+        self.diagnostics_label.setVisible(options.get("status_bar", True))
+        QShortcut(QKeySequence("Ctrl+Shift+D"), self, self.toggle_profiling)
+    def toggle_profiling(self):
+        if PROFILER.enabled: PROFILER.disable(); self.statusBar.showMessage("Action profiling stopped.", 5000)
+        else: PROFILER.enable(memory=self.profile_memory); self.statusBar.showMessage(f"Action profiling started: actions slower than {PROFILER.slow_seconds * 1000:.0f} ms are saved to {PROFILER.directory}/", 5000)
+        self.update_datetime_status_bar()
     def print_selected_slip(self):
         if not self.last_selected_transaction_id:
             QMessageBox.warning(self, "Selection Error", "Please select a transaction from the table to print.")
             return
-        t = get_transaction_by_id(self.db_conn, self.last_selected_transaction_id)
+        transaction_id = self.last_selected_transaction_id
+        self.db.get_transaction(transaction_id, callback=lambda t: self.tampilkan_preview_slip(transaction_id, t))
+    def tampilkan_preview_slip(self, transaction_id, t):
         if not t:
-            QMessageBox.critical(self, "Error", f"Could not retrieve details for {self.last_selected_transaction_id}.")
+            QMessageBox.critical(self, "Error", f"Could not retrieve details for {transaction_id}.")
             return
-        first_w = t['first_weigh_kg'] or 0; second_w = t['second_weigh_kg'] or 0
-        gross = max(first_w, second_w); tare = min(first_w, second_w) if second_w > 0 else 0
-        html = f"""<html><head><style>body {{ font-family: Arial, sans-serif; font-size: 11pt; color: black; }} h1 {{ text-align: center; font-size: 16pt; margin-bottom: 20px; }} table {{ width: 100%; border-collapse: collapse; }} td {{ padding: 5px 8px; }} .main-container > tbody > tr > td {{ vertical-align: top; padding: 0; }} .info-table td.label {{ font-weight: bold; width: 130px; }} .info-table td.value {{ text-align: right; }} .footer-table td {{ padding-top: 40px; font-size: 10pt; }}</style></head><body><h1>Weighing Slip</h1><table class="header-table"><tr><td><b>Date:</b> {datetime.strptime(t['first_weigh_timestamp'], '%Y-%m-%d %H:%M:%S').strftime('%Y/%m/%d %H:%M:%S')}</td><td align="right"><b>Slip No:</b> {t['transaction_id']}</td></tr></table><hr><br><table class="main-container"><tr><td><table class="info-table"><tr><td class="label">Vehicle Plate No.</td><td>: {t['plate_number']}</td></tr><tr><td class="label">Goods Type</td><td>: {t['goods_type']}</td></tr><tr><td class="label">Supplier</td><td>: {t['goods_origin'] or '-'}</td></tr><tr><td class="label">Receiver</td><td>: {t['goods_destination'] or '-'}</td></tr><tr><td class="label">Remake</td><td>: {t['remake'] or '-'}</td></tr></table></td><td><table class="info-table"><tr><td class="label">Gross</td><td class="value">{gross:,.2f} KG</td></tr><tr><td class="label">Tare</td><td class="value">{tare:,.2f} KG</td></tr><tr><td class="label">Net</td><td class="value"><b>{t['net_weigh_kg'] or 0:,.2f} KG</b></td></tr><tr><td class="label">Quantity</td><td>: {t['quantity'] or '-'}</td></tr></table></td></tr></table><table class="footer-table"><tr><td>Operator: System Admin</td><td align="right">Customer Signature: _________________</td></tr></table></body></html>"""
-        document = QTextDocument(); document.setHtml(html); printer = QPrinter(QPrinter.PrinterMode.HighResolution); preview_dialog = QPrintPreviewDialog(printer, self); preview_dialog.setStyleSheet("QWidget { background-color: white; color: black; }"); preview_dialog.resize(1000, 800); preview_dialog.paintRequested.connect(document.print_); preview_dialog.exec()
+        # Template slip di-parse sekali (slip_printing.py); preview hanya untuk satu slip, cetak massal lewat Review
+        from PySide6.QtPrintSupport import QPrinter, QPrintPreviewDialog
+        from slip_printing import render_slip
+        with operator_action("render_slip"): document = render_slip(t)
+        printer = QPrinter(QPrinter.PrinterMode.HighResolution); preview_dialog = QPrintPreviewDialog(printer, self); preview_dialog.setStyleSheet("QWidget { background-color: white; color: black; }"); preview_dialog.resize(1000, 800); preview_dialog.paintRequested.connect(document.print_); preview_dialog.exec()
     def recalculate_total_net(self):
         try: net_str = self.display_net.text().replace(',', ''); potongan_str = self.input_potongan.text().replace(',', ''); net = float(net_str) if net_str else 0.0; potongan = float(potongan_str) if potongan_str else 0.0; total_bersih = net - potongan; self.display_total_bersih.setText(f"{total_bersih:,.2f}")
         except ValueError: self.display_total_bersih.setText(self.display_net.text())
-    def tampilkan_error_koneksi(self, message):
-        QMessageBox.critical(self, "Connection Error", message); self.live_weight_display.setText("ERROR"); self.stability_status_label.setText("CONNECTION ERROR"); self.stability_status_label.setStyleSheet("font-size: 10pt; font-weight: bold; color: #E53E3E;"); self.btn_input.setEnabled(False)
+    def tampilkan_error_koneksi(self, scale_id, message):
+        self.scale_errors.add(scale_id); self.update_scale_overview()
+        QMessageBox.critical(self, "Connection Error", f"[{self.scales.name(scale_id)}] {message}" if len(self.scales.scales) > 1 else message)
+        if scale_id == self.selected_scale_id: self.tampilkan_status_error()
+    def tampilkan_status_error(self):
+        self.is_stable = None; self.live_weight_display.setText("ERROR"); self.stability_status_label.setText("CONNECTION ERROR"); self.stability_status_label.setStyleSheet("font-size: 10pt; font-weight: bold; color: #E53E3E;"); self.btn_input.setEnabled(False)
     def refresh_history_table(self):
-        today_str = datetime.now().strftime("%Y-%m-%d"); transactions = get_filtered_transactions(self.db_conn, today_str, today_str); self.history_table.setRowCount(0); self.history_table.setRowCount(len(transactions)); color_default = QColor("#E2E8F0"); color_pending = QColor("#F6E05E"); color_completed = QColor("#48BB78"); color_row_bg_even = QColor("#2D3748"); color_row_bg_odd = QColor("#293241")
-        for row, transaction in enumerate(transactions):
-            try:
-                first_w = transaction['first_weigh_kg'] or 0; second_w = transaction['second_weigh_kg'] or 0; gross = max(first_w, second_w); tare = min(first_w, second_w) if second_w > 0 else 0
-                if transaction['first_weigh_timestamp']: date_str = datetime.strptime(transaction['first_weigh_timestamp'], '%Y-%m-%d %H:%M:%S').strftime('%d/%m %H:%M')
-                else: date_str = "N/A"
-                quantity = transaction['quantity'] or '-'; remake = transaction['remake'] or '-'
-                columns_data = [transaction['transaction_id'], date_str, transaction['plate_number'], transaction['goods_type'], transaction['goods_origin'], transaction['goods_destination'], transaction['status'], f"{gross:,.2f}", f"{tare:,.2f}", f"{transaction['net_weigh_kg'] or 0:,.2f}", quantity, remake]
-                current_row_bg_color = color_row_bg_even if row % 2 == 0 else color_row_bg_odd
-                for col, cell_data in enumerate(columns_data):
-                    item = QTableWidgetItem(str(cell_data)); item.setForeground(QBrush(color_default)); item.setBackground(QBrush(current_row_bg_color))
-                    if col in [7, 8, 9]: item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
-                    elif col == 6: item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-                    else: item.setTextAlignment(Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter)
-                    if col == 6:
-                        if cell_data == 'PENDING': item.setForeground(QBrush(color_pending)); item.setFont(QFont("Arial", 9, QFont.Weight.Bold))
-                        elif cell_data == 'COMPLETED': item.setForeground(QBrush(color_completed)); item.setFont(QFont("Arial", 9, QFont.Weight.Bold))
-                    self.history_table.setItem(row, col, item)
-            except Exception as e:
-                print(f"Error processing row {row} for transaction {transaction.get('transaction_id', 'N/A')}: {e}")
-                continue
-    def update_next_transaction_id(self): next_id = generate_transaction_id(self.db_conn); self.next_transaction_id_label.setText(next_id)
-    def update_datetime_status_bar(self): now = datetime.now(); formatted_datetime = now.strftime("%A, %d %B %Y | %H:%M:%S"); self.status_datetime_label.setText(formatted_datetime)
-    def update_berat_display(self, berat):
-        self.live_weight_display.setText(f"{berat:,.2f}")
-        self.weight_readings.append(berat)
-        if len(self.weight_readings) == STABILITY_WINDOW_SIZE:
-            max_val = max(self.weight_readings); min_val = min(self.weight_readings)
-            if (max_val - min_val) <= STABILITY_TOLERANCE: self.set_stability_status(True)
-            else: self.set_stability_status(False)
-        else: self.set_stability_status(False)
+        # Model hanya mengambil halaman yang terlihat; sisanya diambil saat tabel di-scroll (fetchMore)
+        today_str = datetime.now().strftime("%Y-%m-%d"); self.history_date = today_str
+        with operator_action("refresh_history"): self.history_model.set_source(lambda after, limit, callback: self.db.read(get_transactions_page, today_str, today_str, "", after, limit, callback=callback), accepts=lambda t: t['weigh_date'] == today_str)
+    def update_next_transaction_id(self): self.db.read(peek_next_transaction_id, callback=self.next_transaction_id_label.setText)
+    def update_datetime_status_bar(self):
+        now = datetime.now(); formatted_datetime = now.strftime("%A, %d %B %Y | %H:%M:%S"); self.status_datetime_label.setText(formatted_datetime)
+        if self.diagnostics_label.isVisible(): text, self.diagnostics_state = status_summary(previous=self.diagnostics_state); self.diagnostics_label.setText(text)
+        if self.history_date and now.strftime("%Y-%m-%d") != self.history_date: self.refresh_history_table()  # Ganti hari
+    def update_berat_display(self, scale_id, state):
+        # Stabilitas sudah dihitung di worker; label hanya di-restyle saat status berubah
+        if len(self.scales.scales) > 1: self.update_scale_overview()
+        self.scale_errors.discard(scale_id)
+        if scale_id != self.selected_scale_id: return
+        if self.started is not None: log_startup("first live weight after login", self.started); self.started = None
+        self.live_weight_display.setText(f"{state.weight:,.2f}")
+        if state.stable != self.is_stable: self.set_stability_status(state.stable)
+    def update_scale_overview(self):
+        parts = []
+        for scale_id in self.scales.scales:
+            state = self.scales.latest(scale_id)
+            if scale_id in self.scale_errors: parts.append(f"{self.scales.name(scale_id)}: ERROR")
+            elif state is None: parts.append(f"{self.scales.name(scale_id)}: -")
+            else: parts.append(f"{self.scales.name(scale_id)}: {state.weight:,.2f} {'STABLE' if state.stable else 'UNSTABLE'}")
+        self.scale_overview_label.setText("  |  ".join(parts))
+    def ganti_timbangan(self, index):
+        self.selected_scale_id = self.scale_selector.itemData(index); state = self.scales.latest(self.selected_scale_id)
+        if self.selected_scale_id in self.scale_errors: self.tampilkan_status_error(); return
+        self.is_stable = None
+        if state is None: self.live_weight_display.setText("0.00"); self.stability_status_label.setText("CONNECTING..."); self.stability_status_label.setStyleSheet("font-size: 10pt; font-weight: bold; color: #A0AEC0;"); self.btn_input.setEnabled(False)
+        else: self.update_berat_display(self.selected_scale_id, state)
     def set_stability_status(self, stable):
         self.is_stable = stable
         if stable: self.btn_input.setEnabled(True); self.stability_status_label.setText("STABLE"); self.stability_status_label.setStyleSheet("font-size: 10pt; font-weight: bold; color: #48BB78;")
@@ -245,9 +264,23 @@ class MainWindow(QMainWindow):
         if not plate_number: QMessageBox.warning(self, "Input Error", "Plate No. is required!"); return
         try: current_weight = float(self.live_weight_display.text().replace(',', ''))
         except ValueError: QMessageBox.critical(self, "Error", "Could not read weight from scale."); return
-        pending_transaction = find_pending_by_plate_number(self.db_conn, plate_number)
+        # Tombol dinonaktifkan selama permintaan DB berjalan agar input tidak terkirim dua kali
+        self.btn_input.setEnabled(False); scale_id = self.selected_scale_id
+        pending = self.pending_index.find(plate_number)
+        if pending is None:
+            # Plat salah ketik satu karakter dari truk yang sedang PENDING: tanyakan dulu agar tidak jadi timbang pertama ganda
+            similar = self.pending_index.similar(plate_number)
+            if similar is not None and QMessageBox.question(self, "Pending Vehicle Found", f"No pending weigh for '{plate_number}', but '{similar['plate_number']}' (first weigh {similar['first_weigh_timestamp']}) is waiting for its second weigh.\n\nUse '{similar['plate_number']}'?") == QMessageBox.StandardButton.Yes:
+                pending = similar; plate_number = similar['plate_number']; self.input_nomor_kendaraan.setText(plate_number)
+        if pending is not None: self.lanjutkan_input(plate_number, current_weight, pending, scale_id); return
+        # Tidak ada di index: tetap cek database, timbang pertama dari stasiun lain bisa belum sampai lewat change feed
+        self.db.read(find_pending_by_plate_number, plate_number, callback=lambda pending: self.lanjutkan_input(plate_number, current_weight, pending, scale_id), error_callback=lambda e: self.selesai_input(False, ""))
+    def lanjutkan_input(self, plate_number, current_weight, pending_transaction, scale_id=None):
+        with operator_action("weigh_input"): self.kirim_timbangan(plate_number, current_weight, pending_transaction, scale_id)
+    def kirim_timbangan(self, plate_number, current_weight, pending_transaction, scale_id):
         if pending_transaction:
-            gross_str = self.display_gross.text().replace(',', ''); gross = float(gross_str) if gross_str else 0.0
+            # Gross dari transaksi PENDING itu sendiri: plat bisa diketik langsung tanpa memuat transaksinya dulu
+            gross = pending_transaction['first_weigh_kg'] or 0.0; self.display_gross.setText(f"{gross:,.2f}")
             tare = current_weight; net = abs(gross - tare)
             self.display_tare.setText(f"{tare:,.2f}"); self.display_net.setText(f"{net:,.2f}")
             self.recalculate_total_net()
@@ -256,22 +289,30 @@ class MainWindow(QMainWindow):
             potongan_str = self.input_potongan.text().replace(',', ''); potongan = float(potongan_str) if potongan_str else 0.0
             original_remake = self.input_remake.text().strip(); remake_info = original_remake
             if potongan > 0: remake_info = f"(Deduction : {potongan:,.2f} KG.) {original_remake}".strip()
-            if complete_second_weigh(self.db_conn, transaction_id, tare, final_net, remake_info):
-                QMessageBox.information(self, "Success", f"Second weigh for {plate_number} was successful.")
-                self.refresh_history_table(); self.clear_form()
-            else: QMessageBox.critical(self, "Database Error", "Failed to complete second weigh.")
+            self.db.write(complete_second_weigh, transaction_id, tare, final_net, remake_info, scale_id=scale_id, deduction_kg=potongan, callback=lambda ok: self.selesai_input(ok, f"Second weigh for {plate_number} was successful.", "Failed to complete second weigh."), error_callback=lambda e: self.selesai_input(False, "", "Failed to complete second weigh."))
         else:
             self.display_gross.setText(f"{current_weight:,.2f}")
-            data = {'plate_number': plate_number, 'goods_type': self.input_jenis_barang.text().strip(), 'goods_origin': self.input_asal.text().strip(),'goods_destination': self.input_tujuan.text().strip(),'driver_name': self.input_nama_sopir.text().strip(),'vendor': "", 'customer': "", 'quantity': self.input_quantity.text().strip(),'remake': self.input_remake.text().strip(), 'weight': current_weight}
-            if create_first_weigh(self.db_conn, data):
-                QMessageBox.information(self, "Success", f"First weigh for {plate_number} has been saved.")
-                self.refresh_history_table(); self.clear_form()
-            else: QMessageBox.critical(self, "Database Error", "Failed to save data to database.")
+            data = {'plate_number': plate_number, 'goods_type': self.input_jenis_barang.text().strip(), 'goods_origin': self.input_asal.text().strip(),'goods_destination': self.input_tujuan.text().strip(),'driver_name': self.input_nama_sopir.text().strip(),'vendor': "", 'customer': "", 'quantity': self.input_quantity.text().strip(),'remake': self.input_remake.text().strip(), 'weight': current_weight, 'scale_id': scale_id}
+            self.db.write(create_first_weigh, data, callback=lambda ok: self.selesai_input(ok, f"First weigh for {plate_number} has been saved.", "Failed to save data to database."), error_callback=lambda e: self.selesai_input(False, "", "Failed to save data to database."))
+    def selesai_input(self, ok, success_message, error_message="Failed to read data from database."):
+        self.btn_input.setEnabled(bool(self.is_stable))
+        if ok:
+            QMessageBox.information(self, "Success", success_message)
+            self.change_feed.poll(); self.clear_form()
+        else: QMessageBox.critical(self, "Database Error", error_message)
     def load_transaction_by_id(self, row, column):
-        transaction_id = self.history_table.item(row, 0).text()
+        transaction_id = self.history_model.transaction_id_at(row)
         if not transaction_id: return
         self.last_selected_transaction_id = transaction_id
-        t = get_transaction_by_id(self.db_conn, transaction_id)
+        self.db.get_transaction(transaction_id, callback=lambda t: self.tampilkan_transaksi(transaction_id, t))
+    def saran_plat(self, text):
+        if not self.input_nomor_kendaraan.isReadOnly(): self.plate_completer.model().setStringList(self.pending_index.suggest(text))
+    def pilih_kendaraan_pending(self, plate_number):
+        t = self.pending_index.find(plate_number)
+        if t is None: return
+        self.last_selected_transaction_id = t['transaction_id']; self.tampilkan_transaksi(t['transaction_id'], t)
+    def tampilkan_transaksi(self, transaction_id, t):
+        if transaction_id != self.last_selected_transaction_id: return  # Pilihan sudah berganti sebelum hasil tiba
         if t:
             self.clear_form(keep_selection=True)
             self.input_nomor_kendaraan.setText(t['plate_number'] or ""); self.input_jenis_barang.setText(t['goods_type'] or ""); self.input_asal.setText(t['goods_origin'] or ""); self.input_tujuan.setText(t['goods_destination'] or ""); self.input_quantity.setText(t['quantity'] or ""); self.input_remake.setText(t['remake'] or ""); self.input_nama_sopir.setText(t['driver_name'] or "")
@@ -293,18 +334,32 @@ class MainWindow(QMainWindow):
         self.input_nomor_kendaraan.setReadOnly(False); self.input_nomor_kendaraan.setStyleSheet("background-color: #1A202C;")
         self.update_next_transaction_id()
     def open_report_window(self):
-        if self.report_win is None: self.report_win = ReportWindow(self.db_conn)
-        self.report_win.show()
+        with operator_action("open_report"):
+            if self.report_win is None:
+                from report_window import ReportWindow
+                self.report_win = ReportWindow(self.db, self.change_feed)
+            self.report_win.show()
     def open_settings_window(self):
-        if self.settings_win is None: self.settings_win = SettingsWindow(self.db_conn)
-        self.settings_win.show()
+        with operator_action("open_settings"):
+            if self.settings_win is None:
+                from settings_window import SettingsWindow
+                self.settings_win = SettingsWindow(self.db)
+            self.settings_win.show()
     def closeEvent(self, event):
-        if hasattr(self, 'worker'): self.worker.stop()
-        if hasattr(self, 'thread'): self.thread.quit(); self.thread.wait()
-        if self.db_conn: self.db_conn.close(); print("Database connection closed.")
+        if hasattr(self, 'scales'): self.scales.stop()
+        self.change_feed.timer.stop(); self.db.stop(); print("Database connection closed.")
+        if self.metrics_dumper is not None: self.metrics_dumper.stop()
+        PROFILER.disable()
+        stats = self.db.cache.stats(); print(f"Transaction cache: {stats['hits']} hits, {stats['misses']} misses, {stats['size']} rows cached.")
         event.accept()
 
+def log_startup(phase, since=STARTUP_STARTED):
+    print(f"[startup] {phase}: {time.perf_counter() - since:.2f} s")
+
 if __name__ == "__main__":
-    app = QApplication(sys.argv); login_win = LoginWindow(); main_win = None
-    def show_main_window(username): global main_win; main_win = MainWindow(); main_win.show()
-    login_win.login_successful.connect(show_main_window); login_win.show(); sys.exit(app.exec())
\ No newline at end of file
+    # Satu DatabaseService (init_db/migrasi sekali) dipakai login dan jendela utama
+    app = QApplication(sys.argv); db = DatabaseService().start(); app.aboutToQuit.connect(db.stop)
+    login_win = LoginWindow(db); main_win = None
+    def show_main_window(username):
+        global main_win; main_win = MainWindow(db, started=time.perf_counter()); main_win.show(); log_startup("main window shown after login", main_win.started)
+    login_win.login_successful.connect(show_main_window); login_win.show(); QTimer.singleShot(0, lambda: log_startup("login window shown")); sys.exit(app.exec())
\ No newline at end of file
@@ -0,0 +1,239 @@
+# File: metrics.py (Registry metrik ringan: counter, gauge, histogram latensi; tanpa Qt, aman dipakai dari thread mana pun)
+#
+# Dipasang di titik-titik panas: pembacaan timbangan (acquisition.py), antrean signal worker -> GUI
+# (scale_registry.py), setiap query database.py yang lewat DatabaseService, pengisian tabel transaksi
+# (transaction_table_model.py) dan aksi operator di GUI. Dibaca oleh:
+#   - status bar MainWindow (ringkasan setiap detik, lihat status_summary)
+#   - MetricsDumper: tulis berkala ke file JSON atau teks Prometheus ("metrics" di config.json), mis.
+#       "metrics": {"file": "metrics.prom", "interval_seconds": 15}   (.json = format JSON, lainnya Prometheus)
+#     sehingga booth yang lambat bisa didiagnosis dari jauh (salin file, atau node_exporter textfile collector)
+#   - GET /api/metrics di weighing_service.py
+# ActionProfiler: cProfile (dan opsional tracemalloc) di sekitar aksi operator; hanya aktif jika dinyalakan
+# (Ctrl+Shift+D di jendela utama, atau "profile_actions": true di "metrics"). Aksi yang lebih lambat dari
+# slow_seconds disimpan ke folder diagnostics/ (.prof untuk snakeviz/pstats, .txt ringkasan).
+
+import bisect
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+# Batas bucket histogram latensi (detik)
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+DEFAULT_DUMP_INTERVAL = 15.0
+DIAGNOSTICS_DIRECTORY = "diagnostics"
+SLOW_ACTION_SECONDS = 0.2
+PROFILE_TOP_FUNCTIONS = 40
+TRACEMALLOC_TOP = 25
+
+class Counter:
+    kind = "counter"
+    def __init__(self): self.value = 0; self._lock = threading.Lock()
+    def inc(self, amount=1):
+        with self._lock: self.value += amount
+    def snapshot(self): return {"value": self.value}
+
+class Gauge:
+    kind = "gauge"
+    # function: nilai dibaca saat snapshot (mis. panjang antrean), bukan di-set dari hot path
+    def __init__(self, function=None): self.value = 0; self.function = function; self._lock = threading.Lock()
+    def set(self, value): self.value = value
+    def inc(self, amount=1):
+        with self._lock: self.value += amount
+    def dec(self, amount=1): self.inc(-amount)
+    def read(self):
+        if self.function is None: return self.value
+        try: return self.function()
+        except Exception: return None
+    def snapshot(self): return {"value": self.read()}
+
+class Histogram:
+    kind = "histogram"
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets); self.counts = [0] * (len(self.buckets) + 1); self.count = 0; self.sum = 0.0; self.max = 0.0; self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1; self.count += 1; self.sum += value
+            if value > self.max: self.max = value
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try: yield
+        finally: self.observe(time.perf_counter() - start)
+
+    def quantile(self, q):
+        # Perkiraan dari bucket (interpolasi linear di dalam bucket, dibatasi nilai maksimum yang pernah terlihat)
+        with self._lock: counts = list(self.counts); count = self.count; largest = self.max
+        if not count: return None
+        rank = q * count; seen = 0
+        for index, bucket_count in enumerate(counts):
+            if seen + bucket_count >= rank and bucket_count:
+                low = self.buckets[index - 1] if index > 0 else 0.0; high = self.buckets[index] if index < len(self.buckets) else largest
+                return min(low + (high - low) * (rank - seen) / bucket_count, largest)
+            seen += bucket_count
+        return largest
+
+    def snapshot(self):
+        with self._lock: counts = list(self.counts); count = self.count; total = self.sum; largest = self.max
+        cumulative = {}; running = 0
+        for bound, bucket_count in zip([f"{bucket:g}" for bucket in self.buckets] + ["+Inf"], counts): running += bucket_count; cumulative[bound] = running
+        return {"count": count, "sum": total, "max": largest, "mean": total / count if count else None, "p50": self.quantile(0.5), "p95": self.quantile(0.95), "p99": self.quantile(0.99), "buckets": cumulative}
+
+class MetricsRegistry:
+    def __init__(self):
+        self._families = {}; self._lock = threading.Lock(); self.started = time.time()
+
+    def _get(self, cls, name, help_text, labels, **options):
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        family = self._families.get(name)
+        if family is None or key not in family["series"]:
+            with self._lock:
+                family = self._families.setdefault(name, {"kind": cls.kind, "help": help_text, "series": {}})
+                if family["kind"] != cls.kind: raise ValueError(f"Metric {name} is already registered as a {family['kind']}")
+                if key not in family["series"]: family["series"][key] = cls(**options)
+        return family["series"][key]
+
+    # Pemanggilan dengan nama + label yang sama mengembalikan objek yang sama; simpan hasilnya untuk dipakai di hot path
+    def counter(self, name, help_text="", **labels): return self._get(Counter, name, help_text, labels)
+    def gauge(self, name, help_text="", function=None, **labels):
+        gauge = self._get(Gauge, name, help_text, labels, function=function)
+        if function is not None: gauge.function = function  # Objek baru (mis. DatabaseService dibuat ulang) menggantikan yang lama
+        return gauge
+    def histogram(self, name, help_text="", buckets=DEFAULT_BUCKETS, **labels): return self._get(Histogram, name, help_text, labels, buckets=buckets)
+
+    def find(self, name, **labels):
+        family = self._families.get(name)
+        return family["series"].get(tuple(sorted((k, str(v)) for k, v in labels.items()))) if family else None
+
+    def series(self, name):
+        # [(label dict, metrik)] untuk satu nama metrik
+        family = self._families.get(name)
+        return [(dict(key), metric) for key, metric in list(family["series"].items())] if family else []
+
+    def snapshot(self):
+        with self._lock: families = {name: (family["kind"], family["help"], list(family["series"].items())) for name, family in self._families.items()}
+        return {"generated_at": datetime.now().isoformat(timespec="seconds"), "uptime_seconds": time.time() - self.started,
+                "metrics": {name: {"type": kind, "help": help_text, "series": [{"labels": dict(key), **metric.snapshot()} for key, metric in series]} for name, (kind, help_text, series) in sorted(families.items())}}
+
+    def to_json(self): return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self, prefix="weighing_"):
+        # Format teks eksposisi Prometheus 0.0.4
+        lines = []
+        for name, family in self.snapshot()["metrics"].items():
+            full = prefix + name; lines.append(f"# HELP {full} {family['help']}"); lines.append(f"# TYPE {full} {family['type']}")
+            for series in family["series"]:
+                labels = series["labels"]
+                if family["type"] == "histogram":
+                    for bound, count in series["buckets"].items(): lines.append(f"{full}_bucket{_labels({**labels, 'le': bound})} {count}")
+                    lines.append(f"{full}_sum{_labels(labels)} {series['sum']:.6f}"); lines.append(f"{full}_count{_labels(labels)} {series['count']}")
+                elif series["value"] is not None: lines.append(f"{full}{_labels(labels)} {series['value']}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path, fmt=None):
+        # Tulis atomik (file sementara lalu os.replace): pembaca tidak pernah melihat file setengah jadi
+        fmt = fmt or ("json" if path.lower().endswith(".json") else "prometheus")
+        text = self.to_json() if fmt == "json" else self.to_prometheus(); temporary = path + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as f: f.write(text)
+        os.replace(temporary, path)
+
+def _labels(labels):
+    if not labels: return ""
+    return "{" + ",".join(f'{key}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"' for key, value in labels.items()) + "}"
+
+class MetricsDumper:
+    # Thread daemon yang menulis snapshot ke file setiap interval_seconds (juga sekali saat stop)
+    def __init__(self, registry, path, interval_seconds=DEFAULT_DUMP_INTERVAL, fmt=None):
+        self.registry = registry; self.path = path; self.interval_seconds = interval_seconds; self.fmt = fmt
+        self._stop = threading.Event(); self._thread = threading.Thread(target=self._run, name="metrics-dump", daemon=True)
+
+    def start(self): self._thread.start(); return self
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive(): self._thread.join()
+        self.dump()
+    def dump(self):
+        try: self.registry.write(self.path, self.fmt)
+        except OSError as e: print(f"Gagal menulis metrik ke {self.path}: {e}")
+    def _run(self):
+        while not self._stop.wait(self.interval_seconds): self.dump()
+
+def create_dumper(config, registry=None):
+    # "metrics": {"file": ..., "interval_seconds": ..., "format": "json"|"prometheus"}; None jika tidak diatur
+    options = config.get("metrics") or {}
+    if not options.get("file"): return None
+    return MetricsDumper(registry or METRICS, options["file"], float(options.get("interval_seconds", DEFAULT_DUMP_INTERVAL)), options.get("format"))
+
+class ActionProfiler:
+    def __init__(self, directory=DIAGNOSTICS_DIRECTORY, slow_seconds=SLOW_ACTION_SECONDS):
+        self.directory = directory; self.slow_seconds = slow_seconds; self.enabled = False; self.memory = False; self._active = False; self._started_tracemalloc = False
+
+    def enable(self, memory=False):
+        self.enabled = True; self.memory = memory
+        if memory and not tracemalloc.is_tracing(): tracemalloc.start(); self._started_tracemalloc = True
+
+    def disable(self):
+        self.enabled = False
+        if self._started_tracemalloc: tracemalloc.stop(); self._started_tracemalloc = False
+
+    @contextmanager
+    def capture(self, name):
+        # Satu profil pada satu waktu: aksi bersarang (atau dari thread lain) tidak diprofil ulang
+        if not self.enabled or self._active: yield; return
+        self._active = True; profiler = cProfile.Profile(); before = tracemalloc.take_snapshot() if self.memory and tracemalloc.is_tracing() else None
+        start = time.perf_counter(); profiler.enable()
+        try: yield
+        finally:
+            profiler.disable(); elapsed = time.perf_counter() - start; self._active = False
+            if elapsed >= self.slow_seconds: self._save(name, elapsed, profiler, before)
+
+    def _save(self, name, elapsed, profiler, before):
+        try:
+            os.makedirs(self.directory, exist_ok=True); base = os.path.join(self.directory, f"{datetime.now():%Y%m%d_%H%M%S}_{name}")
+            profiler.dump_stats(base + ".prof"); text = io.StringIO()
+            text.write(f"Action: {name}\nDuration: {elapsed * 1000:.1f} ms\n\n")
+            pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+            if before is not None:
+                text.write("\nTop memory allocations during the action:\n")
+                for stat in tracemalloc.take_snapshot().compare_to(before, "lineno")[:TRACEMALLOC_TOP]: text.write(f"{stat}\n")
+            with open(base + ".txt", "w", encoding="utf-8") as f: f.write(text.getvalue())
+            print(f"Aksi lambat '{name}' ({elapsed * 1000:.0f} ms) diprofil: {base}.txt")
+        except OSError as e: print(f"Gagal menyimpan profil aksi {name}: {e}")
+
+METRICS = MetricsRegistry()
+PROFILER = ActionProfiler()
+_action_histograms = {}
+
+@contextmanager
+def operator_action(name):
+    # Durasi aksi operator di thread GUI (histogram gui_action_seconds); diprofil jika ActionProfiler menyala
+    histogram = _action_histograms.get(name)
+    if histogram is None: histogram = _action_histograms[name] = METRICS.histogram("gui_action_seconds", "Time spent in the GUI thread handling an operator action", action=name)
+    with PROFILER.capture(name), histogram.time(): yield
+
+def status_summary(registry=None, previous=None):
+    # (teks, state) untuk status bar; state disimpan pemanggil dan dikirim lagi agar pembacaan/detik dihitung dari selisih
+    registry = registry or METRICS; now = time.monotonic()
+    readings = sum(metric.value for _, metric in registry.series("scale_readings_total"))
+    rate = (readings - previous[1]) / (now - previous[0]) if previous and now > previous[0] else None
+    parts = []
+    if rate is not None: parts.append(f"{rate:.1f} rd/s")
+    backlog = sum(metric.read() or 0 for _, metric in registry.series("scale_signal_backlog"))
+    parts.append(f"backlog {backlog}")
+    # Query dengan p95 terburuk, agar query yang melambat langsung terlihat namanya
+    queries = [(metric.quantile(0.95), labels["query"]) for labels, metric in registry.series("db_query_seconds") if metric.count]
+    if queries: p95, query = max(queries); parts.append(f"DB p95 {p95 * 1000:.0f} ms ({query})")
+    depth = sum(metric.read() or 0 for _, metric in registry.series("db_queue_depth")); parts.append(f"DB queue {depth}")
+    hit_rate = registry.find("transaction_cache_hit_rate")
+    if hit_rate is not None and hit_rate.read() is not None: parts.append(f"cache {hit_rate.read() * 100:.0f}%")
+    if PROFILER.enabled: parts.append("PROFILING")
+    return "  |  ".join(parts), (now, readings)
@@ -0,0 +1,122 @@
+# File: pdf_export.py (Export laporan PDF di background, baris dialirkan per batch dari cursor DB)
+
+import os
+from PySide6.QtCore import QObject, QRunnable, Signal
+from reportlab.pdfgen import canvas
+from reportlab.platypus import Table, TableStyle
+from reportlab.lib import colors
+from reportlab.lib.units import inch
+from reportlab.lib.pagesizes import letter
+
+from database import connect_db, count_search_results, iter_search_transactions
+
+PAGE_SIZE = letter
+MARGIN = 0.5 * inch
+ROW_HEIGHT = 14
+TITLE_HEIGHT = 50
+FOOTER_HEIGHT = 20
+HEADER = ["ID Transaksi", "Tanggal", "No. Plat", "Jenis Barang", "Asal", "Tujuan", "Kotor (kg)", "Tara (kg)", "Bersih (kg)", "Qty", "Keterangan"]
+COL_WIDTHS = [0.8*inch, 0.8*inch, 0.8*inch, 1.1*inch, 0.6*inch, 0.6*inch, 0.7*inch, 0.7*inch, 0.7*inch, 0.4*inch, 1.1*inch]
+TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0,0), (-1,0), colors.grey),
+    ('TEXTCOLOR', (0,0), (-1,0), colors.whitesmoke),
+    ('ALIGN', (0,0), (-1,-1), 'CENTER'),
+    ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+    ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+    ('BACKGROUND', (0,1), (-1,-1), colors.white),
+    ('TEXTCOLOR', (0,1), (-1,-1), colors.black),
+    ('GRID', (0,0), (-1,-1), 0.5, colors.black),
+    ('FONTSIZE', (0,0), (-1,-1), 7),
+    ('LEFTPADDING', (0,0), (-1,-1), 2),
+    ('RIGHTPADDING', (0,0), (-1,-1), 2),
+    # Baris terakhir selalu baris total (total halaman / grand total)
+    ('FONTNAME', (0,-1), (-1,-1), 'Helvetica-Bold'),
+    ('BACKGROUND', (0,-1), (-1,-1), colors.lightgrey),
+])
+
+class ExportCancelled(Exception): pass
+
+class PdfExportSignals(QObject):
+    progress = Signal(int, int)  # baris yang sudah ditulis, total baris
+    finished = Signal(str)
+    failed = Signal(str)
+    cancelled = Signal()
+
+class PdfExportTask(QRunnable):
+    # Satu halaman PDF = satu Table kecil yang langsung digambar ke canvas, jadi memori tidak bergantung
+    # pada jumlah baris (berbeda dengan SimpleDocTemplate yang butuh seluruh story di memori).
+    def __init__(self, filepath, start_date, end_date, search_text="", period_label="", db_path=None, batch_size=500):
+        super().__init__()
+        self.filepath = filepath; self.start_date = start_date; self.end_date = end_date; self.search_text = search_text
+        self.period_label = period_label; self.db_path = db_path; self.batch_size = batch_size
+        self.signals = PdfExportSignals(); self._cancelled = False
+
+    def cancel(self): self._cancelled = True
+
+    def run(self):
+        conn = None
+        try:
+            conn = connect_db(self.db_path)
+            # Urutan dan filter sama dengan yang tampil di ReportWindow (termasuk teks pencarian)
+            total = count_search_results(conn, self.start_date, self.end_date, self.search_text)
+            self._write(iter_search_transactions(conn, self.start_date, self.end_date, self.search_text, self.batch_size), total)
+            self.signals.finished.emit(self.filepath)
+        except ExportCancelled:
+            if os.path.exists(self.filepath): os.remove(self.filepath)
+            self.signals.cancelled.emit()
+        except Exception as e:
+            print(f"Error in PdfExportTask: {e}"); self.signals.failed.emit(str(e))
+        finally:
+            if conn: conn.close()
+
+    def _write(self, transactions, total):
+        pdf = canvas.Canvas(self.filepath, pagesize=PAGE_SIZE, pageCompression=1)
+        width, height = PAGE_SIZE
+        self._pdf = pdf; self._page_number = 1; self._grand = [0.0, 0.0, 0.0]
+        top = self._draw_title(height - MARGIN)
+        page_rows = []; page_totals = [0.0, 0.0, 0.0]; done = 0
+        for t in transactions:
+            if self._cancelled: raise ExportCancelled()
+            first_w = t['first_weigh_kg'] or 0; second_w = t['second_weigh_kg'] or 0; net = t['net_weigh_kg'] or 0
+            gross = max(first_w, second_w); tare = min(first_w, second_w) if second_w > 0 else 0
+            ts = t['first_weigh_timestamp']
+            page_rows.append([t['transaction_id'], f"{ts[8:10]}/{ts[5:7]}/{ts[2:4]} {ts[11:16]}", t['plate_number'], t['goods_type'], t['goods_origin'], t['goods_destination'],
+                              f"{gross:,.2f}", f"{tare:,.2f}", f"{net:,.2f}", t['quantity'] or '-', t['remake'] or '-'])
+            for i, value in enumerate((gross, tare, net)): page_totals[i] += value; self._grand[i] += value
+            done += 1
+            if done % self.batch_size == 0: self.signals.progress.emit(done, total)
+            if len(page_rows) >= self._rows_fitting(top):
+                self._draw_rows(page_rows, page_totals, top); self._next_page(); top = height - MARGIN
+                page_rows = []; page_totals = [0.0, 0.0, 0.0]
+        if page_rows: top = self._draw_rows(page_rows, page_totals, top)
+        # Grand total di halaman terakhir jika masih muat, jika tidak di halaman baru
+        if top - 2 * ROW_HEIGHT < MARGIN + FOOTER_HEIGHT: self._next_page(); top = height - MARGIN
+        self._draw_table([HEADER, ["GRAND TOTAL", f"{done} transaksi", "", "", "", "", *(f"{v:,.2f}" for v in self._grand), "", ""]], top)
+        self._draw_footer(); pdf.save()
+        self.signals.progress.emit(done, total)
+
+    def _rows_fitting(self, top):
+        # Sisakan tempat untuk header tabel dan baris total halaman
+        return max(1, int((top - MARGIN - FOOTER_HEIGHT) // ROW_HEIGHT) - 2)
+
+    def _draw_title(self, top):
+        pdf = self._pdf; width = PAGE_SIZE[0]
+        pdf.setFont("Helvetica-Bold", 16); pdf.drawCentredString(width / 2, top - 16, "Laporan Transaksi Weighing")
+        pdf.setFont("Helvetica-Bold", 12); pdf.drawCentredString(width / 2, top - 36, f"Periode: {self.period_label}")
+        return top - TITLE_HEIGHT
+
+    def _draw_rows(self, rows, totals, top):
+        data = [HEADER] + rows + [["TOTAL HALAMAN", "", "", "", "", "", *(f"{v:,.2f}" for v in totals), "", ""]]
+        return self._draw_table(data, top)
+
+    def _draw_table(self, data, top):
+        table = Table(data, colWidths=COL_WIDTHS, rowHeights=ROW_HEIGHT); table.setStyle(TABLE_STYLE)
+        table_width, table_height = table.wrapOn(self._pdf, *PAGE_SIZE)
+        table.drawOn(self._pdf, (PAGE_SIZE[0] - table_width) / 2, top - table_height)
+        return top - table_height - ROW_HEIGHT
+
+    def _draw_footer(self):
+        self._pdf.setFont("Helvetica", 7); self._pdf.drawRightString(PAGE_SIZE[0] - MARGIN, MARGIN / 2, f"Halaman {self._page_number}")
+
+    def _next_page(self):
+        self._draw_footer(); self._pdf.showPage(); self._page_number += 1
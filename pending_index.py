@@ -0,0 +1,84 @@
+# File: pending_index.py (Index di memori untuk kendaraan yang menunggu timbang kedua)
+#
+# Dimuat sekali saat start (database.get_pending_transactions, index parsial idx_transactions_pending_plate) dan
+# diperbarui dari change feed setiap ada timbang pertama/kedua atau hapus, termasuk dari stasiun lain. Jadi saat
+# truk kembali ke jembatan timbang, transaksi PENDING-nya ditemukan tanpa query ke database.
+#
+# Plat dibandingkan dalam bentuk normal: huruf besar, hanya huruf dan angka ("bk-1234 ab" == "BK 1234 AB").
+# suggest() untuk autocomplete (awalan, lalu awalan dengan satu salah ketik); similar() mencari plat PENDING yang
+# hanya berbeda satu karakter (salah ketik, karakter kurang/lebih, atau dua karakter tertukar) agar operator tidak
+# membuat timbang pertama ganda untuk truk yang sebenarnya sedang menunggu timbang kedua.
+# Dipakai hanya dari thread GUI (callback DatabaseService dan signal ChangeFeed), jadi tidak perlu lock.
+
+MAX_TYPO_DISTANCE = 1
+MIN_FUZZY_LENGTH = 4
+DEFAULT_SUGGESTIONS = 10
+
+def normalize_plate(plate): return "".join(ch for ch in (plate or "").upper() if ch.isalnum())
+
+def typo_distance(a, b, limit=MAX_TYPO_DISTANCE):
+    # Jarak edit (ganti/sisip/hapus/tukar dua karakter bersebelahan); berhenti lebih awal jika pasti > limit
+    if abs(len(a) - len(b)) > limit: return limit + 1
+    previous2 = None; previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]: current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit: return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+class PendingIndex:
+    def __init__(self, rows=()):
+        self._rows = {}; self._by_plate = {}
+        self.load(rows)
+
+    def __len__(self): return len(self._rows)
+
+    def load(self, rows):
+        self._rows = {}; self._by_plate = {}
+        for row in rows: self._add(row)
+
+    def apply_changes(self, changes):
+        # TransactionChanges dari change_feed.py: baris yang sudah COMPLETED atau dihapus keluar dari index
+        for transaction_id in changes.deleted: self._remove(transaction_id)
+        for row in changes.upserted:
+            self._remove(row["transaction_id"])
+            if row["status"] == "PENDING": self._add(row)
+
+    def _add(self, row):
+        self._rows[row["transaction_id"]] = row
+        rows = self._by_plate.setdefault(normalize_plate(row["plate_number"]), [])
+        rows.append(row); rows.sort(key=lambda t: t["first_weigh_timestamp"], reverse=True)  # Terbaru dulu, sama dengan find_pending_by_plate_number
+
+    def _remove(self, transaction_id):
+        row = self._rows.pop(transaction_id, None)
+        if row is None: return
+        key = normalize_plate(row["plate_number"]); rows = [t for t in self._by_plate[key] if t["transaction_id"] != transaction_id]
+        if rows: self._by_plate[key] = rows
+        else: del self._by_plate[key]
+
+    def find(self, plate):
+        # Transaksi PENDING terbaru untuk plat ini (bentuk normal), atau None
+        rows = self._by_plate.get(normalize_plate(plate))
+        return rows[0] if rows else None
+
+    def similar(self, plate):
+        # Transaksi PENDING untuk plat yang berbeda satu salah ketik (yang paling baru jika lebih dari satu), atau None
+        key = normalize_plate(plate)
+        if len(key) < MIN_FUZZY_LENGTH: return None
+        matches = [rows[0] for other, rows in self._by_plate.items() if other != key and typo_distance(key, other) <= MAX_TYPO_DISTANCE]
+        return max(matches, key=lambda t: t["first_weigh_timestamp"]) if matches else None
+
+    def suggest(self, text, limit=DEFAULT_SUGGESTIONS):
+        # Plat PENDING untuk autocomplete: awalan yang cocok dulu, lalu awalan dengan satu salah ketik
+        key = normalize_plate(text)
+        if not key: return []
+        exact = []; fuzzy = []
+        for other, rows in self._by_plate.items():
+            if other.startswith(key): exact.append(rows[0])
+            elif len(key) >= MIN_FUZZY_LENGTH and typo_distance(key, other[:len(key)]) <= MAX_TYPO_DISTANCE: fuzzy.append(rows[0])
+        newest_first = lambda t: t["first_weigh_timestamp"]
+        ranked = sorted(exact, key=newest_first, reverse=True) + sorted(fuzzy, key=newest_first, reverse=True)
+        return [t["plate_number"] for t in ranked[:limit]]
@@ -0,0 +1,94 @@
+# File: report_analytics.py (Statistik laporan dengan NumPy: total, distribusi net, per jenis barang, outlier)
+#
+# Kolom transaksi hasil filter laporan (tanggal + teks pencarian, sama persis dengan tabel di ReportWindow) dimuat
+# sekali ke array NumPy lewat database.iter_search_columns (tuple biasa per batch besar, tanpa sqlite3.Row), lalu
+# semua statistik dihitung secara vektor: jumlah per jenis barang dengan bincount, persentil dan histogram net, dan
+# kuartil per jenis barang untuk menandai outlier (aturan IQR). Tidak ada loop Python per baris, jadi ratusan ribu
+# transaksi selesai dalam sepersekian detik di thread background (StatisticsTask di report_window.py).
+# NumPy opsional: tanpa NumPy, report_statistics() melempar RuntimeError dengan pesan cara memasangnya.
+
+from collections import namedtuple
+
+from database import iter_search_columns, get_transactions_by_ids
+
+try: import numpy as np
+except ImportError: np = None
+
+PERCENTILES = (5, 25, 50, 75, 95)
+HISTOGRAM_BINS = 20
+OUTLIER_IQR_FACTOR = 1.5
+MIN_OUTLIER_GROUP = 8  # Jenis barang dengan transaksi selesai lebih sedikit dari ini tidak dinilai outlier-nya
+MAX_OUTLIERS_LISTED = 50
+COLUMNS = ("transaction_id", "COALESCE(goods_type, '')", "status = 'COMPLETED'", "COALESCE(first_weigh_kg, 0)", "COALESCE(second_weigh_kg, 0)", "COALESCE(net_weigh_kg, 0)", "COALESCE(deduction_kg, 0)")
+
+ReportArrays = namedtuple("ReportArrays", ["transaction_ids", "goods_names", "goods", "completed", "first_kg", "second_kg", "net_kg", "deduction_kg"])
+
+def _require_numpy():
+    if np is None: raise RuntimeError("Report statistics need NumPy (pip install numpy).")
+
+def load_report_arrays(conn, start_date, end_date, text="", should_stop=None):
+    # ReportArrays untuk filter laporan, atau None jika should_stop() menjadi True di antara batch
+    _require_numpy()
+    transaction_ids = []; goods_index = {}; goods = []; numeric = []
+    for rows in iter_search_columns(conn, start_date, end_date, text, COLUMNS):
+        if should_stop is not None and should_stop(): return None
+        batch_ids, batch_goods, *values = zip(*rows)  # Transpos per kolom di C, bukan loop per baris
+        transaction_ids.extend(batch_ids)
+        goods.append(np.fromiter((goods_index.setdefault(name, len(goods_index)) for name in batch_goods), dtype=np.int32, count=len(rows)))
+        numeric.append(np.array(values, dtype=np.float64))
+    goods = np.concatenate(goods) if goods else np.zeros(0, dtype=np.int32)
+    completed, first_kg, second_kg, net_kg, deduction_kg = np.concatenate(numeric, axis=1) if numeric else np.zeros((5, 0))
+    return ReportArrays(transaction_ids, list(goods_index), goods, completed.astype(bool), first_kg, second_kg, net_kg, deduction_kg)
+
+def _group_quantiles(sorted_values, starts, counts, q):
+    # Kuantil (interpolasi linear, sama dengan np.percentile) untuk setiap kelompok dari nilai yang sudah diurutkan per kelompok
+    last = starts + np.maximum(counts - 1, 0); position = starts + q * (last - starts)
+    low = np.floor(position).astype(np.int64); high = np.minimum(low + 1, last)
+    top = max(sorted_values.size - 1, 0); low = np.minimum(low, top); high = np.minimum(high, top)
+    values = sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (position - low) if sorted_values.size else np.zeros(counts.size)
+    return np.where(counts > 0, values, np.nan)
+
+def compute_statistics(data, bins=HISTOGRAM_BINS, iqr_factor=OUTLIER_IQR_FACTOR):
+    _require_numpy()
+    done = data.completed; groups = len(data.goods_names)
+    gross = np.maximum(data.first_kg, data.second_kg)[done]; tare = np.minimum(data.first_kg, data.second_kg)[done]
+    net = data.net_kg[done]; deduction = data.deduction_kg[done]; goods = data.goods[done]
+    totals = {"trucks": int(data.goods.size), "completed": int(net.size), "pending": int(data.goods.size - net.size), "gross_kg": float(gross.sum()), "tare_kg": float(tare.sum()),
+              "net_kg": float(net.sum()), "deduction_kg": float(deduction.sum()), "deducted_trucks": int(np.count_nonzero(deduction))}
+    distribution = None; histogram = None
+    if net.size:
+        distribution = {"mean": float(net.mean()), "std": float(net.std()), "min": float(net.min()), "max": float(net.max()), "percentiles": dict(zip(PERCENTILES, map(float, np.percentile(net, PERCENTILES))))}
+        counts, edges = np.histogram(net, bins=bins); histogram = {"counts": counts.tolist(), "edges": edges.tolist()}
+    # Kuartil per jenis barang tanpa loop per kelompok: urutkan (jenis, net), lalu ambil posisi kuartil di setiap potongan
+    trucks = np.bincount(data.goods, minlength=groups); completed = np.bincount(goods, minlength=groups)
+    sorted_net = net[np.lexsort((net, goods))]; starts = np.concatenate(([0], np.cumsum(completed)[:-1])).astype(np.int64)
+    q1, median, q3 = (_group_quantiles(sorted_net, starts, completed, q) for q in (0.25, 0.5, 0.75))
+    iqr = q3 - q1; lower = q1 - iqr_factor * iqr; upper = q3 + iqr_factor * iqr
+    # Outlier: di luar pagar IQR jenis barangnya (jika datanya cukup), atau net <= 0 untuk transaksi yang sudah selesai
+    judged = completed[goods] >= MIN_OUTLIER_GROUP
+    outlier = (judged & ((net < lower[goods]) | (net > upper[goods]))) | (net <= 0)
+    outliers_per_goods = np.bincount(goods[outlier], minlength=groups)
+    net_sum = np.bincount(goods, weights=net, minlength=groups); gross_sum = np.bincount(goods, weights=gross, minlength=groups); deduction_sum = np.bincount(goods, weights=deduction, minlength=groups)
+    by_goods = [{"goods_type": data.goods_names[g], "trucks": int(trucks[g]), "completed": int(completed[g]), "gross_kg": float(gross_sum[g]), "net_kg": float(net_sum[g]),
+                 "avg_net_kg": float(net_sum[g] / completed[g]) if completed[g] else 0.0, "median_net_kg": None if np.isnan(median[g]) else float(median[g]),
+                 "deduction_kg": float(deduction_sum[g]), "outliers": int(outliers_per_goods[g])} for g in np.argsort(-net_sum, kind="stable")]
+    # Outlier terjauh dari pagar (dinormalisasi dengan IQR jenisnya) lebih dulu
+    indexes = np.flatnonzero(outlier); scale = np.where(iqr[goods[indexes]] > 0, iqr[goods[indexes]], 1.0)
+    distance = np.maximum(lower[goods[indexes]] - net[indexes], net[indexes] - upper[goods[indexes]]) / scale
+    distance = np.where(np.isnan(distance), np.inf, distance)  # net <= 0 pada jenis barang yang datanya sedikit
+    completed_ids = np.flatnonzero(done); outliers = []
+    for index in indexes[np.argsort(-distance, kind="stable")][:MAX_OUTLIERS_LISTED]:
+        g = goods[index]
+        outliers.append({"transaction_id": data.transaction_ids[completed_ids[index]], "goods_type": data.goods_names[g], "net_kg": float(net[index]),
+                         "expected": None if not judged[index] else (float(lower[g]), float(upper[g]))})
+    return {"totals": totals, "distribution": distribution, "histogram": histogram, "by_goods": by_goods, "outliers": outliers, "outlier_count": int(indexes.size)}
+
+def report_statistics(conn, start_date, end_date, text="", should_stop=None):
+    # Statistik lengkap untuk filter laporan; outlier yang ditampilkan dilengkapi plat dan tanggal. None jika dihentikan.
+    data = load_report_arrays(conn, start_date, end_date, text, should_stop)
+    if data is None: return None
+    statistics = compute_statistics(data)
+    rows = {row["transaction_id"]: row for row in get_transactions_by_ids(conn, [o["transaction_id"] for o in statistics["outliers"]])}
+    for outlier in statistics["outliers"]:
+        row = rows.get(outlier["transaction_id"]); outlier["plate_number"] = row["plate_number"] if row else ""; outlier["weigh_date"] = row["weigh_date"] if row else ""
+    return statistics
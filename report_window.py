@@ -1,27 +1,72 @@
 from PySide6.QtWidgets import (QWidget, QLabel, QPushButton, QVBoxLayout, QHBoxLayout, 
-                               QDateEdit, QLineEdit, QFrame, QMessageBox,
-                               QFileDialog, QTableWidget, QTableWidgetItem, QHeaderView,
-                               QAbstractItemView)
-from PySide6.QtCore import Qt, QDate
-from PySide6.QtGui import QFont, QColor, QBrush, QTextDocument
-from PySide6.QtPrintSupport import QPrinter, QPrintPreviewDialog
+                               QDateEdit, QLineEdit, QFrame, QMessageBox, QProgressBar,
+                               QFileDialog, QTableView, QHeaderView,
+                               QAbstractItemView, QTabWidget, QTableWidget, QTableWidgetItem, QGridLayout)
+from PySide6.QtCore import Qt, QDate, QThreadPool, QObject, QRunnable, QRectF, QTimer, Signal
+from PySide6.QtGui import QFont, QPainter, QColor
+from PySide6.QtPrintSupport import QPrinter, QPrintPreviewDialog, QPrintDialog
 from datetime import datetime
 import os
-import re 
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib import colors
-from reportlab.lib.units import inch, cm
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_CENTER
 
 
-from database import get_filtered_transactions, delete_transaction_by_id, get_transaction_by_id
+from database import connect_db, get_transactions_page, search_transactions, count_search_results, search_terms, SEARCH_COLUMNS, delete_transaction_by_id, get_rollup_summary
+from transaction_table_model import TransactionTableModel, StatusColorDelegate, STATUS_COLUMN, format_report_date
+from change_feed import ChangeFeed
+from slip_printing import render_slip, SlipPrintTask
+from report_analytics import report_statistics, PERCENTILES
+from metrics import METRICS, operator_action
+
+STATISTICS_REFRESH_MS = 2000  # Perubahan dari change feed digabung dulu, statistik tidak dihitung ulang setiap detik
+
+class StatisticsSignals(QObject):
+    finished = Signal(object, object)  # task, statistik (None jika dibatalkan)
+    failed = Signal(object, str)
+
+class StatisticsTask(QRunnable):
+    # Statistik report_analytics.py di QThreadPool dengan koneksi DB sendiri (seperti export PDF); GUI tidak pernah menunggu
+    def __init__(self, report_filter, db_path=None):
+        super().__init__()
+        self.report_filter = report_filter; self.db_path = db_path; self.signals = StatisticsSignals(); self._cancelled = False
+
+    def cancel(self): self._cancelled = True
+
+    def run(self):
+        conn = None
+        try:
+            conn = connect_db(self.db_path)
+            with METRICS.histogram("report_statistics_seconds", "Time to load and compute report statistics in the background").time(): statistics = report_statistics(conn, *self.report_filter, should_stop=lambda: self._cancelled)
+            self.signals.finished.emit(self, statistics)
+        except Exception as e:
+            print(f"Error in StatisticsTask: {e}"); self.signals.failed.emit(self, str(e))
+        finally:
+            if conn: conn.close()
+
+class NetHistogram(QWidget):
+    # Distribusi net (kg) transaksi selesai: satu batang per bin histogram report_analytics
+    def __init__(self, parent=None):
+        super().__init__(parent); self.counts = []; self.edges = []; self.setMinimumHeight(140)
+
+    def set_histogram(self, histogram):
+        self.counts, self.edges = (histogram["counts"], histogram["edges"]) if histogram else ([], []); self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self); painter.fillRect(self.rect(), QColor("#2D3748"))
+        if self.counts:
+            width = self.width(); height = self.height() - 20; top = max(self.counts) or 1; bar = width / len(self.counts)
+            painter.setPen(Qt.PenStyle.NoPen); painter.setBrush(QColor("#38B2AC"))
+            for index, count in enumerate(self.counts):
+                bar_height = (height - 10) * count / top; painter.drawRect(QRectF(index * bar + 1, height - bar_height, max(bar - 2, 1), bar_height))
+            painter.setPen(QColor("#A0AEC0"))
+            painter.drawText(QRectF(4, height, width / 2, 20), Qt.AlignmentFlag.AlignLeft, f"{self.edges[0]:,.0f} kg")
+            painter.drawText(QRectF(width / 2, height, width / 2 - 4, 20), Qt.AlignmentFlag.AlignRight, f"{self.edges[-1]:,.0f} kg")
+        painter.end()
+
 class ReportWindow(QWidget):
-    def __init__(self, db_conn):
+    def __init__(self, db, change_feed=None):
         super().__init__()
-        self.db_conn = db_conn; self.filtered_data = []
+        self.db = db; self.current_filter = None; self.current_terms = []; self.export_task = None
+        self.statistics_task = None; self.statistics_tasks = set(); self.statistics_dirty = True
+        self.change_feed = change_feed or ChangeFeed(db, parent=self)
         self.setWindowTitle("Transaction Report"); self.setGeometry(150, 150, 1200, 700)
         self.setStyleSheet("""
             QWidget { background-color: #1A202C; color: #E2E8F0; font-size: 10pt; }
@@ -32,7 +77,7 @@ class ReportWindow(QWidget):
             QPushButton:hover { background-color: #319795; }
             QPushButton#delete_button { background-color: #E53E3E; }
             QPushButton#delete_button:hover { background-color: #C53030; }
-            QTableWidget { background-color: #2D3748; border-radius: 8px; border: 1px solid #4A5568; gridline-color: #4A5568; }
+            QTableView { background-color: #2D3748; border-radius: 8px; border: 1px solid #4A5568; gridline-color: #4A5568; }
             QHeaderView::section { background-color: #1A202C; color: #E2E8F0; padding: 8px; border-bottom: 1px solid #4A5568; border-right: 1px solid #4A5568; font-size: 9pt; font-weight: bold; }
         """)
 
@@ -40,31 +85,66 @@ class ReportWindow(QWidget):
         filter_frame = QFrame(objectName="card"); filter_layout = QHBoxLayout(filter_frame)
         self.start_date_edit = QDateEdit(calendarPopup=True); self.start_date_edit.setDisplayFormat("dd/MM/yyyy"); self.start_date_edit.setDate(QDate.currentDate().addDays(-30))
         self.end_date_edit = QDateEdit(calendarPopup=True); self.end_date_edit.setDisplayFormat("dd/MM/yyyy"); self.end_date_edit.setDate(QDate.currentDate())
-        self.goods_filter_edit = QLineEdit(); self.goods_filter_edit.setPlaceholderText("Filter by Goods Type (leave empty for all)...")
-        filter_button = QPushButton("Apply Filter"); filter_button.clicked.connect(self.apply_filter)
+        self.search_edit = QLineEdit(); self.search_edit.setPlaceholderText("Search plate, driver, goods, origin/destination or remarks (leave empty for all)...")
+        self.search_edit.returnPressed.connect(self.apply_filter)
+        filter_button = QPushButton("Search"); filter_button.clicked.connect(self.apply_filter)
         filter_layout.addWidget(QLabel("From:")); filter_layout.addWidget(self.start_date_edit)
         filter_layout.addWidget(QLabel("To:")); filter_layout.addWidget(self.end_date_edit)
-        filter_layout.addSpacing(20); filter_layout.addWidget(self.goods_filter_edit, 1); filter_layout.addWidget(filter_button)
+        filter_layout.addSpacing(20); filter_layout.addWidget(self.search_edit, 1); filter_layout.addWidget(filter_button)
         
-        self.report_table = QTableWidget(); self.report_table.setColumnCount(12)
+        # Ringkasan dibaca dari tabel rollup (database.py), bukan dari baris yang ada di tabel
+        summary_frame = QFrame(objectName="card"); summary_layout = QHBoxLayout(summary_frame); self.summary_labels = {}
+        for key, title in (("trucks", "Trucks"), ("completed", "Completed"), ("pending", "Pending"), ("net_kg", "Total Net (kg)"), ("trucks_per_hour", "Trucks / Hour"), ("avg_dwell_minutes", "Avg. Dwell (min)")):
+            box = QVBoxLayout(); value_label = QLabel("-"); value_label.setStyleSheet("font-size: 13pt; color: #E2E8F0;")
+            box.addWidget(QLabel(title)); box.addWidget(value_label); summary_layout.addLayout(box); self.summary_labels[key] = value_label
+        self.summary_goods_label = QLabel(""); self.summary_goods_label.setWordWrap(True); self.summary_goods_label.setStyleSheet("font-weight: normal;")
+        summary_layout.addWidget(self.summary_goods_label, 1)
+
         headers = ["Transaction ID", "Date", "Vehicle Plate No.", "Goods Type", "Origin", "Destination", "Status", "Gross", "Tare", "Net", "Quantity", "Remake"]
-        self.report_table.setHorizontalHeaderLabels(headers)
+        self.report_model = TransactionTableModel(headers, format_report_date, font=QFont("Arial", 9), parent=self, name="report")
+        self.report_table = QTableView(); self.report_table.setModel(self.report_model); self.report_table.setItemDelegateForColumn(STATUS_COLUMN, StatusColorDelegate(self.report_table))
         header = self.report_table.horizontalHeader(); header.setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
         header.setSectionResizeMode(3, QHeaderView.ResizeMode.Stretch)
         header.setSectionResizeMode(11, QHeaderView.ResizeMode.Stretch)
 
-        self.report_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers); self.report_table.verticalHeader().setVisible(False); self.report_table.verticalHeader().setDefaultSectionSize(35); self.report_table.setAlternatingRowColors(True); self.report_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows); self.report_table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.report_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers); self.report_table.verticalHeader().setVisible(False); self.report_table.verticalHeader().setDefaultSectionSize(35); self.report_table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed); self.report_table.setAlternatingRowColors(True); self.report_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows); self.report_table.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
 
         self.status_label = QLabel("Showing results..."); self.status_label.setAlignment(Qt.AlignmentFlag.AlignRight)
 
         action_layout = QHBoxLayout()
-        export_button = QPushButton("Export to PDF"); export_button.clicked.connect(self.export_pdf)
+        self.export_button = QPushButton("Export to PDF"); self.export_button.clicked.connect(self.export_pdf)
+        self.export_progress = QProgressBar(); self.export_progress.setMaximumWidth(250); self.export_progress.hide()
+        self.cancel_export_button = QPushButton("Cancel Export", objectName="delete_button"); self.cancel_export_button.clicked.connect(self.cancel_export); self.cancel_export_button.hide()
         print_button = QPushButton("Print Slip"); print_button.clicked.connect(self.print_slip)
+        slips_pdf_button = QPushButton("Slips to PDF"); slips_pdf_button.clicked.connect(self.export_slips_pdf)
         delete_button = QPushButton("Delete Transaction", objectName="delete_button"); delete_button.clicked.connect(self.delete_transaction)
         
-        action_layout.addWidget(self.status_label, 1); action_layout.addWidget(delete_button); action_layout.addWidget(print_button); action_layout.addWidget(export_button)
+        action_layout.addWidget(self.status_label, 1); action_layout.addWidget(delete_button); action_layout.addWidget(print_button); action_layout.addWidget(slips_pdf_button); action_layout.addWidget(self.export_progress); action_layout.addWidget(self.cancel_export_button); action_layout.addWidget(self.export_button)
 
-        main_layout.addWidget(filter_frame); main_layout.addWidget(self.report_table); main_layout.addLayout(action_layout)
+        # Tab Statistics: dihitung dari baris hasil filter (termasuk teks pencarian) hanya saat tab ini dibuka
+        self.statistics_tab = QWidget(); statistics_layout = QVBoxLayout(self.statistics_tab)
+        self.statistics_status = QLabel("Open this tab to calculate statistics."); statistics_layout.addWidget(self.statistics_status)
+        statistics_grid = QGridLayout(); self.statistics_labels = {}
+        statistic_titles = [("trucks", "Trucks"), ("completed", "Completed"), ("gross_kg", "Gross (kg)"), ("tare_kg", "Tare (kg)"), ("net_kg", "Net (kg)"), ("deduction_kg", "Deductions (kg)"),
+                            ("mean", "Net Mean ± Std (kg)"), ("range", "Net Min - Max (kg)")] + [(f"p{p}", "Net Median (kg)" if p == 50 else f"Net P{p} (kg)") for p in PERCENTILES]
+        for index, (key, title) in enumerate(statistic_titles):
+            value_label = QLabel("-"); value_label.setStyleSheet("font-size: 12pt; color: #E2E8F0;"); self.statistics_labels[key] = value_label
+            statistics_grid.addWidget(QLabel(title), (index // 5) * 2, index % 5); statistics_grid.addWidget(value_label, (index // 5) * 2 + 1, index % 5)
+        statistics_layout.addLayout(statistics_grid)
+        self.net_histogram = NetHistogram(); statistics_layout.addWidget(QLabel("Net Weight Distribution (completed)")); statistics_layout.addWidget(self.net_histogram)
+        tables_layout = QHBoxLayout()
+        self.goods_table = QTableWidget(0, 8); self.goods_table.setHorizontalHeaderLabels(["Goods Type", "Trucks", "Completed", "Total Net (kg)", "Avg. Net (kg)", "Median Net (kg)", "Deductions (kg)", "Outliers"])
+        self.outlier_table = QTableWidget(0, 5); self.outlier_table.setHorizontalHeaderLabels(["Transaction ID", "Date", "Plate No.", "Goods Type", "Net (kg) / Expected"])
+        for table in (self.goods_table, self.outlier_table):
+            table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers); table.verticalHeader().setVisible(False); table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents); table.horizontalHeader().setStretchLastSection(True)
+        goods_box = QVBoxLayout(); goods_box.addWidget(QLabel("By Goods Type")); goods_box.addWidget(self.goods_table)
+        self.outlier_title = QLabel("Outliers"); outlier_box = QVBoxLayout(); outlier_box.addWidget(self.outlier_title); outlier_box.addWidget(self.outlier_table)
+        tables_layout.addLayout(goods_box, 3); tables_layout.addLayout(outlier_box, 2); statistics_layout.addLayout(tables_layout, 1)
+        self.tabs = QTabWidget(); self.tabs.addTab(self.report_table, "Transactions"); self.tabs.addTab(self.statistics_tab, "Statistics"); self.tabs.currentChanged.connect(self.on_tab_changed)
+        self.statistics_timer = QTimer(self); self.statistics_timer.setSingleShot(True); self.statistics_timer.setInterval(STATISTICS_REFRESH_MS); self.statistics_timer.timeout.connect(self.refresh_statistics)
+
+        main_layout.addWidget(filter_frame); main_layout.addWidget(summary_frame); main_layout.addWidget(self.tabs); main_layout.addLayout(action_layout)
+        self.change_feed.transactions_changed.connect(self.apply_changes)
         self.apply_filter()
 
     # Ganti total fungsi print_slip:
@@ -73,85 +153,17 @@ class ReportWindow(QWidget):
         if not selected_rows:
             QMessageBox.warning(self, "Selection Error", "Please select a transaction from the table to print.")
             return
+        if len(selected_rows) > 1: self.print_selected_slips(); return  # Banyak slip: langsung ke printer tanpa preview per slip
         
-        transaction_id = self.report_table.item(selected_rows[0].row(), 0).text()
-        t = get_transaction_by_id(self.db_conn, transaction_id)
+        transaction_id = self.report_model.transaction_id_at(selected_rows[0].row())
+        self.db.get_transaction(transaction_id, callback=self.show_slip_preview)
+
+    def show_slip_preview(self, t):
         if not t:
             QMessageBox.critical(self, "Error", "Could not retrieve transaction details.")
             return
 
-        first_w = t['first_weigh_kg'] or 0
-        second_w = t['second_weigh_kg'] or 0
-        gross = max(first_w, second_w)
-        tare = min(first_w, second_w) if second_w > 0 else 0
-        
-        # --- Menambahkan 'color: black;' pada style HTML ---
-        html = f"""
-        <html>
-        <head>
-            <style>
-                body {{ 
-                    font-family: Arial, sans-serif; 
-                    font-size: 11pt; 
-                    color: black; /* <-- Teks default dibuat hitam */
-                }}
-                h1 {{ text-align: center; font-size: 16pt; margin-bottom: 20px; }}
-                table {{ width: 100%; border-collapse: collapse; }}
-                td {{ padding: 5px 8px; }}
-                .main-container > tbody > tr > td {{ vertical-align: top; padding: 0; }}
-                .info-table td.label {{ font-weight: bold; width: 130px; }}
-                .info-table td.value {{ text-align: right; }}
-                .footer-table td {{ padding-top: 40px; font-size: 10pt; }}
-            </style>
-        </head>
-        <body>
-            <h1>Weighing Slip</h1>
-            <table class="header-table">
-                <tr>
-                    <td><b>Date:</b> {datetime.strptime(t['first_weigh_timestamp'], '%Y-%m-%d %H:%M:%S').strftime('%Y/%m/%d %H:%M:%S')}</td>
-                    <td align="right"><b>Slip No:</b> {t['transaction_id']}</td>
-                </tr>
-            </table>
-            <hr>
-            <br>
-            <table class="main-container">
-                <tr>
-                    <td>
-                        <table class="info-table">
-                            <tr><td class="label">Vehicle Plate No.</td><td>: {t['plate_number']}</td></tr>
-                            <tr><td class="label">Goods Type</td><td>: {t['goods_type']}</td></tr>
-                            <tr><td class="label">Supplier</td><td>: {t['goods_origin'] or '-'}</td></tr>
-                            <tr><td class="label">Receiver</td><td>: {t['goods_destination'] or '-'}</td></tr>
-                            <tr><td class="label">Amount (Words)</td><td>: ( ***** )</td></tr>
-                            <tr><td class="label">Remake</td><td>: {t['remake'] or '-'}</td></tr>
-                        </table>
-                    </td>
-                    <td>
-                        <table class="info-table">
-                            <tr><td class="label">Gross</td><td class="value">{gross:,.2f} KG</td></tr>
-                            <tr><td class="label">Tare</td><td class="value">{tare:,.2f} KG</td></tr>
-                            <tr><td class="label">Net</td><td class="value"><b>{t['net_weigh_kg'] or 0:,.2f} KG</b></td></tr>
-                            <tr><td class="label">Unit Price</td><td>: </td></tr>
-                            <tr><td class="label">Total Amount</td><td>: </td></tr>
-                            <tr><td class="label">Quantity</td><td>: {t['quantity'] or '-'}</td></tr>
-                        </table>
-                    </td>
-                </tr>
-            </table>
-
-            <table class="footer-table">
-                <tr>
-                    <td>Operator: System Admin</td>
-                    <td align="right">Customer Signature: _________________</td>
-                </tr>
-            </table>
-        </body>
-        </html>
-        """
-
-        document = QTextDocument()
-        document.setHtml(html)
-
+        document = render_slip(t)
         printer = QPrinter(QPrinter.PrinterMode.HighResolution)
         preview_dialog = QPrintPreviewDialog(printer, self)
         
@@ -162,112 +174,171 @@ class ReportWindow(QWidget):
         preview_dialog.paintRequested.connect(document.print_)
         preview_dialog.exec()
 
+    def selected_transaction_ids(self):
+        # Urutan sesuai tabel, bukan urutan klik
+        return [self.report_model.transaction_id_at(index.row()) for index in sorted(self.report_table.selectionModel().selectedRows(), key=lambda index: index.row())]
+
+    def print_selected_slips(self):
+        # Cetak massal langsung ke printer: satu dialog printer untuk semua slip, render di background
+        transaction_ids = self.selected_transaction_ids()
+        if not transaction_ids: QMessageBox.warning(self, "Selection Error", "Please select one or more transactions to print."); return
+        if self.export_task is not None: return
+        printer = QPrinter(QPrinter.PrinterMode.HighResolution)
+        if QPrintDialog(printer, self).exec() != QPrintDialog.DialogCode.Accepted: return
+        self.start_slip_task(SlipPrintTask(transaction_ids, printer=printer, db_path=self.db.path))
+
+    def export_slips_pdf(self):
+        transaction_ids = self.selected_transaction_ids()
+        if not transaction_ids: QMessageBox.warning(self, "Selection Error", "Please select one or more transactions to export."); return
+        if self.export_task is not None: return
+        choice = QMessageBox(QMessageBox.Icon.Question, "Save Slips as PDF", f"Save {len(transaction_ids)} slip(s) as:", parent=self)
+        combined_button = choice.addButton("One PDF", QMessageBox.ButtonRole.AcceptRole); per_slip_button = choice.addButton("One PDF per Slip", QMessageBox.ButtonRole.AcceptRole); choice.addButton(QMessageBox.StandardButton.Cancel)
+        choice.exec()
+        if choice.clickedButton() == combined_button:
+            filepath, _ = QFileDialog.getSaveFileName(self, "Save Slips", f"Slips_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf", "PDF Files (*.pdf)")
+            if filepath: self.start_slip_task(SlipPrintTask(transaction_ids, filepath=filepath, db_path=self.db.path))
+        elif choice.clickedButton() == per_slip_button:
+            directory = QFileDialog.getExistingDirectory(self, "Folder for Slip PDFs")
+            if directory: self.start_slip_task(SlipPrintTask(transaction_ids, directory=directory, db_path=self.db.path))
+
+    def start_slip_task(self, task):
+        # Memakai progress bar dan tombol batal yang sama dengan export laporan (satu pekerjaan background sekaligus)
+        self.export_task = task; task.setAutoDelete(False)
+        task.signals.progress.connect(self.on_export_progress)
+        task.signals.finished.connect(self.on_slips_finished)
+        task.signals.failed.connect(self.on_slips_failed)
+        task.signals.cancelled.connect(self.on_export_cancelled)
+        self.export_progress.setRange(0, 0); self.export_progress.show(); self.cancel_export_button.show(); self.export_button.setEnabled(False)
+        QThreadPool.globalInstance().start(task)
+
     def apply_filter(self):
-        start_date = self.start_date_edit.date().toString("yyyy-MM-dd"); end_date = self.end_date_edit.date().toString("yyyy-MM-dd"); goods_type = self.goods_filter_edit.text().strip()
-        self.filtered_data = get_filtered_transactions(self.db_conn, start_date, end_date, goods_type); self.populate_table(); self.status_label.setText(f"Showing {len(self.filtered_data)} results.")
-    def populate_table(self):
-        self.report_table.setRowCount(0); self.report_table.setRowCount(len(self.filtered_data)); font_data = QFont("Arial", 9); color_default = QColor("#E2E8F0"); color_pending = QColor("#F6E05E"); color_completed = QColor("#48BB78"); color_row_bg_even = QColor("#2D3748"); color_row_bg_odd = QColor("#293241")
-        for row, transaction in enumerate(self.filtered_data):
-            first_w = transaction['first_weigh_kg'] or 0; second_w = transaction['second_weigh_kg'] or 0; gross = max(first_w, second_w); tare = min(first_w, second_w) if second_w > 0 else 0
-            date_str = datetime.strptime(transaction['first_weigh_timestamp'], '%Y-%m-%d %H:%M:%S').strftime('%d/%m/%y %H:%M'); quantity = transaction['quantity'] or '-'; remake = transaction['remake'] or '-'
-            columns_data = [transaction['transaction_id'], date_str, transaction['plate_number'], transaction['goods_type'], transaction['goods_origin'], transaction['goods_destination'], transaction['status'], f"{gross:,.2f}", f"{tare:,.2f}", f"{transaction['net_weigh_kg'] or 0:,.2f}", quantity, remake]; current_row_bg_color = color_row_bg_even if row % 2 == 0 else color_row_bg_odd
-            for col, cell_data in enumerate(columns_data):
-                item = QTableWidgetItem(str(cell_data)); item.setFont(font_data); item.setForeground(QBrush(color_default)); item.setBackground(QBrush(current_row_bg_color))
-                if col in [7, 8, 9]: item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
-                elif col == 6: item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-                else: item.setTextAlignment(Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter)
-                if col == 6:
-                    if cell_data == 'PENDING': item.setForeground(QBrush(color_pending)); item.setFont(QFont("Arial", 9, QFont.Weight.Bold))
-                    elif cell_data == 'COMPLETED': item.setForeground(QBrush(color_completed)); item.setFont(QFont("Arial", 9, QFont.Weight.Bold))
-                self.report_table.setItem(row, col, item)
+        start_date = self.start_date_edit.date().toString("yyyy-MM-dd"); end_date = self.end_date_edit.date().toString("yyyy-MM-dd"); search_text = self.search_edit.text().strip()
+        self.current_filter = (start_date, end_date, search_text); self.current_terms = search_terms(search_text)
+        # Tanpa teks: keyset per tanggal (terbaru di atas). Dengan teks: hasil FTS diurutkan relevansi, halaman per offset.
+        with operator_action("report_filter"):
+            if self.current_terms: self.report_model.set_source(lambda offset, limit, callback: self.db.read(search_transactions, start_date, end_date, search_text, limit, offset, callback=callback), accepts=self.matches_filter, ranked=True)
+            else: self.report_model.set_source(lambda after, limit, callback: self.db.read(get_transactions_page, start_date, end_date, "", after, limit, callback=callback), accepts=self.matches_filter)
+            self.update_result_count(); self.refresh_statistics()
+    def matches_filter(self, t):
+        # Setara MATCH di search_transactions: setiap kata harus menjadi awalan salah satu kata di kolom yang dicari
+        start_date, end_date, search_text = self.current_filter
+        if not start_date <= t['weigh_date'] <= end_date: return False
+        words = search_terms(" ".join(t[c] or "" for c in SEARCH_COLUMNS))
+        return all(any(word.startswith(term) for word in words) for term in self.current_terms)
+    def update_result_count(self):
+        current_filter = self.current_filter
+        self.db.read(count_search_results, *current_filter, callback=lambda count: self.show_result_count(current_filter, count))
+        # Ringkasan rollup selalu untuk seluruh periode (teks pencarian tidak bisa diterapkan ke tabel rollup)
+        self.db.read(get_rollup_summary, *current_filter[:2], callback=lambda summary: self.show_summary(current_filter, summary))
+    def show_result_count(self, current_filter, count):
+        if current_filter == self.current_filter: self.status_label.setText(f"Showing {count} results.")  # Abaikan hasil filter lama
+    def show_summary(self, current_filter, summary):
+        if current_filter != self.current_filter or summary is None: return
+        for key in ("trucks", "completed", "pending"): self.summary_labels[key].setText(f"{summary[key]:,}")
+        self.summary_labels["net_kg"].setText(f"{summary['net_kg']:,.2f}")
+        self.summary_labels["trucks_per_hour"].setText("-" if summary['trucks_per_hour'] is None else f"{summary['trucks_per_hour']:.1f} (peak {summary['peak_hour_trucks']})")
+        self.summary_labels["avg_dwell_minutes"].setText(f"{summary['avg_dwell_minutes']:.1f}")
+        top_goods = [f"{g['goods_type'] or '-'}: {g['net_kg']:,.0f} kg ({g['trucks']})" for g in summary['by_goods'][:5]]
+        self.summary_goods_label.setText("By goods - " + ", ".join(top_goods) if top_goods else "")
+    def apply_changes(self, changes):
+        if self.current_filter is None: return
+        self.report_model.apply_changes(changes); self.update_result_count()
+        self.statistics_dirty = True
+        if self.tabs.currentWidget() is self.statistics_tab: self.statistics_timer.start()
+    def on_tab_changed(self, index):
+        if self.tabs.widget(index) is self.statistics_tab and self.statistics_dirty: self.refresh_statistics()
+    def refresh_statistics(self):
+        # Satu perhitungan aktif per filter: yang lama dibatalkan (berhenti di batch berikutnya) dan hasilnya diabaikan
+        if self.tabs.currentWidget() is not self.statistics_tab: self.statistics_dirty = True; return
+        self.statistics_dirty = False; self.statistics_timer.stop()
+        if self.statistics_task is not None: self.statistics_task.cancel()
+        task = self.statistics_task = StatisticsTask(self.current_filter, db_path=self.db.path); task.setAutoDelete(False); self.statistics_tasks.add(task)  # Referensi dijaga sampai task selesai
+        task.signals.finished.connect(self.on_statistics_finished); task.signals.failed.connect(self.on_statistics_failed)
+        self.statistics_status.setText("Calculating statistics..."); QThreadPool.globalInstance().start(task)
+    def on_statistics_failed(self, task, error):
+        self.statistics_tasks.discard(task)
+        if task is self.statistics_task: self.statistics_task = None; self.statistics_status.setText(f"Statistics unavailable: {error}")
+    def on_statistics_finished(self, task, statistics):
+        self.statistics_tasks.discard(task)
+        if task is not self.statistics_task or statistics is None: return
+        self.statistics_task = None; totals = statistics["totals"]; distribution = statistics["distribution"]
+        self.statistics_status.setText(f"Statistics for {totals['trucks']:,} transactions ({totals['pending']:,} pending) in the selected period" + (f" matching '{self.current_filter[2]}'." if self.current_filter[2] else "."))
+        for key in ("trucks", "completed"): self.statistics_labels[key].setText(f"{totals[key]:,}")
+        for key in ("gross_kg", "tare_kg", "net_kg"): self.statistics_labels[key].setText(f"{totals[key]:,.2f}")
+        self.statistics_labels["deduction_kg"].setText(f"{totals['deduction_kg']:,.2f} ({totals['deducted_trucks']:,} trucks)")
+        self.statistics_labels["mean"].setText(f"{distribution['mean']:,.0f} ± {distribution['std']:,.0f}" if distribution else "-")
+        self.statistics_labels["range"].setText(f"{distribution['min']:,.0f} - {distribution['max']:,.0f}" if distribution else "-")
+        for p in PERCENTILES: self.statistics_labels[f"p{p}"].setText(f"{distribution['percentiles'][p]:,.0f}" if distribution else "-")
+        self.net_histogram.set_histogram(statistics["histogram"])
+        self.goods_table.setRowCount(len(statistics["by_goods"]))
+        for row, g in enumerate(statistics["by_goods"]):
+            values = [g["goods_type"] or "-", f"{g['trucks']:,}", f"{g['completed']:,}", f"{g['net_kg']:,.2f}", f"{g['avg_net_kg']:,.2f}", "-" if g["median_net_kg"] is None else f"{g['median_net_kg']:,.2f}", f"{g['deduction_kg']:,.2f}", f"{g['outliers']:,}"]
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if column: item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+                self.goods_table.setItem(row, column, item)
+        self.outlier_title.setText(f"Outliers ({statistics['outlier_count']:,}, largest first)" if statistics["outlier_count"] else "Outliers (none)")
+        self.outlier_table.setRowCount(len(statistics["outliers"]))
+        for row, o in enumerate(statistics["outliers"]):
+            expected = f" (expected {max(o['expected'][0], 0):,.0f} - {o['expected'][1]:,.0f})" if o["expected"] else ""
+            for column, value in enumerate([o["transaction_id"], o["weigh_date"], o["plate_number"], o["goods_type"] or "-", f"{o['net_kg']:,.2f}{expected}"]): self.outlier_table.setItem(row, column, QTableWidgetItem(value))
     def delete_transaction(self):
         selected_rows = self.report_table.selectionModel().selectedRows()
         if not selected_rows: QMessageBox.warning(self, "Selection Error", "Please select a transaction from the table to delete."); return
-        transaction_id = self.report_table.item(selected_rows[0].row(), 0).text()
+        if len(selected_rows) > 1: QMessageBox.warning(self, "Selection Error", "Please select a single transaction to delete."); return
+        transaction_id = self.report_model.transaction_id_at(selected_rows[0].row())
         reply = QMessageBox.question(self, 'Confirm Deletion', f"Are you sure you want to permanently delete transaction {transaction_id}?", QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No, QMessageBox.StandardButton.No)
         if reply == QMessageBox.StandardButton.Yes:
-            if delete_transaction_by_id(self.db_conn, transaction_id): QMessageBox.information(self, "Success", f"Transaction {transaction_id} has been deleted."); self.apply_filter()
-            else: QMessageBox.critical(self, "Error", f"Failed to delete transaction {transaction_id}.")
+            self.db.write(delete_transaction_by_id, transaction_id, callback=lambda ok: self.on_transaction_deleted(transaction_id, ok))
+    def on_transaction_deleted(self, transaction_id, ok):
+        if ok: QMessageBox.information(self, "Success", f"Transaction {transaction_id} has been deleted."); self.change_feed.poll()
+        else: QMessageBox.critical(self, "Error", f"Failed to delete transaction {transaction_id}.")
     def export_pdf(self):
-        #print_slip kini menjadi cara utama untuk cetak per data
-        if not self.filtered_data: QMessageBox.warning(self, "No Data", "No data to export."); return
-        pass
-
-    # Ganti total fungsi export_pdf dengan yang ini:
-    def export_pdf(self):
-        if not self.filtered_data:
+        if self.report_model.rowCount() == 0:
             QMessageBox.warning(self, "No Data", "No data to export.")
             return
+        if self.export_task is not None: return
 
         default_filename = f"Transaction_Report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
         filepath, _ = QFileDialog.getSaveFileName(self, "Save PDF Report", default_filename, "PDF Files (*.pdf)")
         if not filepath:
             return
 
-        doc = SimpleDocTemplate(filepath, pagesize=letter, 
-                                leftMargin=0.5*inch, rightMargin=0.5*inch, 
-                                topMargin=0.5*inch, bottomMargin=0.5*inch)
-        styles = getSampleStyleSheet()
-        story = []
-        
-        styles.add(ParagraphStyle(name='ReportTitle', parent=styles['h1'], fontSize=16, alignment=TA_CENTER, spaceAfter=14))
-        styles.add(ParagraphStyle(name='ReportSubtitle', parent=styles['h2'], fontSize=12, alignment=TA_CENTER, spaceAfter=12))
+        # Export berjalan di QThreadPool dengan koneksi DB sendiri; jendela tetap responsif dan bisa dibatalkan
+        from pdf_export import PdfExportTask  # reportlab baru dimuat saat export pertama
+        self.export_task = PdfExportTask(filepath, *self.current_filter, period_label=f"{self.start_date_edit.text()} - {self.end_date_edit.text()}", db_path=self.db.path)
+        self.export_task.setAutoDelete(False)
+        self.export_task.signals.progress.connect(self.on_export_progress)
+        self.export_task.signals.finished.connect(self.on_export_finished)
+        self.export_task.signals.failed.connect(self.on_export_failed)
+        self.export_task.signals.cancelled.connect(self.on_export_cancelled)
+        self.export_progress.setRange(0, 0); self.export_progress.show(); self.cancel_export_button.show(); self.export_button.setEnabled(False)
+        QThreadPool.globalInstance().start(self.export_task)
 
-        story.append(Paragraph("Laporan Transaksi Weighing", styles['ReportTitle']))
-        story.append(Paragraph(f"Periode: {self.start_date_edit.text()} - {self.end_date_edit.text()}", styles['ReportSubtitle']))
-        story.append(Spacer(1, 0.2*inch))
-        
-        # --- PERUBAHAN 1: Menghapus kolom "Status" ---
-        header = ["ID Transaksi", "Tanggal", "No. Plat", "Jenis Barang", "Asal", "Tujuan", "Kotor (kg)", "Tara (kg)", "Bersih (kg)", "Qty", "Keterangan"]
-        pdf_data = [header]
-        for t in self.filtered_data:
-            first_w = t['first_weigh_kg'] or 0; second_w = t['second_weigh_kg'] or 0
-            gross = max(first_w, second_w); tare = min(first_w, second_w) if second_w > 0 else 0
-            date_str = datetime.strptime(t['first_weigh_timestamp'], '%Y-%m-%d %H:%M:%S').strftime('%d/%m/%y %H:%M')
-            pdf_data.append([
-                t['transaction_id'], 
-                date_str, 
-                t['plate_number'], 
-                t['goods_type'], 
-                t['goods_origin'], 
-                t['goods_destination'], 
-                f"{gross:,.2f}", 
-                f"{tare:,.2f}", 
-                f"{t['net_weigh_kg'] or 0:,.2f}", 
-                t['quantity'] or '-', 
-                t['remake'] or '-'
-            ])
-        
-        # Sesuaikan lebar kolom (kini hanya 11 kolom)
-        col_widths = [
-            0.8*inch, 0.8*inch, 0.8*inch, 1.1*inch, 0.6*inch, 0.6*inch, 
-            0.7*inch, 0.7*inch, 0.7*inch, 0.4*inch, 1.1*inch
-        ]
-        
-        # --- PERUBAHAN 2: Mengatur tabel agar center di halaman ---
-        pdf_table = Table(pdf_data, colWidths=col_widths, hAlign='CENTER') # Menggunakan hAlign='CENTER'
-        
-        style = TableStyle([
-            ('BACKGROUND', (0,0), (-1,0), colors.grey),
-            ('TEXTCOLOR', (0,0), (-1,0), colors.whitesmoke),
-            ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-            ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-            ('BOTTOMPADDING', (0,0), (-1,0), 10),
-            ('BACKGROUND', (0,1), (-1,-1), colors.white),
-            ('TEXTCOLOR', (0,1), (-1,-1), colors.black),
-            ('GRID', (0,0), (-1,-1), 0.5, colors.black),
-            ('FONTSIZE', (0,0), (-1,-1), 7),
-            ('LEFTPADDING', (0,0), (-1,-1), 2),
-            ('RIGHTPADDING', (0,0), (-1,-1), 2),
-        ])
-        pdf_table.setStyle(style)
-        
-        story.append(pdf_table)
-        
-        try:
-            doc.build(story)
-            QMessageBox.information(self, "Export Successful", f"Report successfully saved at:\n{filepath}")
-            os.startfile(filepath)
-        except Exception as e:
-            QMessageBox.critical(self, "PDF Error", f"Failed to generate PDF report.\nError: {e}")
\ No newline at end of file
+    def on_export_progress(self, done, total):
+        self.export_progress.setRange(0, max(total, 1)); self.export_progress.setValue(done)
+
+    def cancel_export(self):
+        if self.export_task is not None: self.export_task.cancel(); self.cancel_export_button.setEnabled(False)
+
+    def reset_export_ui(self):
+        self.export_task = None; self.export_progress.hide(); self.cancel_export_button.hide(); self.cancel_export_button.setEnabled(True); self.export_button.setEnabled(True)
+
+    def on_export_finished(self, filepath):
+        self.reset_export_ui()
+        QMessageBox.information(self, "Export Successful", f"Report successfully saved at:\n{filepath}")
+        if hasattr(os, 'startfile'): os.startfile(filepath)
+
+    def on_slips_finished(self, target):
+        self.reset_export_ui(); self.status_label.setText(f"Slips sent to {target}.")
+
+    def on_slips_failed(self, error):
+        self.reset_export_ui()
+        QMessageBox.critical(self, "Print Error", f"Failed to print slips.\nError: {error}")
+
+    def on_export_failed(self, error):
+        self.reset_export_ui()
+        QMessageBox.critical(self, "PDF Error", f"Failed to generate PDF report.\nError: {error}")
+
+    def on_export_cancelled(self):
+        self.reset_export_ui(); self.status_label.setText("PDF export cancelled.")
@@ -0,0 +1,49 @@
+# File: scale_registry.py (Beberapa timbangan/indikator dilayani bersamaan oleh satu instance aplikasi)
+#
+# Daftar timbangan dibaca dari config.json oleh app_config.load_scales.
+# Setiap timbangan punya QThread, worker, parser, detektor stabil dan rekaman sendiri; semuanya memakai
+# DatabaseService yang sama, jadi tidak perlu lagi dua proses aplikasi pada satu file DB.
+# Worker yang punya atribut backlog (metrics.Gauge, dinaikkan setiap emit) diturunkan lagi saat state sampai
+# di thread GUI, jadi gauge scale_signal_backlog = jumlah update berat yang masih antre di event loop GUI.
+
+from PySide6.QtCore import QObject, QThread, Signal
+
+class _ScaleRelay(QObject):
+    # Hidup di thread GUI: slot milik QObject (bukan lambda) membuat signal worker otomatis queued ke thread GUI
+    def __init__(self, registry, scale_id, backlog=None):
+        super().__init__(registry); self.registry = registry; self.scale_id = scale_id; self.backlog = backlog
+    def on_state(self, state):
+        if self.backlog is not None: self.backlog.dec()
+        self.registry._on_state(self.scale_id, state)
+    def on_error(self, message): self.registry.error_occurred.emit(self.scale_id, message)
+
+class ScaleRegistry(QObject):
+    state_changed = Signal(str, object)  # scale_id, WeightState
+    error_occurred = Signal(str, str)    # scale_id, pesan
+
+    def __init__(self, scales, create_worker, parent=None):
+        # create_worker(scale) -> worker QObject dengan run(), stop(), signal state_berubah (dan opsional error_terjadi)
+        super().__init__(parent)
+        self.scales = {scale["id"]: scale for scale in scales}; self._create_worker = create_worker
+        self.states = {}; self._workers = {}; self._threads = {}
+
+    def start(self):
+        for scale_id, scale in self.scales.items():
+            thread = QThread(); worker = self._create_worker(scale); worker.moveToThread(thread)
+            relay = _ScaleRelay(self, scale_id, getattr(worker, "backlog", None)); worker.state_berubah.connect(relay.on_state)
+            if hasattr(worker, "error_terjadi"): worker.error_terjadi.connect(relay.on_error)
+            thread.started.connect(worker.run); thread.finished.connect(worker.deleteLater)
+            self._workers[scale_id] = worker; self._threads[scale_id] = thread; thread.start()
+        return self
+
+    def _on_state(self, scale_id, state):
+        self.states[scale_id] = state; self.state_changed.emit(scale_id, state)
+
+    def stop(self):
+        for worker in self._workers.values(): worker.stop()
+        for thread in self._threads.values(): thread.quit(); thread.wait()
+        self._workers.clear(); self._threads.clear()
+
+    def name(self, scale_id): return self.scales[scale_id]["name"]
+    def latest(self, scale_id): return self.states.get(scale_id)
+    def worker(self, scale_id): return self._workers.get(scale_id)
@@ -2,6 +2,7 @@ from PySide6.QtWidgets import (QWidget, QLabel, QPushButton, QVBoxLayout, QTabWi
 from PySide6.QtCore import Qt
 import json
 from database import get_all_users, add_user, delete_user
+from indicator_protocols import PROTOCOLS, DEFAULT_PROTOCOL
 
 CONFIG_FILE = "config.json"
 
@@ -18,9 +19,9 @@ class AddUserDialog(QDialog):
     def get_data(self): return {"username": self.username_input.text().strip(), "password": self.password_input.text(), "role": self.role_combo.currentText()}
 
 class SettingsWindow(QWidget):
-    def __init__(self, db_conn):
+    def __init__(self, db):
         super().__init__()
-        self.db_conn = db_conn
+        self.db = db
         self.setWindowTitle("Settings"); self.setGeometry(200, 200, 600, 400)
         self.setStyleSheet("""
             QWidget { background-color: #2D3748; color: #E2E8F0; } QLabel { font-weight: bold; } QLineEdit, QComboBox { background-color: #1A202C; border: 1px solid #4A5568; border-radius: 4px; padding: 6px; } QPushButton { background-color: #38B2AC; border: none; padding: 10px; border-radius: 4px; font-weight: bold; color: white; } QPushButton:hover { background-color: #319795; } QTabWidget::pane { border: 1px solid #4A5568; } QTabBar::tab { background: #2D3748; padding: 10px; border-top-left-radius: 4px; border-top-right-radius: 4px; } QTabBar::tab:selected { background: #38B2AC; color: white; } QTableWidget { background-color: #1A202C; } QPushButton#delete_button { background-color: #E53E3E; } QPushButton#delete_button:hover { background-color: #C53030; }
@@ -32,7 +33,9 @@ class SettingsWindow(QWidget):
     def create_connection_tab(self):
         tab = QWidget(); layout = QVBoxLayout(tab); form = QFormLayout()
         self.port_input = QLineEdit(); self.baudrate_combo = QComboBox(); self.baudrate_combo.addItems(["9600", "4800", "19200", "38400", "57600", "115200"])
-        form.addRow("COM Port :", self.port_input); form.addRow("Baud Rate:", self.baudrate_combo)
+        self.protocol_combo = QComboBox()
+        for name, parser in PROTOCOLS.items(): self.protocol_combo.addItem(parser.description, name)
+        form.addRow("COM Port :", self.port_input); form.addRow("Baud Rate:", self.baudrate_combo); form.addRow("Protocol :", self.protocol_combo)
         save_button = QPushButton("Save Connection Settings"); save_button.setToolTip("Aplikasi perlu dimulai ulang agar pengaturan baru diterapkan."); save_button.clicked.connect(self.save_connection_settings)
         layout.addLayout(form); layout.addStretch(); layout.addWidget(save_button)
         self.tabs.addTab(tab, "Connection"); self.load_connection_settings()
@@ -51,8 +54,9 @@ class SettingsWindow(QWidget):
         layout.addWidget(self.users_table); layout.addLayout(button_layout)
         self.tabs.addTab(tab, "Users"); self.refresh_users_table()
     
-    def refresh_users_table(self):
-        users = get_all_users(self.db_conn)
+    def refresh_users_table(self): self.db.read(get_all_users, callback=self.show_users)
+
+    def show_users(self, users):
         self.users_table.setRowCount(0); self.users_table.setRowCount(len(users))
         for row, user in enumerate(users):
             self.users_table.setItem(row, 0, QTableWidgetItem(str(user['id']))); self.users_table.setItem(row, 1, QTableWidgetItem(user['username'])); self.users_table.setItem(row, 2, QTableWidgetItem(user['role']))
@@ -62,8 +66,11 @@ class SettingsWindow(QWidget):
         if dialog.exec():
             data = dialog.get_data()
             if not data['username'] or not data['password']: QMessageBox.warning(self, "Input Error", "Username and Password cannot be empty."); return
-            if add_user(self.db_conn, data['username'], data['password'], data['role']): QMessageBox.information(self, "Success", "New user added successfully."); self.refresh_users_table()
-            else: QMessageBox.critical(self, "Error", "Username already exists.")
+            self.db.write(add_user, data['username'], data['password'], data['role'], callback=self.on_user_added)
+
+    def on_user_added(self, ok):
+        if ok: QMessageBox.information(self, "Success", "New user added successfully."); self.refresh_users_table()
+        else: QMessageBox.critical(self, "Error", "Username already exists.")
                 
     def delete_user_action(self):
         selected_rows = self.users_table.selectionModel().selectedRows()
@@ -72,17 +79,26 @@ class SettingsWindow(QWidget):
         if username == 'admin': QMessageBox.critical(self, "Permission Denied", "The default 'admin' user cannot be deleted."); return
         reply = QMessageBox.question(self, "Confirm Deletion", f"Are you sure you want to delete user '{username}'?", QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No, QMessageBox.StandardButton.No)
         if reply == QMessageBox.StandardButton.Yes:
-            if delete_user(self.db_conn, int(user_id)): QMessageBox.information(self, "Success", f"User '{username}' deleted."); self.refresh_users_table()
-            else: QMessageBox.critical(self, "Error", "Failed to delete user.")
+            self.db.write(delete_user, int(user_id), callback=lambda ok: self.on_user_deleted(username, ok))
 
-    def load_connection_settings(self):
+    def on_user_deleted(self, username, ok):
+        if ok: QMessageBox.information(self, "Success", f"User '{username}' deleted."); self.refresh_users_table()
+        else: QMessageBox.critical(self, "Error", "Failed to delete user.")
+
+    def read_config(self):
         try:
-            with open(CONFIG_FILE, 'r') as f: config = json.load(f)
-            self.port_input.setText(config.get("port", "COM1")); self.baudrate_combo.setCurrentText(str(config.get("baudrate", 9600)))
-        except FileNotFoundError: self.port_input.setText("COM1"); self.baudrate_combo.setCurrentText("9600")
+            with open(CONFIG_FILE, 'r') as f: return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError): return {}
+
+    def load_connection_settings(self):
+        config = self.read_config()
+        self.port_input.setText(config.get("port", "COM1")); self.baudrate_combo.setCurrentText(str(config.get("baudrate", 9600)))
+        self.protocol_combo.setCurrentIndex(max(0, self.protocol_combo.findData(config.get("protocol", DEFAULT_PROTOCOL))))
 
     def save_connection_settings(self):
-        config = {"port": self.port_input.text().strip().upper(), "baudrate": int(self.baudrate_combo.currentText())}
+        # Kunci lain di config.json (mis. protocol_options) tetap dipertahankan
+        config = self.read_config()
+        config.update({"port": self.port_input.text().strip().upper(), "baudrate": int(self.baudrate_combo.currentText()), "protocol": self.protocol_combo.currentData()})
         with open(CONFIG_FILE, 'w') as f: json.dump(config, f, indent=4)
         QMessageBox.information(self, "Settings Saved", "Pengaturan telah disimpan.\nAplikasi akan ditutup. Silakan buka kembali untuk menerapkan perubahan.")
         QApplication.instance().quit()
\ No newline at end of file
@@ -0,0 +1,154 @@
+# File: slip_printing.py (Slip timbang bersama untuk MainWindow dan ReportWindow)
+#
+# Template HTML slip hanya di-parse sekali menjadi QTextDocument (per thread, karena QTextDocument tidak
+# thread-safe); setiap slip adalah clone() dari template dengan placeholder [[nama]] diganti teks biasa.
+# Nilai disisipkan sebagai teks, bukan HTML, jadi karakter seperti '<' atau '&' di remake tidak merusak slip.
+# SlipPrintTask mencetak banyak slip di QThreadPool langsung ke printer atau ke PDF (satu file gabungan
+# atau satu file per slip), tanpa dialog preview per slip.
+
+import os
+import threading
+from datetime import datetime
+from PySide6.QtCore import QObject, QRunnable, Signal, QRectF, QSizeF, QMarginsF
+from PySide6.QtGui import QTextDocument, QTextCursor, QPainter, QPdfWriter, QPageSize, QPageLayout
+
+from database import connect_db, get_transactions_by_ids
+
+SLIP_FIELDS = ("date", "transaction_id", "plate_number", "goods_type", "goods_origin", "goods_destination", "remake", "gross", "tare", "net", "quantity")
+PLACEHOLDER = "[[{}]]"
+PDF_RESOLUTION = 300
+PDF_MARGINS_MM = QMarginsF(15, 15, 15, 15)
+SLIP_TEMPLATE = """<html><head><style>
+body { font-family: Arial, sans-serif; font-size: 11pt; color: black; }
+h1 { text-align: center; font-size: 16pt; margin-bottom: 20px; }
+table { width: 100%; border-collapse: collapse; }
+td { padding: 5px 8px; }
+.main-container > tbody > tr > td { vertical-align: top; padding: 0; }
+.info-table td.label { font-weight: bold; width: 130px; }
+.info-table td.value { text-align: right; }
+.footer-table td { padding-top: 40px; font-size: 10pt; }
+</style></head><body>
+<h1>Weighing Slip</h1>
+<table class="header-table"><tr><td><b>Date:</b> [[date]]</td><td align="right"><b>Slip No:</b> [[transaction_id]]</td></tr></table>
+<hr><br>
+<table class="main-container"><tr>
+<td><table class="info-table">
+<tr><td class="label">Vehicle Plate No.</td><td>: [[plate_number]]</td></tr>
+<tr><td class="label">Goods Type</td><td>: [[goods_type]]</td></tr>
+<tr><td class="label">Supplier</td><td>: [[goods_origin]]</td></tr>
+<tr><td class="label">Receiver</td><td>: [[goods_destination]]</td></tr>
+<tr><td class="label">Amount (Words)</td><td>: ( ***** )</td></tr>
+<tr><td class="label">Remake</td><td>: [[remake]]</td></tr>
+</table></td>
+<td><table class="info-table">
+<tr><td class="label">Gross</td><td class="value">[[gross]] KG</td></tr>
+<tr><td class="label">Tare</td><td class="value">[[tare]] KG</td></tr>
+<tr><td class="label">Net</td><td class="value"><b>[[net]] KG</b></td></tr>
+<tr><td class="label">Unit Price</td><td>: </td></tr>
+<tr><td class="label">Total Amount</td><td>: </td></tr>
+<tr><td class="label">Quantity</td><td>: [[quantity]]</td></tr>
+</table></td>
+</tr></table>
+<table class="footer-table"><tr><td>Operator: System Admin</td><td align="right">Customer Signature: _________________</td></tr></table>
+</body></html>"""
+
+_cache = threading.local()
+
+def slip_values(t):
+    first_w = t['first_weigh_kg'] or 0; second_w = t['second_weigh_kg'] or 0
+    gross = max(first_w, second_w); tare = min(first_w, second_w) if second_w > 0 else 0
+    return {"date": datetime.strptime(t['first_weigh_timestamp'], '%Y-%m-%d %H:%M:%S').strftime('%Y/%m/%d %H:%M:%S'), "transaction_id": t['transaction_id'],
+            "plate_number": t['plate_number'], "goods_type": t['goods_type'] or '', "goods_origin": t['goods_origin'] or '-', "goods_destination": t['goods_destination'] or '-',
+            "remake": t['remake'] or '-', "gross": f"{gross:,.2f}", "tare": f"{tare:,.2f}", "net": f"{t['net_weigh_kg'] or 0:,.2f}", "quantity": t['quantity'] or '-'}
+
+def _template():
+    # (dokumen, [(awal, akhir, field, format)]) untuk thread ini; diurutkan dari belakang agar penggantian
+    # satu placeholder tidak menggeser posisi placeholder berikutnya
+    template = getattr(_cache, "template", None)
+    if template is None:
+        document = QTextDocument(); document.setHtml(SLIP_TEMPLATE); spans = []
+        for field in SLIP_FIELDS:
+            cursor = document.find(PLACEHOLDER.format(field))
+            if cursor.isNull(): continue
+            probe = QTextCursor(document); probe.setPosition(cursor.selectionStart() + 1)  # Format teks placeholder (mis. tebal untuk Net)
+            spans.append((cursor.selectionStart(), cursor.selectionEnd(), field, probe.charFormat()))
+        template = _cache.template = (document, sorted(spans, key=lambda span: span[0], reverse=True))
+    return template
+
+def render_slip(t, paint_device=None):
+    # QTextDocument baru berisi slip transaksi t; paint_device (printer/QPdfWriter) menentukan DPI layout
+    document, spans = _template(); slip = document.clone(); values = slip_values(t); cursor = QTextCursor(slip)
+    for start, end, field, char_format in spans:
+        cursor.setPosition(start); cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor); cursor.insertText(str(values[field]), char_format)
+    if paint_device is not None: slip.documentLayout().setPaintDevice(paint_device)
+    return slip
+
+def paint_slips(device, transactions, on_slip=None):
+    # Semua slip ke satu perangkat halaman (QPrinter/QPdfWriter), setiap slip mulai di halaman baru.
+    # on_slip(jumlah_selesai) dipanggil setelah setiap slip (progress / pembatalan lewat exception).
+    painter = QPainter()
+    if not painter.begin(device): raise RuntimeError("Could not start printing (printer or file not available).")
+    try:
+        page = device.pageLayout().paintRectPixels(device.resolution()); page_height = page.height(); first_page = True
+        for done, t in enumerate(transactions, start=1):
+            slip = render_slip(t, device); slip.setPageSize(QSizeF(page.width(), page_height))
+            for page_index in range(slip.pageCount()):
+                if not first_page: device.newPage()
+                first_page = False
+                painter.save(); painter.translate(0, -page_index * page_height)
+                slip.drawContents(painter, QRectF(0, page_index * page_height, page.width(), page_height)); painter.restore()
+            if on_slip is not None: on_slip(done)
+    finally: painter.end()
+
+def create_pdf_writer(path):
+    writer = QPdfWriter(path); writer.setResolution(PDF_RESOLUTION); writer.setTitle("Weighing Slip")
+    writer.setPageLayout(QPageLayout(QPageSize(QPageSize.PageSizeId.A4), QPageLayout.Orientation.Portrait, PDF_MARGINS_MM, QPageLayout.Unit.Millimeter))
+    return writer
+
+class SlipPrintCancelled(Exception): pass
+
+class SlipPrintSignals(QObject):
+    progress = Signal(int, int)  # slip yang sudah dirender, total slip
+    finished = Signal(str)       # file PDF, folder, atau nama printer
+    failed = Signal(str)
+    cancelled = Signal()
+
+class SlipPrintTask(QRunnable):
+    # Tepat satu tujuan: filepath (satu PDF gabungan), directory (Slip_<ID>.pdf per transaksi) atau printer
+    # (QPrinter yang sudah diatur lewat QPrintDialog di thread GUI). Koneksi DB milik task sendiri.
+    def __init__(self, transaction_ids, filepath=None, directory=None, printer=None, db_path=None):
+        super().__init__()
+        self.transaction_ids = list(transaction_ids); self.filepath = filepath; self.directory = directory; self.printer = printer; self.db_path = db_path
+        self.signals = SlipPrintSignals(); self._cancelled = False
+
+    def cancel(self): self._cancelled = True
+
+    def run(self):
+        conn = None
+        try:
+            conn = connect_db(self.db_path)
+            rows = {row['transaction_id']: row for row in get_transactions_by_ids(conn, self.transaction_ids)}
+            transactions = [rows[transaction_id] for transaction_id in self.transaction_ids if transaction_id in rows]  # Urutan sesuai pilihan
+            conn.close(); conn = None
+            if not transactions: raise RuntimeError("Selected transactions no longer exist.")
+            total = len(transactions)
+            def on_slip(done):
+                if self._cancelled: raise SlipPrintCancelled()
+                self.signals.progress.emit(done, total)
+            if self.directory is not None:
+                os.makedirs(self.directory, exist_ok=True)
+                for done, t in enumerate(transactions, start=1):
+                    paint_slips(create_pdf_writer(os.path.join(self.directory, f"Slip_{t['transaction_id']}.pdf")), [t]); on_slip(done)
+                self.signals.finished.emit(self.directory)
+            elif self.printer is not None:
+                paint_slips(self.printer, transactions, on_slip); self.signals.finished.emit(self.printer.printerName() or self.printer.outputFileName())
+            else:
+                paint_slips(create_pdf_writer(self.filepath), transactions, on_slip); self.signals.finished.emit(self.filepath)
+        except SlipPrintCancelled:
+            # Slip yang sudah terkirim ke printer atau file per slip yang sudah selesai tetap ada; PDF gabungan yang belum lengkap dihapus
+            if self.filepath is not None and self.directory is None and self.printer is None and os.path.exists(self.filepath): os.remove(self.filepath)
+            self.signals.cancelled.emit()
+        except Exception as e:
+            print(f"Error in SlipPrintTask: {e}"); self.signals.failed.emit(str(e))
+        finally:
+            if conn: conn.close()
@@ -0,0 +1,37 @@
+# Import tiket lama (ID asli bukan format W) -> arsip tahunan -> cari lagi per ID
+import csv
+from datetime import date, timedelta
+
+from database import init_db, archive_transactions, get_transaction_by_id, get_transactions_by_ids
+from bulk_import import import_file
+
+def test_imported_legacy_id_is_found_after_archiving(tmp_path):
+    day = (date.today() - timedelta(days=800)).isoformat()
+    source = tmp_path / "tiket_lama.csv"
+    with open(source, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["transaction_id", "plate_number", "first_weigh_kg", "second_weigh_kg", "first_weigh_timestamp", "second_weigh_timestamp"])
+        writer.writerow(["T-0001", "BK 1234 AB", "30000", "10000", f"{day} 08:00:00", f"{day} 09:00:00"])
+    conn = init_db(str(tmp_path / "weighing_system.db"))
+    try:
+        stats = import_file(conn, str(source))
+        assert stats.rows == 1
+        assert sum(count for _, count in archive_transactions(conn, 365)) == 1
+        assert conn.execute("SELECT COUNT(*) FROM main.transactions WHERE transaction_id = 'T-0001'").fetchone()[0] == 0
+        row = get_transaction_by_id(conn, "T-0001")
+        assert row is not None and row["plate_number"] == "BK 1234 AB" and row["net_weigh_kg"] == 20000
+        assert [r["transaction_id"] for r in get_transactions_by_ids(conn, ["T-0001", "missing"])] == ["T-0001"]
+    finally: conn.close()
+
+def test_imported_net_without_net_column_subtracts_deduction(tmp_path):
+    source = tmp_path / "tiket_potongan.csv"
+    with open(source, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["transaction_id", "plate_number", "first_weigh_kg", "second_weigh_kg", "first_weigh_timestamp", "second_weigh_timestamp", "remake"])
+        writer.writerow(["T-0002", "BK 5678 CD", "30000", "10000", "2024-01-02 08:00:00", "2024-01-02 09:00:00", "Potongan: 50 KG."])
+    conn = init_db(str(tmp_path / "weighing_system.db"))
+    try:
+        import_file(conn, str(source))
+        row = get_transaction_by_id(conn, "T-0002")
+        assert row["deduction_kg"] == 50 and row["net_weigh_kg"] == 19950
+    finally: conn.close()
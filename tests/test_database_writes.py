@@ -0,0 +1,31 @@
+# Timbang kedua dan hapus memakai _write_transaction (BEGIN IMMEDIATE + retry), sama dengan timbang pertama
+import threading
+import time
+
+from database import init_db, connect_db, create_first_weigh, complete_second_weigh, delete_transaction_by_id, find_pending_by_plate_number, get_transaction_by_id
+
+FIRST_WEIGH = {"plate_number": "BK 1 AA", "goods_type": "Sawit", "driver_name": "", "vendor": "", "customer": "", "quantity": "", "goods_origin": "", "goods_destination": "", "remake": "", "weight": 30000.0}
+
+def hold_write_lock(path, seconds):
+    # Stasiun lain (thread dengan koneksi sendiri) memegang write lock sebentar; kembali setelah lock dipegang
+    locked = threading.Event()
+    def station():
+        other = connect_db(path); other.execute("BEGIN IMMEDIATE"); locked.set(); time.sleep(seconds); other.commit(); other.close()
+    thread = threading.Thread(target=station); thread.start(); locked.wait()
+    return thread
+
+def test_second_weigh_and_delete_wait_for_other_writer(tmp_path):
+    path = str(tmp_path / "weighing_system.db"); conn = init_db(path)
+    try:
+        assert create_first_weigh(conn, FIRST_WEIGH)
+        transaction_id = find_pending_by_plate_number(conn, "BK 1 AA")["transaction_id"]
+        station = hold_write_lock(path, 0.3)
+        assert complete_second_weigh(conn, transaction_id, 10000.0, 19950.0, "", deduction_kg=50.0)
+        station.join()
+        row = get_transaction_by_id(conn, transaction_id); assert row["status"] == "COMPLETED" and row["net_weigh_kg"] == 19950.0
+        assert not complete_second_weigh(conn, transaction_id, 10000.0, 19950.0, "")  # Sudah COMPLETED
+        station = hold_write_lock(path, 0.3)
+        assert delete_transaction_by_id(conn, transaction_id)
+        station.join()
+        assert get_transaction_by_id(conn, transaction_id) is None and not conn.in_transaction
+    finally: conn.close()
@@ -0,0 +1,14 @@
+# FrameParser abstrak: parser yang belum lengkap gagal saat dibuat, bukan saat feed() di thread serial
+
+import pytest
+
+from indicator_protocols import PROTOCOLS, DelimitedFrameParser, FrameParser
+
+def test_incomplete_parser_fails_when_built():
+    class NoEncode(DelimitedFrameParser):
+        def parse_frame(self, frame): return None
+    for parser_class in (FrameParser, DelimitedFrameParser, NoEncode):
+        with pytest.raises(TypeError): parser_class()
+
+def test_registered_parsers_can_be_built():
+    for parser_class in PROTOCOLS.values(): assert parser_class().feed(parser_class.encode(12345.0) * 2)[0].weight == 12345.0
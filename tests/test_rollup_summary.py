@@ -0,0 +1,17 @@
+# Ringkasan rollup: truk/jam hanya tanpa filter jenis barang (hourly_rollup tidak per jenis barang)
+from datetime import date
+
+from database import init_db, create_first_weigh, get_rollup_summary
+
+def first_weigh(plate, goods):
+    return {"plate_number": plate, "goods_type": goods, "driver_name": "", "vendor": "", "customer": "", "quantity": "", "goods_origin": "", "goods_destination": "", "remake": "", "weight": 30000.0}
+
+def test_trucks_per_hour_is_hidden_for_goods_filter(tmp_path):
+    conn = init_db(str(tmp_path / "weighing_system.db")); today = date.today().isoformat()
+    try:
+        for plate, goods in (("BK 1", "Sawit"), ("BK 2", "Sawit"), ("BK 3", "Pupuk")): assert create_first_weigh(conn, first_weigh(plate, goods))
+        overall = get_rollup_summary(conn, today, today)
+        assert overall["trucks"] == 3 and overall["trucks_per_hour"] == 3.0 and overall["peak_hour_trucks"] == 3
+        filtered = get_rollup_summary(conn, today, today, "Sawit")
+        assert filtered["trucks"] == 2 and filtered["trucks_per_hour"] is None and filtered["peak_hour_trucks"] is None
+    finally: conn.close()
@@ -0,0 +1,43 @@
+# Paging ranked (pencarian FTS): offset halaman berikutnya tetap benar setelah apply_changes menghapus baris
+import os
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+from PySide6.QtCore import QCoreApplication, QModelIndex
+from database import TransactionChanges
+from transaction_table_model import TransactionTableModel
+
+APP = QCoreApplication.instance() or QCoreApplication([])
+
+def transaction(number):
+    return {"id": number, "transaction_id": f"W{number:04d}", "weigh_date": "2026-10-18", "first_weigh_timestamp": f"2026-10-18 08:{number % 60:02d}:00", "plate_number": "BK 1",
+            "goods_type": "Sawit", "goods_origin": "", "goods_destination": "", "status": "COMPLETED", "first_weigh_kg": 30000.0, "second_weigh_kg": 10000.0,
+            "net_weigh_kg": 20000.0, "quantity": "", "remake": ""}
+
+def test_ranked_paging_does_not_skip_rows_after_remove():
+    results = [transaction(n) for n in range(1, 8)]  # Urutan skor pencarian di DB
+    model = TransactionTableModel(["ID"] * 12); model.PAGE_SIZE = 3
+    model.set_source(lambda offset, limit, callback: callback(results[offset:offset + limit]), ranked=True)
+    assert [model.transaction_id_at(row) for row in range(model.rowCount())] == ["W0001", "W0002", "W0003"]
+    del results[1]; model.apply_changes(TransactionChanges([], ["W0002"]))
+    while model.canFetchMore(QModelIndex()): model.fetchMore(QModelIndex())
+    assert [model.transaction_id_at(row) for row in range(model.rowCount())] == [t["transaction_id"] for t in results]
+
+def test_ranked_paging_keeps_all_rows_after_insert():
+    results = [transaction(n) for n in range(1, 8)]
+    model = TransactionTableModel(["ID"] * 12); model.PAGE_SIZE = 3
+    model.set_source(lambda offset, limit, callback: callback(results[offset:offset + limit]), ranked=True)
+    new = transaction(50); results.insert(1, new); model.apply_changes(TransactionChanges([new], []))
+    while model.canFetchMore(QModelIndex()): model.fetchMore(QModelIndex())
+    shown = [model.transaction_id_at(row) for row in range(model.rowCount())]
+    assert sorted(shown) == sorted(t["transaction_id"] for t in results) and shown[0] == "W0050"
+
+def test_ranked_paging_offset_ignores_removed_inserted_row():
+    results = [transaction(n) for n in range(1, 8)]; offsets = []
+    def fetch_page(offset, limit, callback): offsets.append(offset); callback(results[offset:offset + limit])
+    model = TransactionTableModel(["ID"] * 12); model.PAGE_SIZE = 3
+    model.set_source(fetch_page, ranked=True)
+    new = transaction(50); results.insert(1, new); model.apply_changes(TransactionChanges([new], []))
+    results.remove(new); model.apply_changes(TransactionChanges([], ["W0050"]))
+    while model.canFetchMore(QModelIndex()): model.fetchMore(QModelIndex())
+    assert offsets == [0, 3, 6]
+    assert [model.transaction_id_at(row) for row in range(model.rowCount())] == [t["transaction_id"] for t in results]
@@ -0,0 +1,73 @@
+# File: transaction_cache.py (Cache LRU baris transaksi per transaction_id, tanpa Qt)
+#
+# Diisi otomatis oleh DatabaseService dari hasil query daftar (history, report, pencarian) dan change feed,
+# jadi klik baris, review dan cetak ulang slip tidak perlu ke database lagi. Tetap koheren:
+#   - create_first_weigh / complete_second_weigh / delete_transaction_by_id: entri dibuang setelah commit, dan
+#     hasil timbang kedua langsung ditulis ulang ke cache (write-through) untuk slip yang biasanya dicetak sesudahnya
+#   - perubahan dari stasiun lain datang lewat read_changes (change feed): baris baru menimpa, yang dihapus dibuang
+#   - hasil query yang dimulai sebelum sebuah penulisan selesai tidak dimasukkan (bisa saja sudah basi)
+# Baris sqlite3.Row tidak bisa diubah, jadi aman dipakai bersama antar thread.
+
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import database
+
+DEFAULT_CACHE_SIZE = 2000
+# Penulisan yang mengubah baris transaksi: fungsi -> posisi argumen transaction_id (None = baris baru)
+TRANSACTION_WRITES = {database.create_first_weigh: None, database.complete_second_weigh: 0, database.delete_transaction_by_id: 0}
+WRITE_THROUGH = (database.complete_second_weigh,)
+
+class TransactionCache:
+    def __init__(self, max_size=DEFAULT_CACHE_SIZE):
+        self.max_size = max_size; self._rows = OrderedDict(); self._lock = threading.Lock(); self._generation = 0
+        self.hits = 0; self.misses = 0; self.evictions = 0
+
+    def get(self, transaction_id):
+        with self._lock:
+            row = self._rows.get(transaction_id)
+            if row is None: self.misses += 1; return None
+            self._rows.move_to_end(transaction_id); self.hits += 1; return row
+
+    def begin(self):
+        # Token untuk remember(): diambil sebelum query dijalankan
+        return self._generation
+
+    def remember(self, result, token=None):
+        # Ambil baris transaksi dari hasil fungsi database apa pun: satu Row, list Row, atau (seq, TransactionChanges)
+        if isinstance(result, tuple) and len(result) == 2 and isinstance(result[1], database.TransactionChanges):
+            changes = result[1]
+            with self._lock:
+                for transaction_id in changes.deleted: self._rows.pop(transaction_id, None)
+            self._put(changes.upserted, token); return
+        if isinstance(result, sqlite3.Row): self._put([result], token)
+        elif isinstance(result, list) and result and isinstance(result[0], sqlite3.Row): self._put(result, token)
+
+    def _put(self, rows, token):
+        if not rows or "transaction_id" not in rows[0].keys(): return
+        with self._lock:
+            if token is not None and token != self._generation: return  # Ada penulisan selama query berjalan
+            for row in rows:
+                self._rows[row["transaction_id"]] = row; self._rows.move_to_end(row["transaction_id"])
+            while len(self._rows) > self.max_size: self._rows.popitem(last=False); self.evictions += 1
+
+    def written(self, func, args):
+        # Dipanggil setelah commit; mengembalikan transaction_id yang perlu dibaca ulang untuk write-through (atau None)
+        if func not in TRANSACTION_WRITES: return None
+        position = TRANSACTION_WRITES[func]; transaction_id = args[position] if position is not None and len(args) > position else None
+        with self._lock:
+            self._generation += 1
+            if transaction_id is not None: self._rows.pop(transaction_id, None)
+        return transaction_id if func in WRITE_THROUGH else None
+
+    def invalidate(self, transaction_id=None):
+        with self._lock:
+            self._generation += 1
+            if transaction_id is None: self._rows.clear()
+            else: self._rows.pop(transaction_id, None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"size": len(self._rows), "max_size": self.max_size, "hits": self.hits, "misses": self.misses, "evictions": self.evictions, "hit_rate": self.hits / lookups if lookups else 0.0}
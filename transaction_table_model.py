@@ -0,0 +1,161 @@
+# File: transaction_table_model.py (Model tabel transaksi bersama untuk Today's History & Report)
+
+import time
+
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PySide6.QtGui import QColor, QBrush, QFont, QPalette
+from PySide6.QtWidgets import QStyledItemDelegate
+
+from metrics import METRICS
+
+STATUS_COLUMN = 6
+WEIGHT_COLUMNS = (7, 8, 9)
+
+# Brush dibuat sekali saja, bukan per sel
+_BRUSH_DEFAULT = QBrush(QColor("#E2E8F0"))
+_ROW_BACKGROUNDS = (QBrush(QColor("#2D3748")), QBrush(QColor("#293241")))
+_STATUS_BRUSHES = {'PENDING': QBrush(QColor("#F6E05E")), 'COMPLETED': QBrush(QColor("#48BB78"))}
+
+# Format tanggal dengan slicing string 'YYYY-MM-DD HH:MM:SS' (jauh lebih murah daripada strptime per baris)
+def format_short_date(ts): return f"{ts[8:10]}/{ts[5:7]} {ts[11:16]}" if ts else "N/A"
+def format_report_date(ts): return f"{ts[8:10]}/{ts[5:7]}/{ts[2:4]} {ts[11:16]}" if ts else "N/A"
+
+def row_key(transaction):
+    # Kunci keyset, sama dengan urutan ORDER BY di get_transactions_page
+    return (transaction['weigh_date'], transaction['first_weigh_timestamp'], transaction['id'])
+
+def format_row(transaction, date_formatter):
+    first_w = transaction['first_weigh_kg'] or 0; second_w = transaction['second_weigh_kg'] or 0
+    gross = max(first_w, second_w); tare = min(first_w, second_w) if second_w > 0 else 0
+    return (transaction['transaction_id'], date_formatter(transaction['first_weigh_timestamp']), transaction['plate_number'] or '', transaction['goods_type'] or '', transaction['goods_origin'] or '', transaction['goods_destination'] or '', transaction['status'],
+            f"{gross:,.2f}", f"{tare:,.2f}", f"{transaction['net_weigh_kg'] or 0:,.2f}", transaction['quantity'] or '-', transaction['remake'] or '-')
+
+class TransactionTableModel(QAbstractTableModel):
+    PAGE_SIZE = 200
+
+    def __init__(self, headers, date_formatter=format_short_date, font=None, parent=None, name="transactions"):
+        super().__init__(parent)
+        self._headers = headers; self._date_formatter = date_formatter; self._font = font
+        # refresh: dari set_source sampai halaman pertama tampil (antre + query + isi tabel); update: waktu GUI per halaman/perubahan
+        self._refresh_seconds = METRICS.histogram("table_refresh_seconds", "Time from a table refresh request until its first page is shown", table=name)
+        self._page_seconds = METRICS.histogram("table_update_seconds", "GUI time spent formatting and inserting rows into a table", table=name, update="page")
+        self._changes_seconds = METRICS.histogram("table_update_seconds", "GUI time spent formatting and inserting rows into a table", table=name, update="changes")
+        self._refresh_started = None
+        self._rows = []; self._keys = []; self._fetch_page = None; self._accepts = None; self._exhausted = True; self._positions = None
+        self._fetching = False; self._generation = 0; self._ranked = False; self._fetched = 0; self._inserted = set()
+        self._alignments = [int(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter) if col in WEIGHT_COLUMNS else int(Qt.AlignmentFlag.AlignCenter) if col == STATUS_COLUMN else int(Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter) for col in range(len(headers))]
+
+    def set_source(self, fetch_page, accepts=None, ranked=False):
+        # fetch_page(after_key, limit, callback) meminta satu halaman secara asinkron (mis. lewat DatabaseService.read);
+        # hanya halaman pertama yang diambil sekarang, sisanya saat di-scroll.
+        # accepts(transaction) -> bool dipakai apply_changes untuk menilai apakah baris baru masuk filter tabel ini.
+        # ranked=True: urutan ditentukan DB (mis. skor pencarian), halaman diminta dengan offset, bukan kunci keyset.
+        self.beginResetModel()
+        self._rows = []; self._keys = []; self._fetch_page = fetch_page; self._accepts = accepts; self._exhausted = fetch_page is None; self._positions = None
+        self._fetching = False; self._generation += 1; self._ranked = ranked; self._fetched = 0; self._inserted = set(); self._refresh_started = time.perf_counter()
+        self.endResetModel()
+        if self.canFetchMore(QModelIndex()): self.fetchMore(QModelIndex())
+
+    def rowCount(self, parent=QModelIndex()): return 0 if parent.isValid() else len(self._rows)
+    def columnCount(self, parent=QModelIndex()): return 0 if parent.isValid() else len(self._headers)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid(): return None
+        if role == Qt.ItemDataRole.DisplayRole: return self._rows[index.row()][index.column()]
+        if role == Qt.ItemDataRole.TextAlignmentRole: return self._alignments[index.column()]
+        if role == Qt.ItemDataRole.BackgroundRole: return _ROW_BACKGROUNDS[index.row() % 2]
+        if role == Qt.ItemDataRole.ForegroundRole: return _BRUSH_DEFAULT
+        if role == Qt.ItemDataRole.FontRole: return self._font
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal: return self._headers[section]
+        return None
+
+    def canFetchMore(self, parent): return not parent.isValid() and not self._exhausted and not self._fetching
+
+    def fetchMore(self, parent):
+        if not self.canFetchMore(parent): return
+        self._fetching = True; generation = self._generation
+        position = self._fetched if self._ranked else self._keys[-1] if self._keys else None
+        self._fetch_page(position, self.PAGE_SIZE, lambda transactions: self._append_page(generation, transactions))
+
+    def _append_page(self, generation, transactions):
+        if generation != self._generation: return  # Hasil untuk filter lama
+        with self._page_seconds.time(): self._insert_page(transactions)
+        if self._refresh_started is not None: self._refresh_seconds.observe(time.perf_counter() - self._refresh_started); self._refresh_started = None
+
+    def _insert_page(self, transactions):
+        self._fetching = False; self._fetched += len(transactions)
+        if len(transactions) < self.PAGE_SIZE: self._exhausted = True
+        # Baris yang sudah masuk lewat apply_changes selama halaman ini diambil tidak ditambahkan lagi; mulai sekarang
+        # baris itu sudah terhitung di _fetched
+        self._inserted.difference_update(t['transaction_id'] for t in transactions)
+        transactions = [t for t in transactions if self._position(t['transaction_id']) is None]
+        if not transactions: return
+        first = len(self._rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(transactions) - 1)
+        for transaction in transactions:
+            self._rows.append(format_row(transaction, self._date_formatter)); self._keys.append(row_key(transaction))
+        self._positions = None
+        self.endInsertRows()
+
+    def apply_changes(self, changes):
+        # Terapkan TransactionChanges dari ChangeFeed: hanya baris yang berubah yang disentuh
+        if self._fetch_page is None: return
+        with self._changes_seconds.time(): self._apply_changes(changes)
+
+    def _apply_changes(self, changes):
+        for transaction_id in changes.deleted: self._remove_row(transaction_id)
+        for transaction in changes.upserted:
+            row = self._position(transaction['transaction_id']); accepted = self._accepts is None or self._accepts(transaction)
+            if row is not None and accepted and (self._ranked or self._keys[row] == row_key(transaction)):
+                self._rows[row] = format_row(transaction, self._date_formatter)
+                self.dataChanged.emit(self.index(row, 0), self.index(row, self.columnCount() - 1)); continue
+            if row is not None: self._remove_row(transaction['transaction_id'])
+            if accepted: self._insert_row(transaction)
+
+    def _position(self, transaction_id):
+        if self._positions is None: self._positions = {values[0]: row for row, values in enumerate(self._rows)}
+        return self._positions.get(transaction_id)
+
+    def _remove_row(self, transaction_id):
+        row = self._position(transaction_id)
+        if row is None: return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._rows[row]; del self._keys[row]; self._positions = None
+        # Mode ranked: baris dari _insert_page hilang dari hasil DB, jadi offset halaman berikutnya ikut mundur; baris
+        # dari _insert_row tidak pernah dihitung di _fetched
+        if self._ranked and transaction_id in self._inserted: self._inserted.discard(transaction_id)
+        elif self._ranked: self._fetched = max(0, self._fetched - 1)
+        self.endRemoveRows()
+
+    def _insert_row(self, transaction):
+        # Binary search pada kunci yang terurut menurun (terbaru di atas); mode ranked: skor baris baru tidak
+        # diketahui di sini, jadi transaksi baru yang cocok selalu tampil paling atas. Offset (_fetched) sengaja tidak
+        # dinaikkan: jika DB menaruhnya sesudah offset, menaikkan offset akan melewatkan satu baris; jika sebelum offset,
+        # halaman berikutnya hanya mengulang satu baris yang sudah tampil dan dibuang oleh _insert_page
+        key = row_key(transaction); low, high = 0, 0 if self._ranked else len(self._keys)
+        while low < high:
+            mid = (low + high) // 2
+            if self._keys[mid] > key: low = mid + 1
+            else: high = mid
+        # Posisi setelah baris terakhir yang sudah dimuat akan ikut terambil lewat fetchMore nanti
+        if low == len(self._keys) and not self._exhausted: return
+        self.beginInsertRows(QModelIndex(), low, low)
+        self._rows.insert(low, format_row(transaction, self._date_formatter)); self._keys.insert(low, key); self._positions = None
+        if self._ranked: self._inserted.add(transaction['transaction_id'])
+        self.endInsertRows()
+
+    def transaction_id_at(self, row): return self._rows[row][0] if 0 <= row < len(self._rows) else None
+
+class StatusColorDelegate(QStyledItemDelegate):
+    # Pewarnaan kolom Status dilakukan saat paint, bukan disimpan per item
+    def __init__(self, parent=None):
+        super().__init__(parent); self._bold_font = QFont("Arial", 9, QFont.Weight.Bold)
+
+    def initStyleOption(self, option, index):
+        super().initStyleOption(option, index)
+        brush = _STATUS_BRUSHES.get(index.data())
+        if brush is not None:
+            option.palette.setBrush(QPalette.ColorRole.Text, brush); option.font = self._bold_font
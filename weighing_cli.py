@@ -0,0 +1,187 @@
+# File: weighing_cli.py (Perintah pemeliharaan database dari terminal, tanpa membuka GUI)
+#
+# Contoh:
+#   python weighing_cli.py rebuild-rollups
+#   python weighing_cli.py --db D:\data\weighing_system.db rebuild-rollups
+#   python weighing_cli.py export --from 2024-01-01 --to 2024-12-31 --status COMPLETED -o transaksi_2024.csv
+#   python weighing_cli.py export --format parquet --goods BILLET -o billet.parquet   (butuh pyarrow)
+#   python weighing_cli.py trace W2510180001 --before 120 --after 30   (rekaman berat di sekitar waktu timbang)
+#   python weighing_cli.py archive --older-than-days 365 --vacuum   (transaksi lama ke archive/weighing_archive_<tahun>.db)
+#   python weighing_cli.py import tiket_lama.csv --map plate_number="No Polisi" --rejects ditolak.csv   (bisa dilanjutkan)
+#
+# Tidak mengimpor Qt sama sekali, jadi bisa dijadwalkan (Task Scheduler) di PC timbangan tanpa sesi desktop.
+
+import argparse
+import contextlib
+import csv
+import json
+import os
+import sys
+import time
+from datetime import date, datetime
+
+from database import DATABASE_FILE, ARCHIVE_AFTER_DAYS, init_db, rebuild_rollups, iter_transaction_batches, get_transaction_by_id, archive_transactions, archive_path, get_archive_summary
+from weight_recorder import DEFAULT_DIRECTORY, get_transaction_trace
+import bulk_import
+
+EXPORT_FORMATS = ("csv", "jsonl", "parquet")
+PROGRESS_INTERVAL_SECONDS = 2.0
+
+def cmd_rebuild_rollups(conn, args):
+    started = time.perf_counter(); rows = rebuild_rollups(conn)
+    print(f"Rollup rebuilt: {rows} daily rollup rows in {time.perf_counter() - started:.2f} s.")
+    return 0
+
+class _ExportProgress:
+    def __init__(self): self.rows = 0; self.started = time.perf_counter(); self._last_report = self.started
+
+    def add(self, count):
+        self.rows += count; now = time.perf_counter()
+        if now - self._last_report >= PROGRESS_INTERVAL_SECONDS: self._last_report = now; self.report("...")
+
+    def report(self, prefix="Exported"):
+        elapsed = time.perf_counter() - self.started
+        print(f"{prefix} {self.rows:,} rows in {elapsed:.1f} s ({self.rows / elapsed if elapsed > 0 else 0:,.0f} rows/s)", file=sys.stderr)
+
+def _write_csv(output, batches, progress):
+    writer = None
+    for rows in batches:
+        if writer is None: writer = csv.writer(output); writer.writerow(rows[0].keys())
+        writer.writerows(rows); progress.add(len(rows))
+
+def _write_jsonl(output, batches, progress):
+    for rows in batches:
+        output.writelines(json.dumps(dict(row), ensure_ascii=False) + "\n" for row in rows); progress.add(len(rows))
+
+def _write_parquet(conn, path, batches, progress):
+    try: import pyarrow as pa, pyarrow.parquet as pq
+    except ImportError: raise SystemExit("Parquet export needs pyarrow (pip install pyarrow).")
+    # Skema dari tipe kolom SQLite, bukan ditebak dari batch pertama (kolom yang semuanya NULL akan bertipe null)
+    types = {"INTEGER": pa.int64(), "REAL": pa.float64()}
+    schema = pa.schema([(column['name'], types.get(column['type'].upper(), pa.string())) for column in conn.execute("PRAGMA table_info(transactions)")])
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        for rows in batches:
+            # Satu row group per batch
+            columns = rows[0].keys()
+            writer.write_table(pa.table({name: [row[i] for row in rows] for i, name in enumerate(columns)}, schema=schema)); progress.add(len(rows))
+
+def cmd_export(conn, args):
+    batches = iter_transaction_batches(conn, args.start_date, args.end_date, args.goods, args.status, args.batch_size)
+    progress = _ExportProgress()
+    if args.format == "parquet":
+        if args.output == "-": raise SystemExit("Parquet export needs an output file (-o).")
+        _write_parquet(conn, args.output, batches, progress)
+    else:
+        write = _write_csv if args.format == "csv" else _write_jsonl
+        if args.output == "-": write(sys.stdout, batches, progress)
+        else:
+            with open(args.output, "w", newline="", encoding="utf-8") as output: write(output, batches, progress)
+    progress.report(); return 0
+
+def cmd_trace(conn, args):
+    transaction = get_transaction_by_id(conn, args.transaction_id)
+    if transaction is None: print(f"Transaction {args.transaction_id} not found.", file=sys.stderr); return 1
+    traces = get_transaction_trace(transaction, args.before, args.after, args.recordings)
+    writer = csv.writer(sys.stdout); writer.writerow(["weigh", "time", "weight", "stable", "indicator_stable"])
+    for key, samples in traces.items():
+        if not samples: print(f"No recorded readings around the {key} weigh.", file=sys.stderr)
+        for sample in samples:
+            writer.writerow([key, datetime.fromtimestamp(sample.timestamp).isoformat(sep=" ", timespec="milliseconds"), f"{sample.weight:.2f}", int(sample.stable), "" if sample.indicator_stable is None else int(sample.indicator_stable)])
+    return 0
+
+def cmd_archive(conn, args):
+    if args.list:
+        for year, first_day, last_day, rows in get_archive_summary(conn): print(f"{year}: {rows:,} transactions ({first_day} .. {last_day}) in {archive_path(conn, year)}")
+        return 0
+    started = time.perf_counter(); moved = archive_transactions(conn, args.older_than_days, args.dry_run)
+    if not moved: print(f"No COMPLETED transactions older than {args.older_than_days} days."); return 0
+    for year, rows in moved: print(f"{year}: {rows:,} transactions {'would be archived' if args.dry_run else 'archived to ' + archive_path(conn, year)}")
+    if args.vacuum and not args.dry_run:
+        # Halaman bekas baris yang dipindah dikembalikan ke OS (butuh akses eksklusif sebentar; jalankan di luar jam operasi)
+        conn.execute("VACUUM")
+    print(f"Done in {time.perf_counter() - started:.2f} s.")
+    return 0
+
+def cmd_import(conn, args):
+    mapping = {}
+    if args.mapping:
+        with open(args.mapping, encoding="utf-8") as f: mapping.update(json.load(f))
+    for item in args.map:
+        target, separator, source = item.partition("=")
+        if not separator: raise SystemExit(f"--map expects column=\"Source Header\", got '{item}'.")
+        mapping[target.strip()] = source.strip()
+    formats = (args.timestamp_format,) if args.timestamp_format else bulk_import.TIMESTAMP_FORMATS
+    rejects_file = rejects_writer = None
+    if args.rejects:
+        new_file = not os.path.exists(args.rejects); rejects_file = open(args.rejects, "a", newline="", encoding="utf-8"); rejects_writer = csv.writer(rejects_file)
+        if new_file: rejects_writer.writerow(["line", "reason", "values"])
+    shown = []
+    def on_reject(line, values, reason):
+        if rejects_writer is not None: rejects_writer.writerow([line, reason, *["" if value is None else value for value in values]])
+        if len(shown) < 10: shown.append(line); print(f"Line {line} rejected: {reason}", file=sys.stderr)
+    last_report = [time.perf_counter()]
+    def on_progress(stats):
+        if time.perf_counter() - last_report[0] < PROGRESS_INTERVAL_SECONDS: return
+        last_report[0] = time.perf_counter(); print(f"... {stats.rows:,} rows, {stats.inserted:,} imported ({stats.rate:,.0f} rows/s)", file=sys.stderr)
+    try:
+        stats = bulk_import.import_file(conn, args.file, mapping, args.batch_size, args.restart, args.sheet, args.delimiter, args.encoding, args.decimal_comma, formats, on_progress, on_reject)
+    except (ValueError, RuntimeError) as e: print(f"Import failed: {e}", file=sys.stderr); return 1
+    finally:
+        if rejects_file is not None: rejects_file.close()
+    if stats is None: print(f"{args.file} was already imported; use --restart to import it again (existing IDs are skipped)."); return 0
+    if stats.resumed_from: print(f"Resumed after row {stats.resumed_from:,}.")
+    print(f"Imported {stats.inserted:,} transactions from {stats.rows - stats.resumed_from:,} rows in {stats.elapsed:.1f} s ({stats.rate:,.0f} rows/s); "
+          f"{stats.duplicates:,} duplicate IDs skipped, {stats.rejected:,} rows rejected{' (see ' + args.rejects + ')' if args.rejects and stats.rejected else ''}.")
+    return 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Weighing System maintenance commands")
+    parser.add_argument("--db", default=DATABASE_FILE, help=f"database file (default: {DATABASE_FILE})")
+    commands = parser.add_subparsers(dest="command", required=True)
+    rebuild = commands.add_parser("rebuild-rollups", help="recompute daily/hourly rollup tables from all transactions")
+    rebuild.set_defaults(handler=cmd_rebuild_rollups)
+    export = commands.add_parser("export", help="stream transactions to CSV, JSONL or Parquet with constant memory")
+    export.add_argument("--from", dest="start_date", default="0000-01-01", help="first weigh date, YYYY-MM-DD (default: all)")
+    export.add_argument("--to", dest="end_date", default=date.max.isoformat(), help="last weigh date, YYYY-MM-DD (default: all)")
+    export.add_argument("--goods", default="", help="goods type contains this text")
+    export.add_argument("--status", default="", type=str.upper, choices=("PENDING", "COMPLETED"), help="only PENDING or COMPLETED transactions")
+    export.add_argument("--format", default="csv", choices=EXPORT_FORMATS)
+    export.add_argument("-o", "--output", default="-", help="output file, '-' for stdout (csv/jsonl only)")
+    export.add_argument("--batch-size", type=int, default=5000, help="rows fetched per batch (fetchmany)")
+    export.set_defaults(handler=cmd_export)
+    trace = commands.add_parser("trace", help="print recorded raw readings (CSV) around a transaction's first and second weigh")
+    trace.add_argument("transaction_id")
+    trace.add_argument("--before", type=float, default=60.0, help="seconds before the weigh timestamp")
+    trace.add_argument("--after", type=float, default=60.0, help="seconds after the weigh timestamp")
+    trace.add_argument("--recordings", default=DEFAULT_DIRECTORY, help=f"recording segment directory (default: {DEFAULT_DIRECTORY})")
+    trace.set_defaults(handler=cmd_trace)
+    archive = commands.add_parser("archive", help="move old COMPLETED transactions to yearly archive databases (still searchable in reports)")
+    archive.add_argument("--older-than-days", type=int, default=ARCHIVE_AFTER_DAYS, help=f"archive transactions weighed more than this many days ago (default: {ARCHIVE_AFTER_DAYS})")
+    archive.add_argument("--dry-run", action="store_true", help="only show how many transactions per year would be archived")
+    archive.add_argument("--vacuum", action="store_true", help="shrink the main database file afterwards")
+    archive.add_argument("--list", action="store_true", help="list existing archive files")
+    archive.set_defaults(handler=cmd_archive)
+    import_ = commands.add_parser("import", help="bulk import tickets from legacy CSV/Excel exports, keeping original IDs and timestamps (resumable)")
+    import_.add_argument("file", help="CSV file or Excel workbook (.xlsx, needs openpyxl)")
+    import_.add_argument("--mapping", help="JSON file {\"db_column\": \"Source Header\"}")
+    import_.add_argument("--map", action="append", default=[], metavar="COLUMN=HEADER", help="map one database column to a source header (repeatable)")
+    import_.add_argument("--sheet", help="Excel sheet name (default: active sheet)")
+    import_.add_argument("--delimiter", help="CSV delimiter (default: detected)")
+    import_.add_argument("--encoding", default="utf-8-sig", help="CSV encoding (default: utf-8-sig; legacy Windows exports are often cp1252)")
+    import_.add_argument("--decimal-comma", action="store_true", help="numbers use ',' as decimal separator (12.345,50)")
+    import_.add_argument("--timestamp-format", help="strptime format of the date/time columns (default: common formats, day before month)")
+    import_.add_argument("--batch-size", type=int, default=bulk_import.DEFAULT_BATCH_SIZE, help="rows per transaction (executemany)")
+    import_.add_argument("--rejects", help="append rejected rows with line number and reason to this CSV file")
+    import_.add_argument("--restart", action="store_true", help="start from the first row even if this file was (partly) imported")
+    import_.set_defaults(handler=cmd_import)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    # Pesan init_db/migrasi ke stderr agar stdout bersih untuk 'export -o -'
+    with contextlib.redirect_stdout(sys.stderr): conn = init_db(args.db)
+    try: return args.handler(conn, args)
+    finally: conn.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
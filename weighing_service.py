@@ -0,0 +1,309 @@
+# File: weighing_service.py (Layanan headless: baca timbangan + database + API JSON/WebSocket lokal, tanpa Qt)
+#
+# Contoh:
+#   python weighing_service.py --simulator                     (uji di localhost tanpa timbangan fisik)
+#   python weighing_service.py --host 0.0.0.0 --port 8765 --token rahasia --db D:\data\weighing_system.db
+#
+# Port serial, deteksi stabil (acquisition.py) dan semua penulisan DB dipegang satu proses ini; PC kantor, layar
+# gerbang atau ERP cukup memakai API. Aplikasi GUI bisa menjadi klien berat live lewat "remote": "host:port"
+# di config.json (lihat main_app.TimbanganRemoteWorker).
+#
+# API (JSON; jika --token diisi, kirim header "Authorization: Bearer <token>" atau parameter ?token=):
+#   GET  /api/health
+#   GET  /api/scales                              berat terakhir setiap timbangan
+#   GET  /api/transactions?status=PENDING&from=YYYY-MM-DD&to=YYYY-MM-DD&q=teks&limit=200&offset=0
+#   GET  /api/transactions/<transaction_id>
+#   GET  /api/pending/<plat nomor>                transaksi PENDING untuk plat tersebut (404 jika tidak ada)
+#   GET  /api/metrics                             snapshot metrik (metrics.py): pembacaan timbangan, lama query, dst.
+#   POST /api/first-weigh   {"plate_number", "goods_type", "goods_origin", "goods_destination", "driver_name", "quantity", "remake", "scale_id"}
+#   POST /api/second-weigh  {"plate_number", "deduction_kg", "remake", "scale_id"}
+#   WS   /ws?scale=<id>                           {"type": "weight", ...} tiap perubahan berat, {"type": "transactions", ...} tiap perubahan data
+# Berat untuk timbang pertama/kedua selalu diambil dari timbangan (harus stabil), tidak pernah dari klien.
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import struct
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import database
+from acquisition import create_scale_source
+from app_config import CONFIG_FILE, load_config, load_scales
+from metrics import METRICS, create_dumper
+
+DEFAULT_HOST = "127.0.0.1"  # Hanya lokal; pakai --host 0.0.0.0 (dan --token) untuk membuka ke jaringan
+DEFAULT_PORT = 8765
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+CHANGE_POLL_SECONDS = 1.0
+CLIENT_QUEUE_SIZE = 256
+MAX_BODY_BYTES = 64 * 1024
+MAX_PAGE_SIZE = 1000
+SOURCE_STOP_TIMEOUT = 2.0
+STATUS_TEXT = {200: "OK", 201: "Created", 204: "No Content", 400: "Bad Request", 401: "Unauthorized", 404: "Not Found", 405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large", 500: "Internal Server Error"}
+TEXT_FIELDS = ("goods_type", "goods_origin", "goods_destination", "driver_name", "vendor", "customer", "quantity", "remake")
+
+class ApiError(Exception):
+    def __init__(self, status, message): super().__init__(message); self.status = status
+
+def _ws_frame(opcode, payload):
+    length = len(payload)
+    if length < 126: header = struct.pack("!BB", 0x80 | opcode, length)
+    elif length < 1 << 16: header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+    else: header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+    return header + payload
+
+async def _read_ws_frame(reader):
+    # Frame dari klien selalu di-mask (RFC 6455); fragmentasi tidak perlu didukung karena isi pesan klien diabaikan
+    first, second = await reader.readexactly(2); length = second & 0x7F
+    if length == 126: length = struct.unpack("!H", await reader.readexactly(2))[0]
+    elif length == 127: length = struct.unpack("!Q", await reader.readexactly(8))[0]
+    if length > MAX_BODY_BYTES: raise ConnectionError("WebSocket frame too large")
+    mask = await reader.readexactly(4) if second & 0x80 else None
+    payload = await reader.readexactly(length)
+    if mask: payload = bytes(byte ^ mask[i % 4] for i, byte in enumerate(payload))
+    return first & 0x0F, payload
+
+def _second_weigh_values(pending, current_weight, deduction, remake):
+    # Sama dengan MainWindow.lanjutkan_input: net = |timbang pertama - timbang kedua| - potongan
+    final_net = abs((pending['first_weigh_kg'] or 0) - current_weight) - deduction
+    remake_info = f"(Deduction : {deduction:,.2f} KG.) {remake}".strip() if deduction > 0 else remake
+    return final_net, remake_info
+
+def _first_weigh(conn, data):
+    # Cek PENDING dan INSERT di satu pemanggilan thread DB, jadi dua permintaan bersamaan untuk plat yang sama tidak lolos dua-duanya
+    if database.find_pending_by_plate_number(conn, data['plate_number']) is not None: raise ApiError(409, f"{data['plate_number']} already has a pending transaction.")
+    if not database.create_first_weigh(conn, data): raise ApiError(500, "Failed to save data to database.")
+    return database.find_pending_by_plate_number(conn, data['plate_number'])
+
+def _second_weigh(conn, plate_number, current_weight, deduction, remake, scale_id):
+    pending = database.find_pending_by_plate_number(conn, plate_number)
+    if pending is None: raise ApiError(404, f"No pending transaction for {plate_number}.")
+    final_net, remake_info = _second_weigh_values(pending, current_weight, deduction, remake or pending['remake'] or "")
+    if not database.complete_second_weigh(conn, pending['transaction_id'], current_weight, final_net, remake_info, scale_id=scale_id, deduction_kg=deduction): raise ApiError(409, "Failed to complete second weigh.")
+    return database.get_transaction_by_id(conn, pending['transaction_id'])
+
+class WeighingService:
+    def __init__(self, db_path=None, scales=(), token=None):
+        self.db_path = db_path or database.DATABASE_FILE; self.scales = {scale["id"]: scale for scale in scales}; self.token = token
+        self.states = {}; self.clients = set(); self.loop = None; self._sources = []; self._tasks = []; self._conn = None
+        # Satu thread DB: semua baca/tulis berurutan di koneksi yang sama (seperti writer DatabaseService)
+        self._db = ThreadPoolExecutor(max_workers=1, thread_name_prefix="service-db")
+        METRICS.gauge("service_websocket_clients", "Connected WebSocket clients", function=lambda: len(self.clients))
+
+    async def db(self, func, *args, **kwargs):
+        histogram = METRICS.histogram("db_query_seconds", "Time spent running a database.py function", query=func.__name__, connection="service-db")
+        def run():
+            with histogram.time(): return func(self._conn, *args, **kwargs)
+        return await self.loop.run_in_executor(self._db, run)
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self.loop = asyncio.get_running_loop()
+        self._conn = await self.loop.run_in_executor(self._db, database.init_db, self.db_path)
+        for scale_id, scale in self.scales.items():
+            if scale.get("remote"): print(f"Timbangan {scale_id} memakai 'remote', dilewati oleh layanan."); continue
+            source = create_scale_source(scale, lambda state, scale_id=scale_id: self._from_thread(self._on_state, scale_id, state), lambda message, scale_id=scale_id: self._from_thread(self._on_error, scale_id, message))
+            thread = threading.Thread(target=source.run, name=f"scale-{scale_id}", daemon=True); thread.start(); self._sources.append((source, thread))
+        self._tasks.append(asyncio.create_task(self._poll_changes()))
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+    async def stop(self):
+        for source, _ in self._sources: source.stop()
+        # Tunggu sebentar agar thread timbangan menutup port serial dan segmen live feed (live_weight_shm.py)
+        for _, thread in self._sources: await self.loop.run_in_executor(None, thread.join, SOURCE_STOP_TIMEOUT)
+        for task in self._tasks: task.cancel()
+        if self._conn is not None: await self.loop.run_in_executor(self._db, self._conn.close); self._conn = None
+        self._db.shutdown(wait=False)
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        server = await self.start(host, port)
+        print(f"Weighing service listening on http://{host}:{port} ({len(self._sources)} scale(s)).")
+        try:
+            async with server: await server.serve_forever()
+        finally: await self.stop()
+
+    # --- Berat dari thread timbangan ---
+    def _from_thread(self, callback, *args):
+        try: self.loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError: pass  # Event loop sudah ditutup saat layanan berhenti
+
+    def _on_state(self, scale_id, state):
+        self.states[scale_id] = {"scale_id": scale_id, "name": self.scales[scale_id]["name"], "weight": state.weight, "stable": state.stable, "timestamp": time.time(), "error": None}
+        self.broadcast({"type": "weight", **self.states[scale_id]})
+
+    def _on_error(self, scale_id, message):
+        print(f"[{scale_id}] {message}")
+        state = self.states.setdefault(scale_id, {"scale_id": scale_id, "name": self.scales[scale_id]["name"], "weight": None, "stable": False, "timestamp": time.time(), "error": None})
+        state.update(stable=False, error=message); self.broadcast({"type": "error", "scale_id": scale_id, "message": message})
+
+    def broadcast(self, message):
+        for queue, scale_filter in list(self.clients):
+            if scale_filter and message.get("scale_id", scale_filter) != scale_filter: continue
+            # Klien lambat tidak boleh menahan yang lain: pesan tertua dibuang
+            if queue.full(): queue.get_nowait()
+            queue.put_nowait(message)
+
+    async def _poll_changes(self):
+        # Perubahan dari layanan ini maupun aplikasi lain di file DB yang sama (change log database.py)
+        last_seq = await self.db(database.get_change_cursor)
+        while True:
+            await asyncio.sleep(CHANGE_POLL_SECONDS)
+            if not self.clients: last_seq = await self.db(database.get_change_cursor); continue
+            try: last_seq, changes = await self.db(database.read_changes, last_seq)
+            except Exception as e: print(f"Error polling changes: {e}"); continue
+            if changes: self.broadcast({"type": "transactions", "upserted": [dict(row) for row in changes.upserted], "deleted": changes.deleted})
+
+    # --- HTTP ---
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip(): break
+                try: method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                except ValueError: await self._send(writer, 400, {"error": "Malformed request line."}, False); break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""): break
+                    name, _, value = line.decode("latin-1").partition(":"); headers[name.strip().lower()] = value.strip()
+                url = urlsplit(target); query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+                if url.path == "/ws" and headers.get("upgrade", "").lower() == "websocket": await self.handle_websocket(reader, writer, headers, query); return
+                keep_alive = headers.get("connection", "").lower() != "close"
+                length = int(headers.get("content-length") or 0)
+                if length > MAX_BODY_BYTES: await self._send(writer, 413, {"error": "Request body too large."}, False); break
+                body = await reader.readexactly(length) if length else b""
+                try:
+                    if method == "OPTIONS": status, payload = 204, None  # Preflight CORS dari halaman web (mis. layar gerbang)
+                    else: self._check_token(headers, query); status, payload = await self.route(method, unquote(url.path), query, body)
+                except ApiError as e: status, payload = e.status, {"error": str(e)}
+                except Exception as e: print(f"Error handling {method} {url.path}: {e}"); status, payload = 500, {"error": "Internal server error."}
+                await self._send(writer, status, payload, keep_alive)
+                if not keep_alive: break
+        except (ConnectionError, asyncio.IncompleteReadError): pass
+        finally: writer.close()
+
+    async def _send(self, writer, status, payload, keep_alive):
+        body = b"" if payload is None else json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        headers = [f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}", "Content-Type: application/json; charset=utf-8", f"Content-Length: {len(body)}",
+                   "Access-Control-Allow-Origin: *", "Access-Control-Allow-Headers: Authorization, Content-Type", f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        writer.write(("\r\n".join(headers) + "\r\n\r\n").encode("latin-1") + body); await writer.drain()
+
+    def _check_token(self, headers, query):
+        if not self.token: return
+        supplied = query.get("token") or headers.get("authorization", "").removeprefix("Bearer ").strip()
+        if not hmac.compare_digest(supplied.encode(), self.token.encode()): raise ApiError(401, "Invalid or missing token.")
+
+    def _json_body(self, body):
+        try: data = json.loads(body or b"{}")
+        except ValueError: raise ApiError(400, "Body must be JSON.")
+        if not isinstance(data, dict): raise ApiError(400, "Body must be a JSON object.")
+        plate_number = str(data.get("plate_number") or "").strip()
+        if not plate_number: raise ApiError(400, "plate_number is required.")
+        return {**data, "plate_number": plate_number}
+
+    def _stable_weight(self, scale_id):
+        # Tanpa scale_id: timbangan pertama di config (sama dengan pilihan default di GUI)
+        scale_id = str(scale_id) if scale_id is not None else next(iter(self.scales), None)
+        if scale_id not in self.scales: raise ApiError(404, f"Unknown scale '{scale_id}'.")
+        state = self.states.get(scale_id)
+        if state is None or state["error"] or state["weight"] is None: raise ApiError(409, f"No reading from scale {scale_id}.")
+        if not state["stable"]: raise ApiError(409, "Weight is unstable. Please wait.")
+        return scale_id, state["weight"]
+
+    async def route(self, method, path, query, body):
+        parts = [part for part in path.split("/") if part]
+        if parts[:1] != ["api"]: raise ApiError(404, "Not found.")
+        resource = parts[1:]
+        if method == "GET":
+            if resource == ["health"]: return 200, {"status": "ok", "scales": len(self.scales), "clients": len(self.clients)}
+            if resource == ["metrics"]: return 200, METRICS.snapshot()
+            if resource == ["scales"]: return 200, [self.states.get(scale_id, {"scale_id": scale_id, "name": scale["name"], "weight": None, "stable": False, "timestamp": None, "error": None}) for scale_id, scale in self.scales.items()]
+            if resource == ["transactions"]: return 200, [dict(row) for row in await self._list_transactions(query)]
+            if len(resource) == 2 and resource[0] == "transactions":
+                row = await self.db(database.get_transaction_by_id, resource[1])
+                if row is None: raise ApiError(404, f"Transaction {resource[1]} not found.")
+                return 200, dict(row)
+            if len(resource) == 2 and resource[0] == "pending":
+                row = await self.db(database.find_pending_by_plate_number, resource[1].strip())
+                if row is None: raise ApiError(404, f"No pending transaction for {resource[1]}.")
+                return 200, dict(row)
+        elif method == "POST":
+            if resource == ["first-weigh"]:
+                data = self._json_body(body); scale_id, weight = self._stable_weight(data.get("scale_id"))
+                record = {field: str(data.get(field) or "").strip() for field in TEXT_FIELDS}
+                row = await self.db(_first_weigh, {**record, "plate_number": data["plate_number"], "weight": weight, "scale_id": scale_id})
+                return 201, dict(row)
+            if resource == ["second-weigh"]:
+                data = self._json_body(body); scale_id, weight = self._stable_weight(data.get("scale_id"))
+                try: deduction = float(data.get("deduction_kg") or 0)
+                except (TypeError, ValueError): raise ApiError(400, "deduction_kg must be a number.")
+                row = await self.db(_second_weigh, data["plate_number"], weight, deduction, str(data.get("remake") or "").strip(), scale_id)
+                return 200, dict(row)
+        else: raise ApiError(405, f"Method {method} not allowed.")
+        raise ApiError(404, "Not found.")
+
+    async def _list_transactions(self, query):
+        try: limit = min(int(query.get("limit", 200)), MAX_PAGE_SIZE); offset = max(int(query.get("offset", 0)), 0)
+        except ValueError: raise ApiError(400, "limit and offset must be integers.")
+        start_date = query.get("from", "0000-01-01"); end_date = query.get("to", "9999-12-31"); status = query.get("status", "").upper()
+        if status and status not in ("PENDING", "COMPLETED"): raise ApiError(400, "status must be PENDING or COMPLETED.")
+        if status and query.get("q"): raise ApiError(400, "Use either status or q, not both.")
+        if status: return await self.db(database.get_transactions_by_status, status, start_date, end_date, limit, offset)
+        return await self.db(database.search_transactions, start_date, end_date, query.get("q", ""), limit, offset)
+
+    # --- WebSocket ---
+    async def handle_websocket(self, reader, writer, headers, query):
+        try: self._check_token(headers, query)
+        except ApiError as e: await self._send(writer, e.status, {"error": str(e)}, False); writer.close(); return
+        key = headers.get("sec-websocket-key")
+        if not key: await self._send(writer, 400, {"error": "Missing Sec-WebSocket-Key."}, False); writer.close(); return
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+        writer.write(f"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\nSec-WebSocket-Accept: {accept}\r\n\r\n".encode())
+        queue = asyncio.Queue(CLIENT_QUEUE_SIZE); client = (queue, query.get("scale")); self.clients.add(client)
+        # Klien baru langsung menerima berat terakhir, tidak perlu menunggu perubahan berikutnya
+        for state in self.states.values():
+            if not client[1] or state["scale_id"] == client[1]: queue.put_nowait({"type": "weight", **state})
+        sender = asyncio.create_task(self._ws_sender(writer, queue))
+        try:
+            while True:
+                opcode, payload = await _read_ws_frame(reader)
+                if opcode == 0x8: writer.write(_ws_frame(0x8, payload[:2])); await writer.drain(); break
+                if opcode == 0x9: writer.write(_ws_frame(0xA, payload))  # Ping -> pong; pesan teks dari klien diabaikan
+        except (ConnectionError, asyncio.IncompleteReadError): pass
+        finally:
+            self.clients.discard(client); sender.cancel(); writer.close()
+
+    async def _ws_sender(self, writer, queue):
+        try:
+            while True:
+                message = await queue.get(); writer.write(_ws_frame(0x1, json.dumps(message, ensure_ascii=False, default=str).encode("utf-8"))); await writer.drain()
+        except ConnectionError: pass
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless weighing service: scale acquisition + JSON/WebSocket API")
+    parser.add_argument("--host", help=f"listen address (default: service.host in config or {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, help=f"listen port (default: service.port in config or {DEFAULT_PORT})")
+    parser.add_argument("--db", default=database.DATABASE_FILE, help=f"database file (default: {database.DATABASE_FILE})")
+    parser.add_argument("--config", default=CONFIG_FILE, help=f"config file (default: {CONFIG_FILE})")
+    parser.add_argument("--simulator", action="store_true", help="use the built-in simulator for every scale")
+    parser.add_argument("--token", help="require this API token (default: service.token in config)")
+    args = parser.parse_args(argv)
+    config = load_config(args.config); options = config.get("service", {})
+    scales = load_scales(config)
+    if args.simulator: scales = [{**scale, "simulator": True, "remote": None} for scale in scales]
+    service = WeighingService(args.db, scales, args.token or options.get("token")); dumper = create_dumper(config)
+    if dumper is not None: dumper.start()
+    try: asyncio.run(service.serve(args.host or options.get("host", DEFAULT_HOST), args.port or options.get("port", DEFAULT_PORT)))
+    except KeyboardInterrupt: print("Weighing service stopped.")
+    finally:
+        if dumper is not None: dumper.stop()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+# File: weight_filters.py (Filter berat sebelum deteksi stabil, dijalankan di thread worker timbangan)
+#
+# Trailer yang bergoyang membuat pembacaan mentah berayun puluhan kg selama beberapa detik; tanpa filter
+# StabilityDetector baru menyatakan STABLE setelah seluruh jendela pembacaan mentah masuk toleransi. Filter
+# meredam ayunan dan noise sehingga nilai yang diuji (dan ditampilkan) lebih cepat tenang:
+#   "median"  median N pembacaan terakhir: membuang spike, jeda kecil
+#   "ema"     exponential smoothing dengan konstanta waktu (detik), tidak tergantung kecepatan indikator
+#   "kalman"  Kalman 1D (beban konstan + noise pengukuran): rata-rata yang makin yakin selama beban tidak berubah
+# Semua filter mulai ulang dari nilai baru jika berat melompat > jump_kg selama confirm_readings pembacaan
+# berturut-turut (truk naik/turun, beban berubah), jadi tidak tertinggal; lompatan sesaat (spike) diabaikan.
+# Konfigurasi per timbangan di config.json, mis. "filter": {"type": "kalman", "measurement_noise_kg": 3}.
+# Pilih pengaturan dengan memutar ulang rekaman: python benchmarks/evaluate_filters.py recordings/
+
+import math
+import statistics
+from collections import deque
+
+DEFAULT_JUMP_KG = 100.0
+DEFAULT_CONFIRM_READINGS = 2
+DEFAULT_MEDIAN_WINDOW = 5
+DEFAULT_EMA_TIME_CONSTANT = 0.7
+DEFAULT_KALMAN_PROCESS_NOISE = 1.0   # kg^2 per detik: seberapa cepat beban sebenarnya boleh berubah
+DEFAULT_KALMAN_MEASUREMENT_NOISE = 2.0  # kg, simpangan baku pembacaan indikator (termasuk ayunan)
+
+class WeightFilter:
+    name = "none"
+    def __init__(self, jump_kg=DEFAULT_JUMP_KG, confirm_readings=DEFAULT_CONFIRM_READINGS):
+        self.jump_kg = jump_kg; self.confirm_readings = confirm_readings
+        self.value = None; self._jumps = 0
+
+    def update(self, timestamp, weight):
+        # Nilai terfilter untuk pembacaan ini
+        if self.value is not None and abs(weight - self.value) > self.jump_kg:
+            self._jumps += 1
+            if self._jumps < self.confirm_readings: return self.value  # Spike: tahan nilai sebelumnya
+            self.value = None
+        self._jumps = 0
+        self.value = self._start(timestamp, weight) if self.value is None else self._step(timestamp, weight)
+        return self.value
+
+    def _start(self, timestamp, weight): return weight
+    def _step(self, timestamp, weight): return weight
+    def reset(self): self.value = None; self._jumps = 0
+
+class MedianFilter(WeightFilter):
+    name = "median"
+    def __init__(self, window=DEFAULT_MEDIAN_WINDOW, **options):
+        super().__init__(**options); self.window = max(1, int(window)); self._values = deque(maxlen=self.window)
+    def _start(self, timestamp, weight): self._values.clear(); self._values.append(weight); return weight
+    def _step(self, timestamp, weight): self._values.append(weight); return statistics.median(self._values)
+
+class ExponentialFilter(WeightFilter):
+    name = "ema"
+    def __init__(self, time_constant=DEFAULT_EMA_TIME_CONSTANT, **options):
+        super().__init__(**options); self.time_constant = time_constant; self._timestamp = None
+    def _start(self, timestamp, weight): self._timestamp = timestamp; return weight
+    def _step(self, timestamp, weight):
+        # Bobot dari selang waktu, bukan per pembacaan: hasil sama untuk indikator 2/detik maupun 10/detik
+        alpha = 1.0 - math.exp(-max(timestamp - self._timestamp, 0.0) / self.time_constant) if self.time_constant > 0 else 1.0
+        self._timestamp = timestamp; return self.value + alpha * (weight - self.value)
+
+class KalmanFilter(WeightFilter):
+    name = "kalman"
+    def __init__(self, process_noise=DEFAULT_KALMAN_PROCESS_NOISE, measurement_noise_kg=DEFAULT_KALMAN_MEASUREMENT_NOISE, **options):
+        super().__init__(**options); self.process_noise = process_noise; self.measurement_noise_kg = measurement_noise_kg; self._variance = None; self._timestamp = None
+    def _start(self, timestamp, weight): self._timestamp = timestamp; self._variance = self.measurement_noise_kg ** 2; return weight
+    def _step(self, timestamp, weight):
+        self._variance += self.process_noise * max(timestamp - self._timestamp, 0.0); self._timestamp = timestamp
+        gain = self._variance / (self._variance + self.measurement_noise_kg ** 2); self._variance *= 1.0 - gain
+        return self.value + gain * (weight - self.value)
+
+FILTERS = {cls.name: cls for cls in (WeightFilter, MedianFilter, ExponentialFilter, KalmanFilter)}
+
+def create_weight_filter(options):
+    # options: isi "filter" di config.json (per timbangan). None = tanpa filter (perilaku lama).
+    options = dict(options or {}); kind = str(options.pop("type", "none")).lower()
+    if kind == "none": return None
+    if kind not in FILTERS: raise ValueError(f"Unknown weight filter '{kind}'. Available: {', '.join(FILTERS)}")
+    try: return FILTERS[kind](**options)
+    except TypeError as e: raise ValueError(f"Invalid options for weight filter '{kind}': {e}")
+
+def describe(weight_filter):
+    if weight_filter is None: return "none"
+    settings = {key: value for key, value in vars(weight_filter).items() if not key.startswith("_") and key != "value"}
+    return weight_filter.name + "(" + ", ".join(f"{key}={value:g}" if isinstance(value, float) else f"{key}={value}" for key, value in settings.items()) + ")"
@@ -0,0 +1,147 @@
+# File: weight_recorder.py (Rekaman mentah setiap pembacaan timbangan ke file segmen memory-mapped)
+#
+# Dipakai saat ada sengketa tiket: apa yang benar-benar dikirim indikator di sekitar waktu timbang.
+# Setiap segmen = header 64 byte + N record berukuran tetap 16 byte (timestamp epoch float64, berat float32,
+# flag). File dialokasikan penuh di awal dan di-mmap, jadi menulis satu pembacaan hanya dua pack_into ke memori
+# (tanpa syscall); kernel yang menulis ke disk. Segmen penuh -> segmen baru; segmen tertua dihapus (max_segments).
+# Tidak bergantung pada Qt: ditulis dari thread worker timbangan, dibaca dari GUI/CLI lewat file terpisah.
+
+import mmap
+import os
+import struct
+import time
+from collections import namedtuple
+from datetime import datetime
+
+RECORD = struct.Struct("<dfB3x")  # timestamp, berat, flag, 3 byte padding = 16 byte
+HEADER = struct.Struct("<8sIIQd")  # magic, record_size, capacity, count, created
+HEADER_SIZE = 64
+COUNT_OFFSET = 16
+MAGIC = b"WREC0001"
+SEGMENT_SUFFIX = ".wrec"
+DEFAULT_DIRECTORY = "recordings"
+DEFAULT_SEGMENT_RECORDS = 1 << 20  # 16 MB per segmen, +/- 29 jam pada 10 pembacaan/detik
+DEFAULT_MAX_SEGMENTS = 64
+MIN_REPLAY_SPEED = 1.0
+MAX_REPLAY_SPEED = 100.0
+MAX_REPLAY_GAP_SECONDS = 2.0
+
+FLAG_STABLE = 0x01              # Hasil StabilityDetector
+FLAG_INDICATOR_REPORTED = 0x02  # Protokol mengirim flag stabil sendiri
+FLAG_INDICATOR_STABLE = 0x04
+
+TraceSample = namedtuple("TraceSample", ["timestamp", "weight", "stable", "indicator_stable"])
+
+def _encode_flags(stable, indicator_stable):
+    flags = FLAG_STABLE if stable else 0
+    if indicator_stable is not None: flags |= FLAG_INDICATOR_REPORTED | (FLAG_INDICATOR_STABLE if indicator_stable else 0)
+    return flags
+
+def _decode(timestamp, weight, flags):
+    return TraceSample(timestamp, weight, bool(flags & FLAG_STABLE), bool(flags & FLAG_INDICATOR_STABLE) if flags & FLAG_INDICATOR_REPORTED else None)
+
+class WeightRecorder:
+    def __init__(self, directory=DEFAULT_DIRECTORY, segment_records=DEFAULT_SEGMENT_RECORDS, max_segments=DEFAULT_MAX_SEGMENTS, clock=time.time):
+        self.directory = directory; self.segment_records = segment_records; self.max_segments = max_segments; self.clock = clock
+        self._file = None; self._map = None; self._count = 0; self.path = None
+        os.makedirs(directory, exist_ok=True)
+
+    def record(self, weight, stable, indicator_stable=None, timestamp=None):
+        if self._map is None or self._count >= self.segment_records: self._rotate()
+        RECORD.pack_into(self._map, HEADER_SIZE + self._count * RECORD.size, self.clock() if timestamp is None else timestamp, weight, _encode_flags(stable, indicator_stable))
+        # Jumlah record di header ditulis setelah record-nya, jadi pembaca tidak pernah melihat record setengah jadi
+        self._count += 1; struct.pack_into("<Q", self._map, COUNT_OFFSET, self._count)
+
+    def _rotate(self):
+        self.close()
+        created = self.clock(); self.path = os.path.join(self.directory, f"weights_{datetime.fromtimestamp(created):%Y%m%d_%H%M%S_%f}{SEGMENT_SUFFIX}")
+        self._file = open(self.path, "w+b"); self._file.truncate(HEADER_SIZE + self.segment_records * RECORD.size)
+        self._map = mmap.mmap(self._file.fileno(), 0); self._count = 0
+        HEADER.pack_into(self._map, 0, MAGIC, RECORD.size, self.segment_records, 0, created)
+        for old in list_segments(self.directory)[:-self.max_segments]:
+            try: os.remove(old)
+            except OSError as e: print(f"Gagal menghapus segmen rekaman lama {old}: {e}")
+
+    def close(self):
+        if self._map is not None: self._map.flush(); self._map.close(); self._map = None
+        if self._file is not None: self._file.close(); self._file = None
+
+def create_recorder(config):
+    # config: dict dari config.json, kunci "recording" (default aktif di folder recordings/)
+    options = config.get("recording", {})
+    if not options.get("enabled", True): return None
+    try: return WeightRecorder(options.get("directory", DEFAULT_DIRECTORY), options.get("segment_records", DEFAULT_SEGMENT_RECORDS), options.get("max_segments", DEFAULT_MAX_SEGMENTS))
+    except OSError as e: print(f"Rekaman berat dinonaktifkan: {e}"); return None
+
+def list_segments(directory=DEFAULT_DIRECTORY):
+    # Nama file berisi waktu pembuatan, jadi urutan nama = urutan waktu
+    if not os.path.isdir(directory): return []
+    return [os.path.join(directory, name) for name in sorted(os.listdir(directory)) if name.endswith(SEGMENT_SUFFIX)]
+
+class Segment:
+    # Pembaca satu segmen (read-only), aman dibuka saat recorder masih menulis ke file yang sama
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            magic, record_size, self.capacity, count, self.created = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or record_size != RECORD.size: raise ValueError(f"{path} is not a weight recording segment")
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.count = min(count, self.capacity)
+
+    def __len__(self): return self.count
+    def timestamp_at(self, index): return struct.unpack_from("<d", self._map, HEADER_SIZE + index * RECORD.size)[0]
+    def sample_at(self, index): return _decode(*RECORD.unpack_from(self._map, HEADER_SIZE + index * RECORD.size))
+    def samples(self, start=0, stop=None):
+        stop = self.count if stop is None else min(stop, self.count)
+        for timestamp, weight, flags in RECORD.iter_unpack(self._map[HEADER_SIZE + start * RECORD.size:HEADER_SIZE + stop * RECORD.size]): yield _decode(timestamp, weight, flags)
+
+    def index_at(self, timestamp):
+        # Binary search (timestamp record naik) tanpa membaca seluruh segmen
+        low, high = 0, self.count
+        while low < high:
+            mid = (low + high) // 2
+            if self.timestamp_at(mid) < timestamp: low = mid + 1
+            else: high = mid
+        return low
+
+    def time_range(self): return (self.timestamp_at(0), self.timestamp_at(self.count - 1)) if self.count else (self.created, self.created)
+    def close(self): self._map.close()
+    def __enter__(self): return self
+    def __exit__(self, *exc): self.close()
+
+def get_trace(start_time, end_time, directory=DEFAULT_DIRECTORY):
+    # Semua sampel dengan start_time <= timestamp <= end_time (epoch detik) dari segmen yang relevan
+    samples = []
+    for path in list_segments(directory):
+        try:
+            with Segment(path) as segment:
+                first, last = segment.time_range()
+                if not segment.count or last < start_time or first > end_time: continue
+                samples.extend(s for s in segment.samples(segment.index_at(start_time), segment.index_at(end_time) + 1) if s.timestamp <= end_time)
+        except (OSError, ValueError) as e: print(f"Gagal membaca segmen rekaman {path}: {e}")
+    return samples
+
+def _parse_timestamp(value): return datetime.strptime(value, "%Y-%m-%d %H:%M:%S").timestamp() if value else None
+
+def get_transaction_trace(transaction, before=60.0, after=60.0, directory=DEFAULT_DIRECTORY):
+    # transaction: baris dari get_transaction_by_id. Timestamp DB berupa waktu lokal per detik.
+    traces = {}
+    for key, column in (("first", "first_weigh_timestamp"), ("second", "second_weigh_timestamp")):
+        moment = _parse_timestamp(transaction[column])
+        traces[key] = get_trace(moment - before, moment + after + 1, directory) if moment is not None else []
+    return traces
+
+def replay_samples(path, speed=1.0, loop=True, max_gap=MAX_REPLAY_GAP_SECONDS):
+    # Generator (jeda_detik, TraceSample) untuk simulator: jeda asli antar pembacaan dibagi kecepatan replay.
+    # Jeda panjang (aplikasi sempat ditutup, indikator mati) dipendekkan menjadi max_gap.
+    # Saat diulang (loop), timestamp digeser agar tetap naik (detektor stabil butuh waktu yang monoton).
+    speed = min(max(speed, MIN_REPLAY_SPEED), MAX_REPLAY_SPEED); offset = 0.0; previous = None
+    while True:
+        with Segment(path) as segment:
+            if not segment.count: return
+            if previous is not None: offset = previous + max_gap - segment.timestamp_at(0)
+            for sample in segment.samples():
+                sample = sample._replace(timestamp=sample.timestamp + offset)
+                yield (0.0 if previous is None else min(max(0.0, sample.timestamp - previous), max_gap) / speed), sample
+                previous = sample.timestamp
+        if not loop: return